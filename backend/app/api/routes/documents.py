@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Response
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 
 from app.api.dependencies.auth import get_current_user
 from app.models.user import User
-from app.schemas.document import DocumentMetadata
-from app.services.document_store import document_store
+from app.schemas.document import DocumentMetadata, DocumentStatus
+from app.services.document_ingestion import ingestion_pool
+from app.services.document_store import (
+    MAX_UPLOAD_BYTES,
+    STATUS_PENDING,
+    STATUS_READY,
+    DocumentTooLargeError,
+    DocumentUploadError,
+    document_store,
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -16,12 +25,22 @@ def _serialize_document(doc: dict) -> DocumentMetadata:
         uploaded_at=doc["uploaded_at"],
         preview=doc.get("preview", ""),
         preview_url=f"/documents/{doc['id']}/file",
+        status=doc.get("status", STATUS_READY),
     )
 
 
 @router.get("", response_model=list[DocumentMetadata])
-def list_documents(current_user: User = Depends(get_current_user)):
-    docs = document_store.list_documents(current_user.id)
+def list_documents(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    docs = document_store.list_documents(current_user.id, limit=limit, offset=offset)
+    if limit is not None:
+        response.headers["X-Total-Count"] = str(
+            document_store.count_documents(current_user.id)
+        )
     return [_serialize_document(doc) for doc in docs]
 
 
@@ -33,15 +52,41 @@ async def upload_document(
     if file.content_type not in ("application/pdf", "application/x-pdf"):
         raise HTTPException(status_code=400, detail="Only PDF uploads are supported.")
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
-    metadata = document_store.save_document(
-        current_user.id, file.filename or "document.pdf", content
-    )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Uploaded file is too large.")
+
+    # Copy the spooled upload to storage chunk by chunk off the event loop
+    # instead of reading the whole PDF into memory.
+    try:
+        metadata = await run_in_threadpool(
+            document_store.save_document_stream,
+            current_user.id,
+            file.filename or "document.pdf",
+            file.file,
+            defer_extraction=True,
+        )
+    except DocumentTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except DocumentUploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if metadata["status"] == STATUS_PENDING:
+        # Claiming the document locks its metadata and the first call starts
+        # the process pool, so this blocks too.
+        await run_in_threadpool(ingestion_pool.submit, current_user.id, metadata["id"])
     return _serialize_document(metadata)
 
 
+@router.get("/{document_id}/status", response_model=DocumentStatus)
+def document_status(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    status = document_store.get_document_status(current_user.id, document_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return status
+
+
 @router.get("/{document_id}/file")
 def download_document(
     document_id: str,
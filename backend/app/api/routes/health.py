@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends
 from app.api.dependencies.auth import get_current_user
 from app.models.user import User
+from app.services.completion_cache import completion_cache
+from app.services.prompt_builder import prompt_prefix_stats
 
 router = APIRouter()
 
@@ -11,3 +13,13 @@ def health(current_user: User = Depends(get_current_user)):
         "id": current_user.id,
         "email": current_user.email,
     }
+
+
+@router.get("/llm-cache")
+def llm_cache_stats(current_user: User = Depends(get_current_user)):
+    return completion_cache.stats()
+
+
+@router.get("/prompt-cache")
+def prompt_cache_stats(current_user: User = Depends(get_current_user)):
+    return prompt_prefix_stats.stats()
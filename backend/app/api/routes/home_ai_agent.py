@@ -1,17 +1,25 @@
+import json
+import logging
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.dependencies.auth import get_current_user
 from app.core.database import get_db
 from app.models.user import User
-from app.services.home_ai_agent import run_home_agent
+from app.services.home_ai_agent import run_home_agent_async, stream_home_agent
 from app.services.agent_memory import memory as agent_memory
 
 WELCOME_TRIGGER_MESSAGE = "__homeai_welcome__"
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
+logger = logging.getLogger(__name__)
+
 
 class AgentChatRequest(BaseModel):
     message: str
@@ -37,25 +45,29 @@ def build_welcome_response(user: User) -> dict:
 
 
 @router.post("/chat")
-def chat_agent(
+async def chat_agent(
     payload: AgentChatRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     if payload.message == WELCOME_TRIGGER_MESSAGE:
-        return build_welcome_response(current_user)
+        return await run_in_threadpool(build_welcome_response, current_user)
 
-    agent_result = run_home_agent(
+    agent_result = await run_home_agent_async(
         db=db,
         user_id=current_user.id,
         message=payload.message,
         property_id=payload.property_id,
     )
 
+    return build_chat_response(current_user, agent_result)
+
+
+def build_chat_response(user: User, agent_result: dict) -> dict:
     return {
         "reply": agent_result["reply"],
-        "user_id": current_user.id,
-        "user_name": f"{current_user.first_name} {current_user.last_name}",
+        "user_id": user.id,
+        "user_name": f"{user.first_name} {user.last_name}",
         "active_property": agent_result["active_property"],
         "available_properties": agent_result["available_properties"],
         "requires_property_selection": agent_result["requires_property_selection"],
@@ -63,6 +75,53 @@ def chat_agent(
     }
 
 
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_agent_stream(
+    payload: AgentChatRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Same turn as ``/agent/chat`` delivered as Server-Sent Events:
+    ``tool_start``/``tool_end`` while tools run, ``token`` events with the
+    final reply's text, and a closing ``done`` event carrying the full
+    ``/agent/chat`` payload.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        if payload.message == WELCOME_TRIGGER_MESSAGE:
+            welcome = await run_in_threadpool(build_welcome_response, current_user)
+            yield format_sse("done", welcome)
+            return
+
+        try:
+            async for event in stream_home_agent(
+                db=db,
+                user_id=current_user.id,
+                message=payload.message,
+                property_id=payload.property_id,
+            ):
+                data = event["data"]
+                if event["event"] == "done":
+                    data = build_chat_response(current_user, data)
+                yield format_sse(event["event"], data)
+        except Exception:
+            logger.exception("Streaming agent turn failed for user %s", current_user.id)
+            yield format_sse(
+                "error", {"detail": "Something went wrong while generating a reply."}
+            )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/welcome")
 def welcome_message(current_user: User = Depends(get_current_user)):
     return build_welcome_response(current_user)
@@ -8,6 +8,13 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str
     GOOGLE_MAP_API_KEY: str
 
+    # Upstream base URLs. Point them at app.scripts.upstream_stub_server to
+    # run the stack without network access (e.g. for load tests).
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENWEBNINJA_BASE_URL: str = "https://api.openwebninja.com"
+    GOOGLE_PLACES_BASE_URL: str = "https://maps.googleapis.com"
+    OPEN_METEO_BASE_URL: str = "https://api.open-meteo.com"
+
     class Config:
         env_file = ".env"
 
@@ -2,8 +2,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 engine = create_engine(settings.DATABASE_URL)
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(
     autocommit=False,
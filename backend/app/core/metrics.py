@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds; wide enough for a sub-millisecond query and a 30s model round.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Server-Timing entries per response; the rest are summarized by name.
+MAX_SERVER_TIMINGS = 20
+
+# Spans finished during the current request, as (timing name, seconds).
+_REQUEST_TIMINGS: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        for key, value in values:
+            labels = _format_labels(zip(self.labelnames, key))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        timing_name: str | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Prefix for this histogram's Server-Timing entries.
+        self.timing_name = timing_name
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        lines = self._header()
+        for key, (counts, total, count) in series:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}"
+                )
+            labels = _format_labels(pairs)
+            lines.append(f"{self.name}_sum{labels} {repr(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics rendered in the Prometheus text format. Each
+    uvicorn worker has its own registry, so with ``--workers N`` a scrape of
+    ``/metrics`` reports only the worker that answered it.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), **options) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, **options))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "homeai_http_request_duration_seconds",
+    "Time to serve an HTTP request, by route template.",
+    ("method", "route", "status"),
+)
+AGENT_TURN_SECONDS = registry.histogram(
+    "homeai_agent_turn_duration_seconds",
+    "Time to run one agent turn, by runner and how the turn was answered.",
+    ("mode", "path", "outcome"),
+    timing_name="agent",
+)
+TOOL_SECONDS = registry.histogram(
+    "homeai_tool_duration_seconds",
+    "Time to execute one agent tool call, including retries.",
+    ("tool", "outcome"),
+    timing_name="tool",
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "homeai_upstream_duration_seconds",
+    "Time spent waiting on an external API.",
+    ("upstream", "operation", "outcome"),
+    timing_name="upstream",
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "homeai_db_query_duration_seconds",
+    "Time to execute one SQL statement.",
+    ("operation",),
+    timing_name="db",
+)
+DOCUMENT_STAGE_SECONDS = registry.histogram(
+    "homeai_document_stage_duration_seconds",
+    "Time spent in each document ingestion stage.",
+    ("stage",),
+    buckets=LATENCY_BUCKETS + (60.0, 120.0, 300.0),
+    timing_name="document",
+)
+LLM_TOKENS = registry.counter(
+    "homeai_llm_tokens_total",
+    "Tokens reported by the model provider, by model and kind.",
+    ("model", "kind"),
+)
+
+
+def _record_timing(histogram: Histogram, labels: dict, seconds: float) -> None:
+    timings = _REQUEST_TIMINGS.get()
+    if timings is None or histogram.timing_name is None:
+        return
+    first = labels.get(histogram.labelnames[0]) if histogram.labelnames else None
+    name = f"{histogram.timing_name}.{first}" if first else histogram.timing_name
+    timings.append((name, seconds))
+
+
+def observe(histogram: Histogram, seconds: float, **labels) -> None:
+    """Record an already-measured duration (and add it to Server-Timing)."""
+    histogram.observe(seconds, **labels)
+    _record_timing(histogram, labels, seconds)
+
+
+@contextmanager
+def span(histogram: Histogram, **labels) -> Iterator[dict]:
+    """
+    Time the block into ``histogram``. Yields the label dict so the block
+    can refine labels it only learns later (e.g. ``labels["path"] =
+    "weather"``); an ``outcome`` label left unset becomes "ok" or "error".
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        labels.setdefault("outcome", "error")
+        raise
+    finally:
+        labels.setdefault("outcome", "ok")
+        observe(histogram, time.perf_counter() - start, **labels)
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator form of ``span`` for plain and async functions."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(histogram, **labels):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(histogram, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_llm_usage(model: str, usage) -> None:
+    """Count a completion's ``usage`` (None when the provider omits it)."""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    if cached:
+        LLM_TOKENS.inc(cached, model=model, kind="cached_prompt")
+
+
+# ----------------------------
+# SQLAlchemy engine events
+# ----------------------------
+
+_QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def _query_operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    operation = head[0].upper() if head else ""
+    return operation.lower() if operation in _QUERY_OPERATIONS else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if started:
+        observe(
+            DB_QUERY_SECONDS,
+            time.perf_counter() - started.pop(),
+            operation=_query_operation(statement),
+        )
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        observe(
+            DB_QUERY_SECONDS,
+            time.perf_counter() - started.pop(),
+            operation=_query_operation(exception_context.statement or ""),
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ----------------------------
+# ASGI middleware
+# ----------------------------
+
+
+def _server_timing(timings: list[tuple[str, float]]) -> str:
+    totals: dict[str, list[float]] = {}
+    for name, seconds in timings:
+        total = totals.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+    slowest = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    return ", ".join(
+        f'{name};dur={seconds * 1000:.1f};desc="{count}x"'
+        for name, (seconds, count) in slowest[:MAX_SERVER_TIMINGS]
+    )
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request into ``homeai_http_request_duration_seconds``
+    (labelled by route template, not raw path) and collects the spans
+    finished while serving it into a ``Server-Timing`` response header, so
+    one slow turn can be broken down from the browser's network panel.
+    Streaming responses send headers first, so theirs only cover the work
+    done before the first byte.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: list[tuple[str, float]] = []
+        token = _REQUEST_TIMINGS.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(timings).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _REQUEST_TIMINGS.reset(token)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
@@ -1,9 +1,24 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.api import api_router
+from app.core.metrics import METRICS_TOKEN, MetricsMiddleware, registry
+from app.services.document_ingestion import ingestion_pool
+from app.services.http_client import close_async_http_client
 from os import getenv
 
-app = FastAPI(title="HomeAI")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ingestion_pool.resume_pending()
+    yield
+    ingestion_pool.shutdown(wait=False)
+    await close_async_http_client()
+
+
+app = FastAPI(title="HomeAI", lifespan=lifespan)
 
 frontend_origin = getenv("FRONTEND_ORIGIN", "http://localhost:3000")
 
@@ -14,6 +29,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router)
 
@@ -21,3 +37,12 @@ app.include_router(api_router)
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: str | None = Header(default=None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401)
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -3,3 +3,4 @@ from .property import Property
 from .property_users import PropertyUsers
 
 
+from .user_task import UserTask
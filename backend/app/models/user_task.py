@@ -0,0 +1,43 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    ForeignKey,
+    String,
+    DateTime,
+    Boolean,
+    func,
+    Index,
+)
+from app.core.database import Base
+
+
+class UserTask(Base):
+    __tablename__ = "user_tasks"
+
+    id = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # As the user phrased it, for display
+    description = Column(String, nullable=False)
+    # Lowercased, whitespace-collapsed form used for lookups and dedupe
+    normalized_description = Column(String, nullable=False)
+
+    completed = Column(Boolean, default=False, nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        # One row per task per user; upsert and complete look up by it
+        Index(
+            "uq_user_tasks_user_normalized_description",
+            "user_id",
+            "normalized_description",
+            unique=True,
+        ),
+    )
@@ -8,3 +8,10 @@ class DocumentMetadata(BaseModel):
     uploaded_at: datetime
     preview: str
     preview_url: str
+    status: str = "ready"
+
+
+class DocumentStatus(BaseModel):
+    id: str
+    status: str
+    error: str | None = None
@@ -0,0 +1,666 @@
+"""
+Offline replay benchmark for the agent loop.
+
+Drives ``run_home_agent`` (sync, one thread per simulated user) and the
+FastAPI app (``POST /agent/chat`` and ``POST /agent/chat/stream`` over an
+in-process ASGI transport) through a corpus of recorded conversations.
+Streaming turns get the same recorded responses as chunk streams, and a
+turn whose streamed tokens don't add up to its ``done`` reply counts as an
+error. OpenAI, OpenWebNinja, Google Places and
+Open-Meteo are replaced by their recorded responses, each with an optional
+injected latency, and everything runs against a throwaway SQLite database
+seeded with synthetic users and properties. No network access is needed.
+
+    python -m app.scripts.benchmark_agent_replay --concurrency 8 \
+        --latency openai=0.6 --latency zillow=0.3 --output replay.json
+    python -m app.scripts.benchmark_agent_replay --baseline replay.json
+
+The JSON report carries p50/p95/p99 turn latency, LLM and tool calls per
+turn and throughput for each mode, plus the commit it ran on, so runs can
+be diffed across commits (``--baseline`` does this for you).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "agent_conversations.json"
+MODES = ("sync", "app", "stream")
+UPSTREAMS = ("openai", "zillow", "google_places", "open_meteo")
+# Returned when a turn asks the model more often than the recording covers.
+EXHAUSTED_REPLY = "(no recorded response left for this turn)"
+
+# The conversation turn being replayed in the current thread or task.
+_SESSION: ContextVar["ReplaySession | None"] = ContextVar("replay_session", default=None)
+
+
+class ReplaySession:
+    """Recorded model responses for one turn, and what the turn consumed."""
+
+    def __init__(self, llm_responses: list[dict]) -> None:
+        self.llm_responses = list(llm_responses)
+        self.llm_calls = 0
+        self.llm_cache_hits = 0
+        self.tool_calls = 0
+        self.exhausted = 0
+
+
+def _current_session() -> ReplaySession:
+    session = _SESSION.get()
+    if session is None:
+        raise RuntimeError("Upstream call made outside a replayed turn")
+    return session
+
+
+# ----------------------------
+# Recorded upstreams
+# ----------------------------
+
+
+def _chat_completion(recorded: dict, model: str):
+    from openai.types.chat import ChatCompletion
+
+    message = {"role": "assistant", "content": recorded.get("content")}
+    if recorded.get("tool_calls"):
+        message["tool_calls"] = [
+            {
+                "id": f"call_{index}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }
+            for index, call in enumerate(recorded["tool_calls"])
+        ]
+    usage = recorded.get("usage", {"prompt_tokens": 900, "completion_tokens": 60})
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-replay",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "tool_calls" if recorded.get("tool_calls") else "stop",
+                    "message": message,
+                }
+            ],
+            "usage": {
+                **usage,
+                "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"],
+            },
+        }
+    )
+
+
+def _completion_chunks(recorded: dict, model: str) -> list:
+    """A recorded response as the ``chat.completion.chunk`` objects of a stream."""
+    from openai.types.chat import ChatCompletionChunk
+
+    base = {"id": "chatcmpl-replay", "object": "chat.completion.chunk", "created": 0, "model": model}
+
+    def chunk(delta: dict, finish_reason=None):
+        return ChatCompletionChunk.model_validate(
+            {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        )
+
+    chunks = [chunk({"role": "assistant"})]
+    words = (recorded.get("content") or "").split(" ")
+    if any(words):
+        pieces = [word + " " for word in words[:-1]] + [words[-1]]
+        chunks.extend(chunk({"content": piece}) for piece in pieces if piece)
+    for index, call in enumerate(recorded.get("tool_calls") or ()):
+        chunks.append(
+            chunk(
+                {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "id": f"call_{index}",
+                            "type": "function",
+                            "function": {
+                                "name": call["name"],
+                                "arguments": json.dumps(call["arguments"]),
+                            },
+                        }
+                    ]
+                }
+            )
+        )
+    chunks.append(chunk({}, "tool_calls" if recorded.get("tool_calls") else "stop"))
+    usage = recorded.get("usage", {"prompt_tokens": 900, "completion_tokens": 60})
+    chunks.append(
+        ChatCompletionChunk.model_validate(
+            {
+                **base,
+                "choices": [],
+                "usage": {
+                    **usage,
+                    "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"],
+                },
+            }
+        )
+    )
+    return chunks
+
+
+class _ReplayStream:
+    """Async iterator over recorded chunks, like the SDK's ``AsyncStream``."""
+
+    def __init__(self, chunks: list) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class ReplayOpenAI:
+    """Stands in for ``chat.completions.create`` on both OpenAI clients."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def _next(self, request: dict) -> dict:
+        session = _current_session()
+        session.llm_calls += 1
+        if session.llm_responses:
+            return session.llm_responses.pop(0)
+        session.exhausted += 1
+        return {"content": EXHAUSTED_REPLY}
+
+    def create(self, **request):
+        if request.get("stream"):
+            raise NotImplementedError("The sync client is never asked to stream")
+        time.sleep(self.latency)
+        return _chat_completion(self._next(request), request["model"])
+
+    async def acreate(self, **request):
+        # For streams this is the wait for the first chunk; the recorded
+        # chunks then follow back to back.
+        await asyncio.sleep(self.latency)
+        recorded = self._next(request)
+        if request.get("stream"):
+            return _ReplayStream(_completion_chunks(recorded, request["model"]))
+        return _chat_completion(recorded, request["model"])
+
+
+def _upstream_for(url: str) -> tuple[str, str]:
+    """(recording name, latency key) for an upstream URL."""
+    if "/property-details-address" in url:
+        return "zillow", "zillow"
+    if "/place/textsearch/" in url:
+        return "places_text_search", "google_places"
+    if "/place/details/" in url:
+        return "places_details", "google_places"
+    if "/v1/forecast" in url:
+        return "open_meteo", "open_meteo"
+    raise RuntimeError(f"No recording for upstream {url}")
+
+
+class ReplayUpstreams:
+    """Recorded JSON bodies for the HTTP APIs, via ``requests`` and httpx."""
+
+    def __init__(self, recordings: dict, latency: dict[str, float]) -> None:
+        self.recordings = recordings
+        self.latency = latency
+
+    def requests_get(self, url, params=None, headers=None, timeout=None):
+        import requests
+
+        name, latency_key = _upstream_for(url)
+        time.sleep(self.latency[latency_key])
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = json.dumps(self.recordings[name]).encode("utf-8")
+        return response
+
+    async def handle(self, request):
+        import httpx
+
+        name, latency_key = _upstream_for(str(request.url))
+        await asyncio.sleep(self.latency[latency_key])
+        return httpx.Response(200, json=self.recordings[name])
+
+
+# ----------------------------
+# Synthetic data
+# ----------------------------
+
+
+class SyntheticData:
+    """Users with 1 or 2 properties each, one per (mode, simulated user, conversation)."""
+
+    def __init__(self) -> None:
+        self._users = 0
+        self._properties = 0
+
+    def create_user(self, db, label: str, property_count: int) -> int:
+        from app.models import Property, PropertyUsers, User
+
+        self._users += 1
+        user = User(
+            first_name="Replay",
+            last_name=label,
+            phone_number=f"555{self._users:07d}",
+            email=f"{label}@replay.test",
+        )
+        db.add(user)
+        db.flush()
+        homes = [("Oak St", "Chicago", "IL", "60614"), ("Elm St", "Austin", "TX", "78704")]
+        for street, city, state, postal_code in homes[:property_count]:
+            self._properties += 1
+            street_address = f"{100 + self._properties} {street}"
+            home = Property(
+                street_address=street_address,
+                city=city,
+                state=state,
+                postal_code=postal_code,
+                formatted_address=f"{street_address}, {city}, {state} {postal_code}",
+            )
+            db.add(home)
+            db.flush()
+            db.add(
+                PropertyUsers(user_id=user.id, property_id=home.id, role="owner", is_active=True)
+            )
+        return user.id
+
+    def seed(self, mode: str, concurrency: int, conversations: list[dict]) -> list[dict]:
+        """Per simulated user, the user id to run each conversation as."""
+        from app.core.database import SessionLocal
+
+        with SessionLocal() as db:
+            users = [
+                {
+                    conversation["name"]: self.create_user(
+                        db,
+                        f"{mode}-{worker}-{conversation['name']}",
+                        conversation.get("properties", 1),
+                    )
+                    for conversation in conversations
+                }
+                for worker in range(concurrency)
+            ]
+            db.commit()
+        return users
+
+
+# ----------------------------
+# Runners
+# ----------------------------
+
+
+def _turn_result(conversation: dict, index: int, seconds: float, session, error=None) -> dict:
+    return {
+        "conversation": conversation["name"],
+        "turn": index,
+        "seconds": seconds,
+        "llm_calls": session.llm_calls,
+        "llm_cache_hits": session.llm_cache_hits,
+        "tool_calls": session.tool_calls,
+        "exhausted": session.exhausted,
+        "unused": len(session.llm_responses),
+        "error": error,
+    }
+
+
+def run_sync(conversations: list[dict], users: list[dict], rounds: int) -> list[dict]:
+    from app.core.database import SessionLocal
+    from app.services.home_ai_agent import run_home_agent
+
+    def simulate_user(user_ids: dict) -> list[dict]:
+        results = []
+        for _ in range(rounds):
+            for conversation in conversations:
+                user_id = user_ids[conversation["name"]]
+                for index, turn in enumerate(conversation["turns"]):
+                    session = ReplaySession(turn["llm"])
+                    token = _SESSION.set(session)
+                    error = None
+                    start = time.perf_counter()
+                    try:
+                        with SessionLocal() as db:
+                            run_home_agent(db=db, user_id=user_id, message=turn["message"])
+                    except Exception as exc:
+                        error = repr(exc)
+                    seconds = time.perf_counter() - start
+                    _SESSION.reset(token)
+                    results.append(_turn_result(conversation, index, seconds, session, error))
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        per_user = list(executor.map(simulate_user, users))
+    return [result for results in per_user for result in results]
+
+
+def _stream_error(body: str) -> str | None:
+    """Check an SSE body: it must end in ``done`` and its tokens must add up to the reply."""
+    tokens: list[str] = []
+    reply = None
+    event = None
+    for line in body.splitlines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+            if event == "token":
+                tokens.append(data["text"])
+            elif event == "done":
+                reply = data.get("reply")
+            elif event == "error":
+                return f"stream error event: {data}"
+    if reply is None:
+        return "stream ended without a done event"
+    if "".join(tokens) != reply:
+        return "streamed tokens differ from the done reply"
+    return None
+
+
+async def run_app(
+    conversations: list[dict], users: list[dict], rounds: int, *, stream: bool = False
+) -> list[dict]:
+    import httpx
+
+    from app.core.security import create_access_token
+    from app.main import app
+
+    path = "/agent/chat/stream" if stream else "/agent/chat"
+
+    async def simulate_user(client, user_ids: dict) -> list[dict]:
+        results = []
+        for _ in range(rounds):
+            for conversation in conversations:
+                user_id = user_ids[conversation["name"]]
+                headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+                for index, turn in enumerate(conversation["turns"]):
+                    session = ReplaySession(turn["llm"])
+                    token = _SESSION.set(session)
+                    error = None
+                    start = time.perf_counter()
+                    try:
+                        # The ASGI transport hands back the whole body, so a
+                        # streamed turn is timed to its last event.
+                        response = await client.post(
+                            path, json={"message": turn["message"]}, headers=headers
+                        )
+                        if response.status_code != 200:
+                            error = f"HTTP {response.status_code}"
+                        elif stream:
+                            error = _stream_error(response.text)
+                    except Exception as exc:
+                        error = repr(exc)
+                    seconds = time.perf_counter() - start
+                    _SESSION.reset(token)
+                    results.append(_turn_result(conversation, index, seconds, session, error))
+        return results
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+        per_user = await asyncio.gather(*(simulate_user(client, ids) for ids in users))
+    return [result for results in per_user for result in results]
+
+
+# ----------------------------
+# Reporting
+# ----------------------------
+
+
+def summarize(results: list[dict], elapsed: float, concurrency: int) -> dict:
+    latencies = np.array([r["seconds"] for r in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    per_conversation = {}
+    for name in dict.fromkeys(r["conversation"] for r in results):
+        turns = [r for r in results if r["conversation"] == name]
+        per_conversation[name] = {
+            "turns": len(turns),
+            "p50_ms": round(float(np.percentile([r["seconds"] * 1000 for r in turns], 50)), 3),
+            "llm_calls_per_turn": round(sum(r["llm_calls"] for r in turns) / len(turns), 3),
+            "tool_calls_per_turn": round(sum(r["tool_calls"] for r in turns) / len(turns), 3),
+        }
+    return {
+        "concurrency": concurrency,
+        "turns": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_turns_per_second": round(len(results) / elapsed, 3),
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "llm_calls_per_turn": round(sum(r["llm_calls"] for r in results) / len(results), 3),
+        "llm_cache_hits_per_turn": round(
+            sum(r["llm_cache_hits"] for r in results) / len(results), 3
+        ),
+        "tool_calls_per_turn": round(sum(r["tool_calls"] for r in results) / len(results), 3),
+        # Model calls the recording didn't cover / recorded responses never
+        # requested: non-zero means routing changed since it was recorded.
+        "replay_exhausted": sum(r["exhausted"] for r in results),
+        "replay_unused": sum(r["unused"] for r in results),
+        "conversations": per_conversation,
+        "sample_errors": sorted({r["error"] for r in results if r["error"]})[:5],
+    }
+
+
+COMPARED_METRICS = (
+    ("latency_ms", "p50"),
+    ("latency_ms", "p95"),
+    ("latency_ms", "p99"),
+    ("throughput_turns_per_second",),
+    ("llm_calls_per_turn",),
+    ("llm_cache_hits_per_turn",),
+    ("tool_calls_per_turn",),
+)
+
+
+def _lookup(report: dict, path: tuple) -> float | None:
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Percent change of each headline metric against ``baseline``, per mode."""
+    deltas = {}
+    for mode, current in report["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if previous is None:
+            continue
+        deltas[mode] = {}
+        for path in COMPARED_METRICS:
+            old, new = _lookup(previous, path), _lookup(current, path)
+            if old is None or new is None:
+                continue
+            change = round((new - old) / old * 100, 2) if old else None
+            deltas[mode][".".join(path)] = {"baseline": old, "current": new, "change_pct": change}
+    return deltas
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(report: dict) -> None:
+    out = sys.stderr
+    for mode, stats in report["modes"].items():
+        latency = stats["latency_ms"]
+        print(
+            f"{mode:>5}: {stats['turns']} turns @ {stats['concurrency']} users  "
+            f"p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms  "
+            f"{stats['throughput_turns_per_second']:.1f} turns/s  "
+            f"llm/turn {stats['llm_calls_per_turn']:.2f} "
+            f"(+{stats['llm_cache_hits_per_turn']:.2f} cached)  tools/turn {stats['tool_calls_per_turn']:.2f}",
+            file=out,
+        )
+        if stats["errors"] or stats["replay_exhausted"] or stats["replay_unused"]:
+            print(
+                f"       ⚠️  {stats['errors']} error(s), {stats['replay_exhausted']} unrecorded "
+                f"model call(s), {stats['replay_unused']} unused recorded response(s)",
+                file=out,
+            )
+    for mode, metrics in report.get("baseline_delta", {}).items():
+        changes = ", ".join(
+            f"{name} {delta['change_pct']:+.1f}%"
+            for name, delta in metrics.items()
+            if delta["change_pct"] is not None
+        )
+        print(f"{mode:>5} vs baseline: {changes}", file=out)
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+
+
+def _configure_environment(workdir: Path) -> None:
+    # Settings are read when app modules are imported, so this has to run
+    # before any of them are.
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'replay.sqlite3'}"
+    os.environ["DOCUMENT_STORAGE_PATH"] = str(workdir / "documents")
+    os.environ["LLM_CACHE_BACKEND"] = "memory"
+    os.environ["SESSION_STATE_BACKEND"] = "memory"
+    for key in ("OPENAI_API_KEY", "OPENWEBNINJA_API_KEY", "GOOGLE_API_KEY", "GOOGLE_MAP_API_KEY"):
+        os.environ[key] = "replay"
+
+
+def _parse_latency(values: list[str]) -> dict[str, float]:
+    latency = dict.fromkeys(UPSTREAMS, 0.0)
+    for value in values:
+        name, _, seconds = value.partition("=")
+        if name not in latency:
+            raise SystemExit(f"Unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        latency[name] = float(seconds)
+    return latency
+
+
+def benchmark(args) -> dict:
+    corpus = json.loads(args.corpus.read_text(encoding="utf-8"))
+    conversations = corpus["conversations"]
+    latency = _parse_latency(args.latency)
+
+    workdir = Path(tempfile.mkdtemp(prefix="homeai-replay-"))
+    _configure_environment(workdir)
+
+    import httpx
+
+    import app.models  # noqa: F401  (registers every table for create_all)
+    from app.core.database import Base, engine
+    from app.services import http_client, openai_client
+    from app.services.completion_cache import CompletionCache, completion_cache
+    from app.services.tool_registry import ToolRegistry, tool_registry
+
+    Base.metadata.create_all(engine)
+    synthetic = SyntheticData()
+    openai_replay = ReplayOpenAI(latency["openai"])
+    upstreams = ReplayUpstreams(corpus["upstreams"], latency)
+    http_client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(upstreams.handle))
+
+    submit, execute_async = ToolRegistry.submit, ToolRegistry.execute_async
+    cache_get = CompletionCache.get
+
+    def counting_cache_get(self, key):
+        response = cache_get(self, key)
+        if response is not None:
+            # A cached answer stands in for the recorded one.
+            session = _current_session()
+            session.llm_cache_hits += 1
+            if session.llm_responses:
+                session.llm_responses.pop(0)
+        return response
+
+    def counting_submit(self, name, args, *, user_id):
+        _current_session().tool_calls += 1
+        return submit(self, name, args, user_id=user_id)
+
+    async def counting_execute_async(self, name, args, *, user_id):
+        _current_session().tool_calls += 1
+        return await execute_async(self, name, args, user_id=user_id)
+
+    report = {
+        "commit": _git_commit(),
+        "corpus": str(args.corpus),
+        "config": {
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "latency_seconds": latency,
+            "conversations": len(conversations),
+            "turns_per_round": sum(len(c["turns"]) for c in conversations),
+        },
+        "modes": {},
+    }
+    with mock.patch("requests.get", upstreams.requests_get), mock.patch.object(
+        openai_client.client.chat.completions, "create", openai_replay.create
+    ), mock.patch.object(
+        openai_client.async_client.chat.completions, "create", openai_replay.acreate
+    ), mock.patch.object(ToolRegistry, "submit", counting_submit), mock.patch.object(
+        ToolRegistry, "execute_async", counting_execute_async
+    ), mock.patch.object(CompletionCache, "get", counting_cache_get):
+        for mode in args.modes:
+            # Every mode starts cold so the numbers are comparable.
+            completion_cache.clear()
+            tool_registry.clear_cache()
+            users = synthetic.seed(mode, args.concurrency, conversations)
+            start = time.perf_counter()
+            if mode == "sync":
+                results = run_sync(conversations, users, args.rounds)
+            else:
+                results = asyncio.run(
+                    run_app(conversations, users, args.rounds, stream=mode == "stream")
+                )
+            elapsed = time.perf_counter() - start
+            report["modes"][mode] = summarize(results, elapsed, args.concurrency)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded conversations through the agent.")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--concurrency", type=int, default=4, help="simulated concurrent users")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the corpus per user")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        metavar="UPSTREAM=SECONDS",
+        help=f"injected latency per call; upstreams: {', '.join(UPSTREAMS)}",
+    )
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    if args.baseline:
+        report["baseline_delta"] = compare(
+            report, json.loads(args.baseline.read_text(encoding="utf-8"))
+        )
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(encoded + "\n", encoding="utf-8")
+    else:
+        print(encoded)
+    print_summary(report)
@@ -0,0 +1,81 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+from app.services.non_property_intent import (
+    DOCUMENT_PATTERNS,
+    NON_PROPERTY_PATTERNS,
+    REMINDER_PATTERNS,
+    WEATHER_PATTERNS,
+    classify_message,
+)
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intent_messages.txt"
+
+
+def load_corpus(path: Path) -> list[str]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line for line in lines if line.strip() and not line.startswith("#")]
+
+
+# The per-pattern scans the classifier replaced, kept here for comparison.
+def _legacy_scan(message: str, patterns: list[str]) -> bool:
+    text = (message or "").lower().strip()
+    if not text:
+        return False
+    return any(re.search(p, text) for p in patterns)
+
+
+def legacy_route(message: str) -> dict:
+    """The three checks ``plan_agent_turn`` used to make per turn."""
+    return {
+        "document": _legacy_scan(message, DOCUMENT_PATTERNS),
+        "non_property": _legacy_scan(message, REMINDER_PATTERNS)
+        or _legacy_scan(message, NON_PROPERTY_PATTERNS),
+        "weather": _legacy_scan(message, WEATHER_PATTERNS),
+    }
+
+
+def classifier_route(message: str) -> dict:
+    labels = classify_message(message)["labels"]
+    return {
+        "document": "document" in labels,
+        "non_property": "non_property" in labels,
+        "weather": "weather" in labels,
+    }
+
+
+def _throughput(route, messages: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            route(message)
+    elapsed = time.perf_counter() - start
+    return rounds * len(messages) / elapsed
+
+
+def benchmark(corpus: Path, rounds: int) -> None:
+    """
+    Compare routing throughput of the per-pattern regex scans against the
+    single-pass classifier on a corpus of user messages, and check that both
+    route every message the same way.
+    """
+    messages = load_corpus(corpus)
+    mismatches = [m for m in messages if legacy_route(m) != classifier_route(m)]
+    for message in mismatches:
+        print(f"⚠️  Routing differs for: {message!r}")
+
+    legacy = _throughput(legacy_route, messages, rounds)
+    single_pass = _throughput(classifier_route, messages, rounds)
+    print(f"Corpus: {len(messages)} message(s) from {corpus}, {rounds} round(s)")
+    print(f"Per-pattern scans:  {legacy:>12,.0f} messages/s")
+    print(f"Single-pass:        {single_pass:>12,.0f} messages/s ({single_pass / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark intent classification throughput.")
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.corpus, args.rounds)
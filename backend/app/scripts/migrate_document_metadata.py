@@ -0,0 +1,17 @@
+from app.services.document_metadata import SQLiteDocumentMetadata
+from app.services.document_store import METADATA_DB_PATH, STORAGE_ROOT
+
+
+def migrate():
+    """
+    Import every storage/documents/<user_id>/index.json into the SQLite
+    metadata database. Safe to re-run; existing rows are skipped.
+    Set DOCUMENT_METADATA_BACKEND=sqlite afterwards to switch over.
+    """
+    metadata = SQLiteDocumentMetadata(METADATA_DB_PATH)
+    imported = metadata.import_json_indexes(STORAGE_ROOT)
+    print(f"✅ Imported {imported} document(s) into {METADATA_DB_PATH}.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,17 @@
+from app.services.document_store import document_store
+
+
+def rebuild():
+    """
+    Rebuild the BM25 search index for every user folder under storage/documents.
+    """
+    user_ids = document_store.list_user_ids()
+    for user_id in user_ids:
+        indexed = document_store.rebuild_search_index(user_id)
+        print(f"Indexed {indexed} document(s) for user {user_id}")
+
+    print(f"✅ Rebuilt search indexes for {len(user_ids)} user(s).")
+
+
+if __name__ == "__main__":
+    rebuild()
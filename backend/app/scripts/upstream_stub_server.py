@@ -0,0 +1,414 @@
+"""
+Local stand-in for every upstream the backend calls, for hermetic load tests.
+
+Serves the OpenAI chat-completions protocol (plain, tool-call and streaming
+responses picked by scripted rules) plus the OpenWebNinja
+``property-details-address``, Google Places ``textsearch``/``details`` and
+Open-Meteo ``forecast`` endpoints, each with configurable latency and error
+rate. It doesn't import the app, so it needs none of its settings.
+
+    python -m app.scripts.upstream_stub_server --port 8100 \
+        --latency openai=0.8 --latency zillow=0.3 --error-rate openai=0.01
+
+then start the backend with the upstreams pointed at it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 \
+    OPENWEBNINJA_BASE_URL=http://127.0.0.1:8100 \
+    GOOGLE_PLACES_BASE_URL=http://127.0.0.1:8100 \
+    OPEN_METEO_BASE_URL=http://127.0.0.1:8100 \
+    uvicorn app.main:app --workers 4
+
+Rules (``--rules rules.json``, default ``DEFAULT_RULES``) are tried in
+order against each chat request; the first match answers it:
+
+    {"pattern": "worth|value", "round": 0,
+     "tool_calls": [{"name": "get_home_value", "arguments": {"address": ""}}]}
+    {"round": 1, "content": "Here's what I found: {tool_results}"}
+
+``pattern`` is a case-insensitive regex searched in the user's message,
+``round`` the number of tool rounds already in the conversation. A
+``tool_calls`` rule is skipped when the request doesn't offer those tools
+or sets ``tool_choice`` to "none". ``{tool_results}`` in ``content`` expands
+to the latest tool outputs.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+UPSTREAMS = ("openai", "zillow", "google_places", "open_meteo")
+MAX_TOOL_RESULT_CHARS = 400
+
+DEFAULT_RULES = [
+    {
+        "pattern": r"\b(worth|value|zestimate|apprais)",
+        "round": 0,
+        "tool_calls": [{"name": "get_home_value", "arguments": {"address": ""}}],
+    },
+    {
+        "pattern": r"\b(roof(er|ing)?|leak)",
+        "round": 0,
+        "tool_calls": [
+            {"name": "get_local_services", "arguments": {"service": "roofer", "city_state": ""}}
+        ],
+    },
+    {
+        "pattern": r"\b(plumb(er|ing)?|clog|pipe)",
+        "round": 0,
+        "tool_calls": [
+            {"name": "get_local_services", "arguments": {"service": "plumber", "city_state": ""}}
+        ],
+    },
+    {
+        "pattern": r"\bremind me to (?P<task>.+)",
+        "round": 0,
+        "tool_calls": [
+            {"name": "remember_user_task", "arguments": {"description": "{task}"}}
+        ],
+    },
+    {"pattern": r"\b(document|pdf|report)s?\b", "round": 0,
+     "tool_calls": [{"name": "list_user_documents", "arguments": {}}]},
+    {"round": 1, "content": "Here's what I found:\n\n{tool_results}"},
+    {"content": "Happy to help with that. Could you tell me a bit more about what you need?"},
+]
+
+_ids = itertools.count(1)
+
+
+# ----------------------------
+# Chat completions
+# ----------------------------
+
+
+def _user_message(messages: list[dict]) -> str:
+    """The user's own message: the last user turn before any tool output."""
+    first_tool = next(
+        (index for index, message in enumerate(messages) if message.get("role") == "tool"),
+        len(messages),
+    )
+    for message in reversed(messages[:first_tool]):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+
+def _tool_round(messages: list[dict]) -> int:
+    return sum(1 for message in messages if message.get("role") == "assistant" and message.get("tool_calls"))
+
+
+def _latest_tool_results(messages: list[dict]) -> str:
+    results = []
+    for message in reversed(messages):
+        if message.get("role") == "tool":
+            results.append(str(message.get("content", ""))[:MAX_TOOL_RESULT_CHARS])
+        elif results:
+            break
+    return "\n\n".join(reversed(results))
+
+
+def _fill(value, groups: dict):
+    """Substitute named regex groups into a rule's (nested) arguments."""
+    if isinstance(value, str):
+        return value.format_map(_Defaults(groups))
+    if isinstance(value, dict):
+        return {key: _fill(item, groups) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, groups) for item in value]
+    return value
+
+
+class _Defaults(dict):
+    def __missing__(self, key):
+        return ""
+
+
+def choose_reply(rules: list[dict], request: dict) -> dict:
+    """{"content": str} or {"tool_calls": [...]} for a chat request."""
+    messages = request.get("messages", [])
+    text = _user_message(messages)
+    tool_round = _tool_round(messages)
+    offered = {
+        tool.get("function", {}).get("name") for tool in request.get("tools") or ()
+    }
+    tools_allowed = bool(offered) and request.get("tool_choice") != "none"
+
+    for rule in rules:
+        if "round" in rule and rule["round"] != tool_round:
+            continue
+        groups = {}
+        if rule.get("pattern"):
+            match = re.search(rule["pattern"], text, re.IGNORECASE)
+            if not match:
+                continue
+            groups = {key: value.strip() for key, value in match.groupdict().items() if value}
+        if rule.get("tool_calls"):
+            names = {call["name"] for call in rule["tool_calls"]}
+            if not tools_allowed or not names <= offered:
+                continue
+            return {"tool_calls": _fill(rule["tool_calls"], groups)}
+        groups["tool_results"] = _latest_tool_results(messages)
+        return {"content": _fill(rule.get("content", ""), groups)}
+    return {"content": "OK."}
+
+
+def _usage(request: dict, completion_text: str) -> dict:
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in request.get("messages", []))
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = max(1, len(completion_text) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _tool_call_payloads(calls: list[dict]) -> list[dict]:
+    return [
+        {
+            "id": f"call_stub_{next(_ids)}",
+            "type": "function",
+            "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+        }
+        for call in calls
+    ]
+
+
+def completion_response(request: dict, reply: dict) -> dict:
+    message = {"role": "assistant", "content": reply.get("content")}
+    if reply.get("tool_calls"):
+        message["tool_calls"] = _tool_call_payloads(reply["tool_calls"])
+    return {
+        "id": f"chatcmpl-stub-{next(_ids)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop",
+            }
+        ],
+        "usage": _usage(request, json.dumps(message)),
+    }
+
+
+async def stream_chunks(request: dict, reply: dict, chunk_delay: float):
+    """Server-sent ``chat.completion.chunk`` events for a reply."""
+    base = {
+        "id": f"chatcmpl-stub-{next(_ids)}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+    }
+
+    def event(delta: dict, finish_reason=None) -> str:
+        chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    if reply.get("tool_calls"):
+        for index, call in enumerate(_tool_call_payloads(reply["tool_calls"])):
+            arguments = call["function"]["arguments"]
+            middle = len(arguments) // 2
+            yield event(
+                {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "id": call["id"],
+                            "type": "function",
+                            "function": {"name": call["function"]["name"], "arguments": arguments[:middle]},
+                        }
+                    ]
+                }
+            )
+            yield event({"tool_calls": [{"index": index, "function": {"arguments": arguments[middle:]}}]})
+        finish_reason = "tool_calls"
+        text = json.dumps(reply["tool_calls"])
+    else:
+        text = reply.get("content") or ""
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            yield event({"content": piece})
+        finish_reason = "stop"
+    yield event({}, finish_reason)
+    if (request.get("stream_options") or {}).get("include_usage"):
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': _usage(request, text)})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+# ----------------------------
+# Upstream APIs
+# ----------------------------
+
+
+def _stable_number(seed: str, low: int, high: int) -> int:
+    digest = int(hashlib.sha256(seed.encode("utf-8")).hexdigest()[:8], 16)
+    return low + digest % (high - low)
+
+
+def property_details(address: str) -> dict:
+    return {
+        "status": "OK",
+        "data": {
+            "address": address,
+            "zestimate": _stable_number(address, 150_000, 1_200_000) // 100 * 100,
+            "bedrooms": _stable_number(address + "bd", 1, 6),
+            "bathrooms": _stable_number(address + "ba", 1, 4),
+            "yearBuilt": _stable_number(address + "yb", 1900, 2024),
+        },
+    }
+
+
+def text_search(query: str) -> dict:
+    service = query.split(" near ")[0].strip().title() or "Home Services"
+    return {
+        "status": "OK",
+        "results": [
+            {
+                "place_id": f"stub-{index}-{_stable_number(query, 1000, 9999)}",
+                "name": f"{name} {service}",
+                "formatted_address": f"{100 + index * 11} Main St",
+                "rating": round(4.0 + index * 0.2, 1),
+            }
+            for index, name in enumerate(("Acme", "Summit", "Keystone", "Northside", "Reliable"))
+        ],
+    }
+
+
+def place_details(place_id: str) -> dict:
+    return {
+        "status": "OK",
+        "result": {
+            "formatted_phone_number": f"(555) 01{_stable_number(place_id, 10, 99)}-{_stable_number(place_id + 'p', 1000, 9999)}",
+            "website": f"https://{place_id}.example.com",
+        },
+    }
+
+
+def forecast() -> dict:
+    return {
+        "current_weather": {
+            "temperature": 58.0,
+            "windspeed": 9.0,
+            "weathercode": 2,
+            "time": time.strftime("%Y-%m-%dT%H:00"),
+        }
+    }
+
+
+# ----------------------------
+# App
+# ----------------------------
+
+
+def create_app(
+    rules: list[dict],
+    latency: dict[str, float],
+    error_rate: dict[str, float],
+    jitter: float = 0.0,
+    chunk_delay: float = 0.0,
+    seed: int | None = None,
+) -> FastAPI:
+    app = FastAPI(title="HomeAI upstream stub")
+    rng = random.Random(seed)
+
+    async def simulate(upstream: str) -> JSONResponse | None:
+        """Wait out the configured latency; maybe return an injected error."""
+        delay = latency[upstream]
+        if jitter and delay:
+            delay *= 1 + rng.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < error_rate[upstream]:
+            return JSONResponse(
+                {"error": {"message": f"Injected {upstream} failure", "type": "server_error"}},
+                status_code=500,
+            )
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(http_request: Request):
+        request = await http_request.json()
+        error = await simulate("openai")
+        if error:
+            return error
+        reply = choose_reply(rules, request)
+        if request.get("stream"):
+            return StreamingResponse(
+                stream_chunks(request, reply, chunk_delay), media_type="text/event-stream"
+            )
+        return completion_response(request, reply)
+
+    @app.get("/realtime-zillow-data/property-details-address")
+    async def zillow_property_details(address: str = ""):
+        return await simulate("zillow") or property_details(address)
+
+    @app.get("/maps/api/place/textsearch/json")
+    async def places_text_search(query: str = ""):
+        return await simulate("google_places") or text_search(query)
+
+    @app.get("/maps/api/place/details/json")
+    async def places_details(place_id: str = ""):
+        return await simulate("google_places") or place_details(place_id)
+
+    @app.get("/v1/forecast")
+    async def open_meteo_forecast():
+        return await simulate("open_meteo") or forecast()
+
+    return app
+
+
+def _parse_per_upstream(values: list[str], option: str) -> dict[str, float]:
+    parsed = dict.fromkeys(UPSTREAMS, 0.0)
+    for value in values:
+        name, _, number = value.partition("=")
+        targets = UPSTREAMS if name == "all" else (name,)
+        for target in targets:
+            if target not in parsed:
+                raise SystemExit(f"{option}: unknown upstream {name!r}; expected all or one of {', '.join(UPSTREAMS)}")
+            parsed[target] = float(number)
+    return parsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stand-ins for OpenAI and the upstream APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--rules", type=Path, help="JSON list of chat rules (default: built-in)")
+    parser.add_argument(
+        "--latency", action="append", default=[], metavar="UPSTREAM=SECONDS",
+        help=f"added latency per call; UPSTREAM is all or one of {', '.join(UPSTREAMS)}",
+    )
+    parser.add_argument(
+        "--error-rate", action="append", default=[], metavar="UPSTREAM=FRACTION",
+        help="share of calls answered with HTTP 500",
+    )
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies by ± this fraction")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--seed", type=int, help="seed for jitter and error injection")
+    args = parser.parse_args()
+
+    rules = json.loads(args.rules.read_text(encoding="utf-8")) if args.rules else DEFAULT_RULES
+    app = create_app(
+        rules,
+        _parse_per_upstream(args.latency, "--latency"),
+        _parse_per_upstream(args.error_rate, "--error-rate"),
+        jitter=args.jitter,
+        chunk_delay=args.chunk_delay,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
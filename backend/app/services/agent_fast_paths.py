@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.services.agent_memory import memory as agent_memory
+from app.services.document_store import STATUS_FAILED, STATUS_PENDING, document_store
+from app.services.property_context import get_user_properties, serialize_property
+
+# Longer libraries are summarized as "...and N more" rather than dumped.
+MAX_LISTED_DOCUMENTS = 20
+
+
+def format_task_list(tasks: list[dict]) -> str:
+    open_tasks = [t["description"] for t in tasks if not t.get("completed")]
+    done_tasks = [t["description"] for t in tasks if t.get("completed")]
+    if not open_tasks and not done_tasks:
+        return (
+            "You don't have any reminders yet. Tell me something like "
+            "\"remind me to call the roofer\" and I'll keep track of it."
+        )
+
+    sections = []
+    if open_tasks:
+        sections.append(
+            "Here's what I'm tracking for you:\n"
+            + "\n".join(f"- {description}" for description in open_tasks)
+        )
+    else:
+        sections.append("You're all caught up—no open reminders.")
+    if done_tasks:
+        sections.append(
+            "Completed:\n" + "\n".join(f"- {description}" for description in done_tasks)
+        )
+    return "\n\n".join(sections)
+
+
+def _format_upload_date(uploaded_at: str | None) -> str:
+    try:
+        return datetime.fromisoformat(uploaded_at).strftime("%b %d, %Y")
+    except (TypeError, ValueError):
+        return ""
+
+
+def format_document_list(documents: list[dict], total: int) -> str:
+    if not total:
+        return (
+            "You haven't uploaded any documents yet. Add a PDF (an inspection "
+            "report, HOA rules, a warranty) and I can summarize or search it."
+        )
+
+    lines = []
+    for doc in documents:
+        line = f"- {doc.get('original_name', 'document.pdf')}"
+        uploaded = _format_upload_date(doc.get("uploaded_at"))
+        if uploaded:
+            line += f" (uploaded {uploaded})"
+        status = doc.get("status")
+        if status == STATUS_PENDING:
+            line += " — still processing"
+        elif status == STATUS_FAILED:
+            line += " — couldn't be read"
+        lines.append(line)
+    if total > len(documents):
+        lines.append(f"- ...and {total - len(documents)} more")
+
+    noun = "document" if total == 1 else "documents"
+    return f"You have {total} {noun} on file:\n" + "\n".join(lines)
+
+
+def format_property_list(properties: list[dict]) -> str:
+    if not properties:
+        return "You don't have any properties on file yet. Add one to get started."
+    noun = "property" if len(properties) == 1 else "properties"
+    return f"You have {len(properties)} {noun} on file:\n" + "\n".join(
+        f"- {p['address']}" for p in properties
+    )
+
+
+def answer_fast_path(db: Session, user_id: int, listing: str | None) -> dict | None:
+    """
+    Answer listing requests ("show my tasks", "list my documents", "which
+    properties do I have") straight from stored data with a templated reply.
+    ``listing`` is the label from ``classify_message``. Returns None when
+    the turn needs the model, otherwise {"reply", "active_property",
+    "all_properties"} for the response.
+    """
+    if listing == "task_list":
+        return {
+            "reply": format_task_list(agent_memory.get_tasks(user_id)),
+            "active_property": None,
+            "all_properties": [],
+        }
+
+    if listing == "document_list":
+        documents = document_store.list_documents(user_id, limit=MAX_LISTED_DOCUMENTS)
+        total = (
+            len(documents)
+            if len(documents) < MAX_LISTED_DOCUMENTS
+            else document_store.count_documents(user_id)
+        )
+        return {
+            "reply": format_document_list(documents, total),
+            "active_property": None,
+            "all_properties": [],
+        }
+
+    if listing == "property_list":
+        properties = [serialize_property(p) for p in get_user_properties(db, user_id)]
+        return {
+            "reply": format_property_list(properties),
+            "active_property": properties[0] if len(properties) == 1 else None,
+            "all_properties": properties,
+        }
+
+    return None
@@ -1,46 +1,213 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Protocol
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.database import SessionLocal
+from app.models.user_task import UserTask
+from app.services.session_state import SessionMap
+from app.services.task_index import normalize_description, task_indexes
+
+AGENT_MEMORY_BACKEND = os.getenv("AGENT_MEMORY_BACKEND", "database")
+
+# Task lists already read during the current turn, keyed by user_id.
+_TURN_SNAPSHOT: ContextVar[dict[int, list[dict]] | None] = ContextVar(
+    "agent_memory_turn_snapshot", default=None
+)
+
+
+class TaskStore(Protocol):
+    """Where AgentMemory keeps tasks: ordered {description, completed} dicts."""
+
+    def load(self, user_id: int) -> list[dict]: ...
+
+    def add(self, user_id: int, description: str) -> None: ...
+
+    def complete(self, user_id: int, description: str | None) -> None: ...
+
+
+class DatabaseTaskStore:
+    """
+    Tasks in the ``user_tasks`` table. The unique index on
+    (user_id, normalized_description) turns add into a single upsert and
+    complete into a single indexed UPDATE, and tasks survive restarts.
+    """
+
+    def __init__(self, session_factory=SessionLocal) -> None:
+        self.session_factory = session_factory
+
+    def load(self, user_id: int) -> list[dict]:
+        with self.session_factory() as db:
+            rows = (
+                db.query(UserTask.description, UserTask.completed)
+                .filter(UserTask.user_id == user_id)
+                .order_by(UserTask.id)
+                .all()
+            )
+        return [
+            {"description": description, "completed": completed}
+            for description, completed in rows
+        ]
+
+    def add(self, user_id: int, description: str) -> None:
+        values = {
+            "user_id": user_id,
+            "description": description,
+            "normalized_description": normalize_description(description),
+            "completed": False,
+            "completed_at": None,
+        }
+        with self.session_factory() as db:
+            dialect = db.get_bind().dialect.name
+            if dialect in ("postgresql", "sqlite"):
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                statement = insert(UserTask).values(**values)
+                db.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=["user_id", "normalized_description"],
+                        set_={
+                            "description": statement.excluded.description,
+                            "completed": False,
+                            "completed_at": None,
+                        },
+                    )
+                )
+            else:
+                task = (
+                    db.query(UserTask)
+                    .filter(
+                        UserTask.user_id == user_id,
+                        UserTask.normalized_description
+                        == values["normalized_description"],
+                    )
+                    .one_or_none()
+                )
+                if task is None:
+                    db.add(UserTask(**values))
+                else:
+                    task.description = description
+                    task.completed = False
+                    task.completed_at = None
+            db.commit()
+
+    def complete(self, user_id: int, description: str | None) -> None:
+        statement = update(UserTask).where(
+            UserTask.user_id == user_id, UserTask.completed.is_(False)
+        )
+        if description:
+            statement = statement.where(
+                UserTask.normalized_description == normalize_description(description)
+            )
+        with self.session_factory() as db:
+            db.execute(statement.values(completed=True, completed_at=func.now()))
+            db.commit()
+
+
+def _add_task(tasks: list[dict] | None, description: str) -> list[dict]:
+    tasks = tasks or []
+    normalized = normalize_description(description)
+    for task in tasks:
+        if normalize_description(task["description"]) == normalized:
+            task["description"] = description
+            task["completed"] = False
+            return tasks
+    tasks.append({"description": description, "completed": False})
+    return tasks
+
+
+def _complete_tasks(tasks: list[dict] | None, description: str | None) -> list[dict]:
+    tasks = tasks or []
+    normalized = normalize_description(description) if description else None
+    for task in tasks:
+        if not normalized or normalize_description(task["description"]) == normalized:
+            task["completed"] = True
+    return tasks
+
+
+class SessionTaskStore:
+    """Tasks kept in the session-state backend (see session_state.py)."""
+
+    def __init__(self) -> None:
+        self._tasks = SessionMap("agent_tasks", ttl=None)
+
+    def load(self, user_id: int) -> list[dict]:
+        return [task.copy() for task in self._tasks.get(user_id, [])]
+
+    def add(self, user_id: int, description: str) -> None:
+        self._tasks.update(user_id, lambda tasks: _add_task(tasks, description))
+
+    def complete(self, user_id: int, description: str | None) -> None:
+        if user_id in self._tasks:
+            self._tasks.update(user_id, lambda tasks: _complete_tasks(tasks, description))
 
 
 class AgentMemory:
     """
-    Simple in-memory task tracker keyed by user_id.
-    Intended as a lightweight placeholder until we persist to the DB.
+    Per-user follow-up tasks the agent remembers.
     Each task is stored with its completion status so we can render it later.
+
+    Inside ``turn_snapshot()`` a user's list is read from the store once and
+    shared by every code path that asks during that turn (routing, prompt,
+    response); writes drop the snapshot so the next read sees them. Each
+    call returns its own copies (the dicts are flat), so a caller editing a
+    task can't change the snapshot or the store.
     """
 
-    def __init__(self) -> None:
-        self._tasks: dict[int, list[dict[str, object]]] = defaultdict(list)
+    def __init__(self, store: TaskStore) -> None:
+        self.store = store
+
+    @contextmanager
+    def turn_snapshot(self) -> Iterator[None]:
+        token = _TURN_SNAPSHOT.set({})
+        try:
+            yield
+        finally:
+            try:
+                _TURN_SNAPSHOT.reset(token)
+            except ValueError:
+                # Exited from a different context (e.g. a closed generator).
+                _TURN_SNAPSHOT.set(None)
+
+    def _forget(self, user_id: int) -> None:
+        snapshot = _TURN_SNAPSHOT.get()
+        if snapshot is not None:
+            snapshot.pop(user_id, None)
 
     def add_task(self, user_id: int, description: str) -> None:
         description = description.strip()
         if not description:
             return
-        tasks = self._tasks[user_id]
-        for task in tasks:
-            if task["description"] == description:
-                task["completed"] = False
-                return
-
-        tasks.append({"description": description, "completed": False})
+        self.store.add(user_id, description)
+        self._forget(user_id)
+        task_indexes.task_added(user_id, description)
 
     def get_tasks(self, user_id: int) -> list[dict[str, object]]:
-        return [task.copy() for task in self._tasks.get(user_id, [])]
+        snapshot = _TURN_SNAPSHOT.get()
+        if snapshot is None:
+            return self.store.load(user_id)
+        tasks = snapshot.get(user_id)
+        if tasks is None:
+            tasks = self.store.load(user_id)
+            snapshot[user_id] = tasks
+        return [task.copy() for task in tasks]
 
     def complete_task(self, user_id: int, description: str | None = None) -> None:
-        if user_id not in self._tasks:
-            return
-
-        tasks = self._tasks[user_id]
         if description:
             description = description.strip()
-            for task in tasks:
-                if task["description"] == description:
-                    task["completed"] = True
-        else:
-            for task in tasks:
-                task["completed"] = True
+        self.store.complete(user_id, description)
+        self._forget(user_id)
+        task_indexes.task_completed(user_id, description)
+
+
+def _build_task_store() -> TaskStore:
+    if AGENT_MEMORY_BACKEND == "session":
+        return SessionTaskStore()
+    return DatabaseTaskStore()
 
 
-memory = AgentMemory()
+memory = AgentMemory(_build_task_store())
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from openai.types.chat import ChatCompletion
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import UPSTREAM_SECONDS, record_llm_usage, span
+from app.services.openai_client import async_client, client
+from app.services.prompt_builder import prompt_prefix_stats
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "storage/llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+# The SQLite store trims itself once per this many inserts, and only bumps
+# an entry's ``last_used`` when it is older than the resolution below.
+EVICT_EVERY_INSERTS = 64
+LAST_USED_RESOLUTION_SECONDS = 60.0
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _normalize_message(message: dict) -> dict:
+    normalized = dict(message)
+    if isinstance(normalized.get("content"), str):
+        normalized["content"] = _normalize_text(normalized["content"])
+    return normalized
+
+
+def completion_key(request: dict) -> str:
+    """
+    Fingerprint of a chat completion request: the model, the messages with
+    whitespace collapsed, a hash of the tool schemas and every other
+    parameter that changes the output (max_tokens, tool_choice, ...).
+    """
+    request = dict(request)
+    tools = request.pop("tools", None)
+    fingerprint = {
+        "model": request.pop("model", None),
+        "messages": [_normalize_message(m) for m in request.pop("messages", [])],
+        "tools": hashlib.sha256(
+            json.dumps(tools, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        if tools
+        else None,
+        "options": request,
+    }
+    encoded = json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class MemoryCompletionStore:
+    """Process-local LRU of serialized completions."""
+
+    name = "memory"
+    # Cheap enough to call straight from the event loop.
+    blocking = False
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, expires_at: float) -> int:
+        """Store an entry; returns how many entries were evicted."""
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCompletionStore:
+    """
+    Completions persisted in a local SQLite file (WAL), so the cache survives
+    restarts and is shared by every uvicorn worker on the host. Reads bump a
+    stale ``last_used``; every ``EVICT_EVERY_INSERTS`` inserts the least
+    recently used rows past the limit are trimmed, so the table can run that
+    many rows over ``max_entries`` in between.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS completions (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_completions_last_used ON completions (last_used)",
+    )
+
+    def __init__(self, db_path: Path, max_entries: int = LLM_CACHE_MAX_ENTRIES) -> None:
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._inserts = 0
+        self._inserts_lock = threading.Lock()
+        with self._connect() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at, last_used FROM completions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, last_used = row
+            if expires_at < now:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            # A hot key is read far more often than its LRU position needs
+            # refreshing; skipping the write keeps most hits read-only.
+            if now - last_used >= LAST_USED_RESOLUTION_SECONDS:
+                conn.execute(
+                    "UPDATE completions SET last_used = ? WHERE key = ?", (now, key)
+                )
+            return value
+
+    def put(self, key: str, value: str, expires_at: float) -> int:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()),
+            )
+            with self._inserts_lock:
+                self._inserts += 1
+                if self._inserts % EVICT_EVERY_INSERTS:
+                    return 0
+            cursor = conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+            return cursor.rowcount
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM completions")
+
+
+class CompletionCache:
+    """
+    Read-through cache for non-streaming chat completions.
+
+    Only cache requests whose answer depends on nothing but the request
+    itself; callers opt out (``cache=False``) for anything carrying tool
+    results or user-specific context. Hit/miss counters are per process.
+    """
+
+    def __init__(self, store, ttl: float = LLM_CACHE_TTL_SECONDS) -> None:
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += amount
+
+    def get(self, key: str) -> ChatCompletion | None:
+        value = self.store.get(key)
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return ChatCompletion.model_validate_json(value)
+
+    def put(self, key: str, response: ChatCompletion) -> None:
+        evicted = self.store.put(key, response.model_dump_json(), time.time() + self.ttl)
+        self._count("stores")
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "backend": self.store.name,
+            "entries": self.store.size(),
+            "ttl_seconds": self.ttl,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def _cacheable(request: dict, cache: bool) -> bool:
+    return cache and not request.get("stream")
+
+
+def record_usage(model: str, usage) -> None:
+    """Feed a completion's ``usage`` to the prompt-cache stats and metrics."""
+    prompt_prefix_stats.record_usage(usage)
+    record_llm_usage(model, usage)
+
+
+def _openai_span(request: dict):
+    # For streams this covers the wait for the first response bytes.
+    operation = "chat.completions.stream" if request.get("stream") else "chat.completions"
+    return span(UPSTREAM_SECONDS, upstream="openai", operation=operation)
+
+
+def create_completion(*, cache: bool = True, **request) -> ChatCompletion:
+    """``client.chat.completions.create`` behind the completion cache."""
+    if not _cacheable(request, cache):
+        with _openai_span(request):
+            response = client.chat.completions.create(**request)
+        if not request.get("stream"):
+            record_usage(request["model"], response.usage)
+        return response
+
+    key = completion_key(request)
+    cached = completion_cache.get(key)
+    if cached is not None:
+        return cached
+    with _openai_span(request):
+        response = client.chat.completions.create(**request)
+    record_usage(request["model"], response.usage)
+    completion_cache.put(key, response)
+    return response
+
+
+async def _off_loop(func, *args):
+    # SQLite reads and writes (and their lock waits) stay off the event loop.
+    if completion_cache.store.blocking:
+        return await run_in_threadpool(func, *args)
+    return func(*args)
+
+
+async def create_completion_async(*, cache: bool = True, **request) -> ChatCompletion:
+    """Async twin of ``create_completion`` on ``AsyncOpenAI``."""
+    if not _cacheable(request, cache):
+        with _openai_span(request):
+            response = await async_client.chat.completions.create(**request)
+        if not request.get("stream"):
+            record_usage(request["model"], response.usage)
+        return response
+
+    key = completion_key(request)
+    cached = await _off_loop(completion_cache.get, key)
+    if cached is not None:
+        return cached
+    with _openai_span(request):
+        response = await async_client.chat.completions.create(**request)
+    record_usage(request["model"], response.usage)
+    await _off_loop(completion_cache.put, key, response)
+    return response
+
+
+def _build_store():
+    if LLM_CACHE_BACKEND == "memory":
+        return MemoryCompletionStore()
+    return SQLiteCompletionStore(LLM_CACHE_PATH)
+
+
+completion_cache = CompletionCache(_build_store())
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from app.services.document_text import page_table_path
+from app.services.file_lock import file_lock
+
+
+class DocumentBlobStore:
+    """
+    Content-addressed storage for uploaded PDFs and everything derived from
+    their bytes, laid out as ``<root>/blobs/<sha[:2]>/<sha>/``:
+
+    - ``document.pdf`` / ``document.txt`` / ``document.pages``
+    - ``chunks.json`` + ``vectors.npy`` (semantic chunk embeddings)
+    - ``summary.txt`` (extractive summary)
+    - ``refs.json``: the "<user_id>:<document_id>" references pointing here
+
+    Re-uploading identical bytes reuses the stored PDF and its artifacts.
+    A blob is removed when its last reference goes away. Reference changes
+    hold a flock shared by every worker process; the lock files live outside
+    the blob directories (one per hash prefix) so deleting a blob never
+    deletes a lock someone is waiting on.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root / "blobs"
+
+    def blob_dir(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def pdf_path(self, sha256: str) -> Path:
+        return self.blob_dir(sha256) / "document.pdf"
+
+    def text_path(self, sha256: str) -> Path:
+        return self.blob_dir(sha256) / "document.txt"
+
+    def _lock(self, sha256: str):
+        return file_lock(self.root / "locks" / f"{sha256[:2]}.lock")
+
+    def _refs_path(self, sha256: str) -> Path:
+        return self.blob_dir(sha256) / "refs.json"
+
+    def _summary_path(self, sha256: str) -> Path:
+        return self.blob_dir(sha256) / "summary.txt"
+
+    def _embedding_paths(self, sha256: str) -> tuple[Path, Path]:
+        blob_dir = self.blob_dir(sha256)
+        return blob_dir / "chunks.json", blob_dir / "vectors.npy"
+
+    def staging_path(self) -> Path:
+        """A fresh path to stream an upload into before its hash is known."""
+        staging_dir = self.root / "staging"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        return staging_dir / f"{uuid.uuid4()}.part"
+
+    def adopt(
+        self, staged_path: Path, sha256: str, user_id: int, document_id: str
+    ) -> bool:
+        """
+        Move a fully written upload into place under its hash and reference
+        it from ``document_id``, as one step so a concurrent ``release``
+        can't delete the blob in between. Returns False (and discards the
+        staged copy) if the blob already existed.
+        """
+        with self._lock(sha256):
+            pdf_path = self.pdf_path(sha256)
+            created = not pdf_path.exists()
+            if created:
+                pdf_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged_path, pdf_path)
+            else:
+                staged_path.unlink()
+            self._add_ref(sha256, user_id, document_id)
+            return created
+
+    def has_text(self, sha256: str) -> bool:
+        # The page table is written last, so a half-extracted text (still
+        # carrying its .progress checkpoint) doesn't count.
+        return page_table_path(self.text_path(sha256)).exists()
+
+    def _read_refs(self, sha256: str) -> list[str]:
+        try:
+            return json.loads(self._refs_path(sha256).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _write_refs(self, sha256: str, refs: list[str]) -> None:
+        refs_path = self._refs_path(sha256)
+        tmp_path = refs_path.with_name(f".refs.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps(refs), encoding="utf-8")
+        os.replace(tmp_path, refs_path)
+
+    def _add_ref(self, sha256: str, user_id: int, document_id: str) -> int:
+        ref = f"{user_id}:{document_id}"
+        refs = self._read_refs(sha256)
+        if ref not in refs:
+            refs.append(ref)
+            self._write_refs(sha256, refs)
+        return len(refs)
+
+    def release(self, sha256: str, user_id: int, document_id: str) -> int:
+        """Drop a reference; delete the blob once nothing points at it."""
+        ref = f"{user_id}:{document_id}"
+        with self._lock(sha256):
+            refs = [r for r in self._read_refs(sha256) if r != ref]
+            if refs:
+                self._write_refs(sha256, refs)
+            else:
+                shutil.rmtree(self.blob_dir(sha256), ignore_errors=True)
+            return len(refs)
+
+    def save_embeddings(
+        self, sha256: str, chunks: list[dict], vectors: np.ndarray
+    ) -> None:
+        chunks_path, vectors_path = self._embedding_paths(sha256)
+        if not chunks_path.parent.exists():
+            return
+        with vectors_path.open("wb") as buffer:
+            np.save(buffer, vectors)
+        chunks_path.write_text(json.dumps(chunks, separators=(",", ":")), encoding="utf-8")
+
+    def save_summary(self, sha256: str, summary: str) -> None:
+        summary_path = self._summary_path(sha256)
+        if summary_path.parent.exists():
+            summary_path.write_text(summary, encoding="utf-8")
+
+    def load_summary(self, sha256: str) -> str | None:
+        try:
+            return self._summary_path(sha256).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def load_embeddings(self, sha256: str) -> tuple[list[dict], np.ndarray] | None:
+        chunks_path, vectors_path = self._embedding_paths(sha256)
+        if not chunks_path.exists() or not vectors_path.exists():
+            return None
+        try:
+            chunks = json.loads(chunks_path.read_text(encoding="utf-8"))
+            vectors = np.load(vectors_path)
+        except (ValueError, OSError):
+            return None
+        if len(chunks) != len(vectors):
+            return None
+        return chunks, vectors
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Iterable
+
+from app.services.document_metadata import INDEX_CACHE_SIZE
+from app.services.file_lock import file_lock
+
+# (start byte offset within the document's .txt, text) for one page.
+Segment = tuple[int, str]
+
+TOKEN_PATTERN = re.compile(rb"[a-z0-9]+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str, base_offset: int = 0) -> list[tuple[str, int]]:
+    """
+    Split text into lowercase alphanumeric terms.
+    Returns (term, UTF-8 byte offset) pairs so postings can point straight
+    into the memory-mapped ``.txt`` (bytes.lower() only touches ASCII, so
+    offsets line up with the stored file). ``base_offset`` is where ``text``
+    starts within that file, for tokenizing one page at a time.
+    """
+    encoded = (text or "").encode("utf-8").lower()
+    return [
+        (match.group().decode("ascii"), base_offset + match.start())
+        for match in TOKEN_PATTERN.finditer(encoded)
+    ]
+
+
+class DocumentSearchIndex:
+    """
+    Per-user inverted index over extracted document text, scored with BM25.
+
+    Each user's index lives next to their documents as ``search_index.json``:
+    - ``postings`` maps term -> {document_id: [byte offsets into the .txt]}
+    - ``documents`` maps document_id -> {"length": token count, "terms": [...]}
+    The ``terms`` list lets us drop a document's postings without a full scan.
+    Parsed indexes are kept in a bounded LRU and re-read when the file's
+    mtime/size changes, so searches never re-read the text files and a
+    worker never searches (or writes back) a stale copy. Updates hold a
+    per-user file lock across the read-modify-write and replace the file
+    atomically, so concurrent uvicorn workers don't drop each other's
+    documents.
+    """
+
+    def __init__(self, root: Path, max_users: int = INDEX_CACHE_SIZE) -> None:
+        self.root = root
+        self.max_users = max(1, max_users)
+        # user_id -> ((mtime_ns, size) of the file it was read from, index)
+        self._indexes: OrderedDict[int, tuple[tuple[int, int] | None, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / "search_index.json"
+
+    def _lock_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / "search_index.lock"
+
+    def _empty_index(self) -> dict:
+        return {"documents": {}, "postings": {}, "total_length": 0}
+
+    def _signature(self, index_path: Path) -> tuple[int, int] | None:
+        try:
+            stat = index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cache(self, user_id: int, signature: tuple[int, int] | None, index: dict) -> None:
+        self._indexes[user_id] = (signature, index)
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+
+    def _load(self, user_id: int) -> dict:
+        index_path = self._index_path(user_id)
+        signature = self._signature(index_path)
+        cached = self._indexes.get(user_id)
+        if cached is not None and cached[0] == signature:
+            self._indexes.move_to_end(user_id)
+            return cached[1]
+
+        index = self._empty_index()
+        if signature is not None:
+            try:
+                index = json.loads(index_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                index = self._empty_index()
+
+        self._cache(user_id, signature, index)
+        return index
+
+    def _save(self, user_id: int, index: dict) -> None:
+        index_path = self._index_path(user_id)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=index_path.parent, prefix=".search_index.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as buffer:
+                json.dump(index, buffer, separators=(",", ":"))
+            os.replace(tmp_name, index_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            # The cached copy may hold the unsaved change; re-read next time.
+            self._indexes.pop(user_id, None)
+            raise
+
+        self._cache(user_id, self._signature(index_path), index)
+
+    def _remove(self, index: dict, document_id: str) -> bool:
+        doc_entry = index["documents"].pop(document_id, None)
+        if doc_entry is None:
+            return False
+
+        index["total_length"] -= doc_entry["length"]
+        postings = index["postings"]
+        for term in doc_entry["terms"]:
+            term_postings = postings.get(term)
+            if not term_postings:
+                continue
+            term_postings.pop(document_id, None)
+            if not term_postings:
+                del postings[term]
+        return True
+
+    def _add(self, index: dict, document_id: str, segments: Iterable[Segment]) -> None:
+        self._remove(index, document_id)
+
+        positions: dict[str, list[int]] = {}
+        length = 0
+        for base_offset, text in segments:
+            tokens = tokenize(text, base_offset)
+            length += len(tokens)
+            for term, offset in tokens:
+                positions.setdefault(term, []).append(offset)
+
+        postings = index["postings"]
+        for term, offsets in positions.items():
+            postings.setdefault(term, {})[document_id] = offsets
+
+        index["documents"][document_id] = {
+            "length": length,
+            "terms": list(positions),
+        }
+        index["total_length"] += length
+
+    def add_document(
+        self, user_id: int, document_id: str, segments: Iterable[Segment]
+    ) -> None:
+        """Index a document fed page by page as (byte offset, text) segments."""
+        with self._lock, file_lock(self._lock_path(user_id)):
+            index = self._load(user_id)
+            self._add(index, document_id, segments)
+            self._save(user_id, index)
+
+    def remove_document(self, user_id: int, document_id: str) -> None:
+        with self._lock, file_lock(self._lock_path(user_id)):
+            index = self._load(user_id)
+            if self._remove(index, document_id):
+                self._save(user_id, index)
+
+    def rebuild(
+        self, user_id: int, documents: Iterable[tuple[str, Iterable[Segment]]]
+    ) -> int:
+        """
+        Replace a user's index with one built from (document_id, segments) pairs.
+        Returns the number of documents indexed.
+        """
+        with self._lock, file_lock(self._lock_path(user_id)):
+            index = self._empty_index()
+            for document_id, segments in documents:
+                self._add(index, document_id, segments)
+            self._save(user_id, index)
+            return len(index["documents"])
+
+    def search(self, user_id: int, query: str, limit: int = 5) -> list[dict]:
+        """
+        Rank the user's documents for ``query`` with BM25.
+        Each hit carries the offset of its densest cluster of query terms
+        so callers can cut a snippet around the most relevant passage.
+        """
+        query_terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            index = self._load(user_id)
+            documents = index["documents"]
+            doc_count = len(documents)
+            if not doc_count:
+                return []
+            avg_length = (index["total_length"] / doc_count) or 1.0
+
+            scores: Counter[str] = Counter()
+            hit_offsets: dict[str, list[int]] = {}
+            for term in query_terms:
+                term_postings = index["postings"].get(term)
+                if not term_postings:
+                    continue
+                doc_freq = len(term_postings)
+                idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+                for document_id, offsets in term_postings.items():
+                    term_freq = len(offsets)
+                    length_norm = 1 - BM25_B + BM25_B * (
+                        documents[document_id]["length"] / avg_length
+                    )
+                    scores[document_id] += idf * (
+                        term_freq * (BM25_K1 + 1) / (term_freq + BM25_K1 * length_norm)
+                    )
+                    hit_offsets.setdefault(document_id, []).extend(offsets)
+
+        results = []
+        for document_id, score in scores.most_common(limit):
+            results.append(
+                {
+                    "document_id": document_id,
+                    "score": round(score, 4),
+                    "offset": _densest_offset(hit_offsets[document_id]),
+                }
+            )
+        return results
+
+
+def _densest_offset(offsets: list[int], window: int = 320) -> int:
+    """Return the offset that starts the window containing the most query-term hits."""
+    offsets = sorted(offsets)
+    best_offset = offsets[0]
+    best_count = 0
+    end = 0
+    for start, offset in enumerate(offsets):
+        while end < len(offsets) and offsets[end] - offset <= window:
+            end += 1
+        if end - start > best_count:
+            best_count = end - start
+            best_offset = offset
+    return best_offset
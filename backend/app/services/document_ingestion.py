@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from app.core.metrics import DOCUMENT_STAGE_SECONDS, observe, span
+from app.services.document_store import DocumentStore, document_store
+from app.services.document_summary import summarize_document
+from app.services.document_text import DocumentText
+from app.services.document_vectors import embed_document
+from app.services.pdf_extraction import extract_pdf_to_text
+
+INGEST_WORKERS = int(os.getenv("DOCUMENT_INGEST_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_document(pdf_path: str, text_path: str):
+    """
+    Worker-process job: stream the PDF's text to ``text_path`` page by page
+    (resuming from a checkpoint if a previous worker died part-way), then
+    compute chunk embeddings and the extractive summary, so the parent only
+    has to update the indexes. Returns (extraction result, embeddings);
+    the result's ``timings`` carry each stage's seconds back to the parent,
+    since metrics recorded in a worker process would never be scraped.
+    """
+    started = time.perf_counter()
+    extraction = extract_pdf_to_text(pdf_path, text_path)
+    extracted = time.perf_counter()
+    if extraction.get("reused"):
+        # Another process extracted these bytes while we waited for the
+        # lock; the parent finishes from the blob's saved artifacts.
+        extraction["timings"] = {"extract": extracted - started}
+        return extraction, None
+    with DocumentText(Path(text_path)) as text:
+        extraction["summary"] = summarize_document(text)
+        summarized = time.perf_counter()
+        embeddings = embed_document(text)
+    extraction["timings"] = {
+        "extract": extracted - started,
+        "summarize": summarized - extracted,
+        "embed": time.perf_counter() - summarized,
+    }
+    return extraction, embeddings
+
+
+class DocumentIngestionPool:
+    """
+    Runs CPU-bound PDF text extraction in a bounded pool of worker processes
+    so uploads return immediately and extraction never competes with request
+    handling for the GIL. Results are written back through the DocumentStore,
+    which flips the document from ``pending`` to ``ready`` or ``failed``.
+
+    Identical uploads share one blob text, so each text path has at most one
+    job in flight: documents submitted while it runs wait for it and are
+    finished from its output instead of queueing a second extraction.
+    """
+
+    def __init__(self, store: DocumentStore, max_workers: int = INGEST_WORKERS) -> None:
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # text path -> running extraction. Re-entrant because a job that is
+        # already done runs its callback inline while we still hold it.
+        self._in_flight: dict[str, Future] = {}
+        self._in_flight_lock = threading.RLock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the app (alembic, scripts, reloader)
+        # doesn't spin up worker processes. "spawn" avoids forking a
+        # multi-threaded server process.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def submit(self, user_id: int, document_id: str) -> Future | None:
+        """
+        Queue a pending document's extraction. Returns None if it couldn't
+        be queued, including when another live worker has already claimed it.
+        """
+        if not self.store.claim_ingestion(user_id, document_id):
+            return None
+        paths = self.store.get_ingestion_paths(user_id, document_id)
+        if not paths:
+            self.store.fail_ingestion(user_id, document_id, "Stored PDF is missing.")
+            return None
+        pdf_path, text_path = (str(path) for path in paths)
+
+        with self._in_flight_lock:
+            running = self._in_flight.get(text_path)
+            if running is None:
+                future = self._start(pdf_path, text_path)
+                self._in_flight[text_path] = future
+                # Registered under the lock so it runs before any follower's.
+                future.add_done_callback(
+                    lambda done: self._finish(user_id, document_id, text_path, done)
+                )
+                return future
+
+        follower: Future = Future()
+        running.add_done_callback(
+            lambda done: self._follow(user_id, document_id, done, follower)
+        )
+        return follower
+
+    def _start(self, pdf_path: str, text_path: str) -> Future:
+        try:
+            return self._get_executor().submit(prepare_document, pdf_path, text_path)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge PDF); start a fresh pool.
+            self.shutdown(wait=False)
+            return self._get_executor().submit(prepare_document, pdf_path, text_path)
+
+    def _finish(
+        self, user_id: int, document_id: str, text_path: str, future: Future
+    ) -> None:
+        try:
+            self._store_result(user_id, document_id, future)
+        finally:
+            with self._in_flight_lock:
+                if self._in_flight.get(text_path) is future:
+                    del self._in_flight[text_path]
+
+    def _store_result(self, user_id: int, document_id: str, future: Future) -> None:
+        try:
+            extraction, embeddings = future.result()
+        except Exception as exc:
+            logger.warning("Extraction failed for document %s: %s", document_id, exc)
+            self.store.fail_ingestion(user_id, document_id, "Unable to extract text from this PDF.")
+            return
+
+        for stage, seconds in extraction.pop("timings", {}).items():
+            observe(DOCUMENT_STAGE_SECONDS, seconds, stage=stage)
+        try:
+            with span(DOCUMENT_STAGE_SECONDS, stage="index"):
+                if extraction.get("reused"):
+                    self.store.complete_from_existing_text(user_id, document_id)
+                else:
+                    self.store.complete_ingestion(
+                        user_id, document_id, extraction, embeddings
+                    )
+        except Exception:
+            logger.exception("Failed to store extracted text for document %s", document_id)
+            self.store.fail_ingestion(user_id, document_id, "Unable to store extracted text.")
+
+    def _follow(
+        self, user_id: int, document_id: str, leader: Future, follower: Future
+    ) -> None:
+        """Finish a document that waited on another job for the same blob."""
+        try:
+            if leader.cancelled() or leader.exception() is not None:
+                self.store.fail_ingestion(
+                    user_id, document_id, "Unable to extract text from this PDF."
+                )
+                return
+            with span(DOCUMENT_STAGE_SECONDS, stage="index"):
+                self.store.complete_from_existing_text(user_id, document_id)
+        except Exception:
+            logger.exception("Failed to store extracted text for document %s", document_id)
+            self.store.fail_ingestion(user_id, document_id, "Unable to store extracted text.")
+        finally:
+            follower.set_result(None)
+
+    def resume_pending(self) -> int:
+        """
+        Re-queue documents left ``pending`` by a previous process. Every
+        uvicorn worker runs this at startup; ``submit`` claims each document
+        first, so only one of them extracts it. Returns how many were queued.
+        """
+        resumed = 0
+        for user_id, document_id in self.store.list_pending_documents():
+            if self.submit(user_id, document_id) is not None:
+                resumed += 1
+        return resumed
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+ingestion_pool = DocumentIngestionPool(document_store)
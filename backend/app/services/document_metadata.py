@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.services.file_lock import file_lock
+
+INDEX_CACHE_SIZE = int(os.getenv("DOCUMENT_INDEX_CACHE_SIZE", "256"))
+
+
+def _newest_first(docs: list[dict]) -> list[dict]:
+    return sorted(docs, key=lambda d: d.get("uploaded_at", ""), reverse=True)
+
+
+class _IndexSnapshot:
+    """
+    Parsed view of one user's index.json as of a given (mtime, size) signature.
+    Snapshots are shared between requests, so treat them as read-only.
+    """
+
+    __slots__ = ("signature", "docs", "by_id", "_newest_first")
+
+    def __init__(self, signature: tuple[int, int] | None, docs: list[dict]) -> None:
+        self.signature = signature
+        self.docs = docs
+        self.by_id = {doc.get("id"): doc for doc in docs}
+        self._newest_first: list[dict] | None = None
+
+    def newest_first(self) -> list[dict]:
+        if self._newest_first is None:
+            self._newest_first = _newest_first(self.docs)
+        return self._newest_first
+
+
+class _IndexCache:
+    """Process-wide LRU of index snapshots keyed by user_id."""
+
+    def __init__(self, max_entries: int = INDEX_CACHE_SIZE) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[int, _IndexSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, signature: tuple[int, int] | None) -> _IndexSnapshot | None:
+        with self._lock:
+            snapshot = self._entries.get(user_id)
+            if snapshot is None or snapshot.signature != signature:
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, user_id: int, snapshot: _IndexSnapshot) -> None:
+        with self._lock:
+            self._entries[user_id] = snapshot
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class JsonIndexMetadata:
+    """
+    Document metadata stored as one ``index.json`` array per user folder.
+
+    Parsed indexes are cached per process and re-read only when the file's
+    mtime/size changes. Writes go to a temp file that is renamed into place so
+    readers never observe a half-written index, and hold a per-user flock so
+    read-modify-write cycles from different uvicorn workers don't lose
+    each other's changes.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._lock = threading.RLock()
+        self._cache = _IndexCache()
+
+    def _index_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / "index.json"
+
+    def _write_lock(self, user_id: int):
+        return file_lock(self.root / str(user_id) / "index.lock")
+
+    def _signature(self, index_path: Path) -> tuple[int, int] | None:
+        try:
+            stat = index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _snapshot(self, user_id: int) -> _IndexSnapshot:
+        index_path = self._index_path(user_id)
+        signature = self._signature(index_path)
+        snapshot = self._cache.get(user_id, signature)
+        if snapshot is not None:
+            return snapshot
+
+        docs: list[dict] = []
+        if signature is not None:
+            try:
+                docs = json.loads(index_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                docs = []
+
+        snapshot = _IndexSnapshot(signature, docs)
+        self._cache.put(user_id, snapshot)
+        return snapshot
+
+    def _load(self, user_id: int) -> list[dict]:
+        """Return a private, mutable copy of the index for read-modify-write."""
+        return [dict(doc) for doc in self._snapshot(user_id).docs]
+
+    def _save(self, user_id: int, docs: list[dict]) -> None:
+        index_path = self._index_path(user_id)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            dir=index_path.parent, prefix=".index.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as buffer:
+                json.dump(docs, buffer, separators=(",", ":"))
+            os.replace(tmp_name, index_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        self._cache.put(user_id, _IndexSnapshot(self._signature(index_path), docs))
+
+    def _user_ids(self) -> list[int]:
+        if not self.root.exists():
+            return []
+        return sorted(
+            int(path.name)
+            for path in self.root.iterdir()
+            if path.is_dir() and path.name.isdigit()
+        )
+
+    def insert(self, user_id: int, doc: dict) -> None:
+        with self._lock, self._write_lock(user_id):
+            docs = self._load(user_id)
+            docs.append(doc)
+            self._save(user_id, docs)
+
+    def update(self, user_id: int, document_id: str, **changes) -> dict | None:
+        return self.update_if(user_id, document_id, {}, **changes)
+
+    def update_if(
+        self, user_id: int, document_id: str, expected: dict, **changes
+    ) -> dict | None:
+        """Apply ``changes`` only while every ``expected`` field still matches."""
+        with self._lock, self._write_lock(user_id):
+            docs = self._load(user_id)
+            for doc in docs:
+                if doc.get("id") == document_id:
+                    if any(doc.get(key) != value for key, value in expected.items()):
+                        return None
+                    doc.update(changes)
+                    self._save(user_id, docs)
+                    return dict(doc)
+        return None
+
+    def delete(self, user_id: int, document_id: str) -> dict | None:
+        with self._lock, self._write_lock(user_id):
+            docs = self._load(user_id)
+            remaining = [doc for doc in docs if doc.get("id") != document_id]
+            if len(remaining) == len(docs):
+                return None
+            self._save(user_id, remaining)
+            return next(doc for doc in docs if doc.get("id") == document_id)
+
+    def get(self, user_id: int, document_id: str) -> dict | None:
+        doc = self._snapshot(user_id).by_id.get(document_id)
+        return dict(doc) if doc else None
+
+    def list_documents(self, user_id: int, limit: int | None = None, offset: int = 0) -> list[dict]:
+        docs = self._snapshot(user_id).newest_first()
+        end = None if limit is None else offset + limit
+        return docs[offset:end]
+
+    def count_documents(self, user_id: int) -> int:
+        return len(self._snapshot(user_id).docs)
+
+    def find_by_status(self, status: str) -> list[tuple[int, str]]:
+        return [
+            (user_id, doc["id"])
+            for user_id in self._user_ids()
+            for doc in self._snapshot(user_id).docs
+            if doc.get("status") == status
+        ]
+
+
+class SQLiteDocumentMetadata:
+    """
+    Document metadata kept in a local SQLite database in WAL mode.
+
+    Every row stores the full metadata dict as JSON alongside the indexed
+    columns we filter and sort on, so new metadata fields don't need a schema
+    change. WAL lets readers proceed while another uvicorn worker writes, and
+    the (user_id, uploaded_at) index keeps listing and pagination O(log n).
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            uploaded_at TEXT NOT NULL,
+            status TEXT,
+            data TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_documents_user_uploaded "
+        "ON documents (user_id, uploaded_at)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_status ON documents (status)",
+    )
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per
+        # thread (request threadpool, ingestion callbacks).
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, conn: sqlite3.Connection, user_id: int, doc: dict) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (id, user_id, uploaded_at, status, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                doc["id"],
+                user_id,
+                doc.get("uploaded_at", ""),
+                doc.get("status"),
+                json.dumps(doc, separators=(",", ":")),
+            ),
+        )
+
+    def insert(self, user_id: int, doc: dict) -> None:
+        with self._connect() as conn:
+            self._write(conn, user_id, doc)
+
+    def update(self, user_id: int, document_id: str, **changes) -> dict | None:
+        return self.update_if(user_id, document_id, {}, **changes)
+
+    def update_if(
+        self, user_id: int, document_id: str, expected: dict, **changes
+    ) -> dict | None:
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so concurrent read-modify-write
+            # cycles from other workers serialize instead of losing updates.
+            conn.execute("BEGIN IMMEDIATE")
+            doc = self._get(conn, user_id, document_id)
+            if doc is None:
+                return None
+            if any(doc.get(key) != value for key, value in expected.items()):
+                return None
+            doc.update(changes)
+            self._write(conn, user_id, doc)
+        return doc
+
+    def delete(self, user_id: int, document_id: str) -> dict | None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            doc = self._get(conn, user_id, document_id)
+            if doc is None:
+                return None
+            conn.execute(
+                "DELETE FROM documents WHERE id = ? AND user_id = ?",
+                (document_id, user_id),
+            )
+        return doc
+
+    def _get(self, conn: sqlite3.Connection, user_id: int, document_id: str) -> dict | None:
+        row = conn.execute(
+            "SELECT data FROM documents WHERE id = ? AND user_id = ?",
+            (document_id, user_id),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, user_id: int, document_id: str) -> dict | None:
+        return self._get(self._connect(), user_id, document_id)
+
+    def list_documents(self, user_id: int, limit: int | None = None, offset: int = 0) -> list[dict]:
+        rows = self._connect().execute(
+            "SELECT data FROM documents WHERE user_id = ? "
+            "ORDER BY uploaded_at DESC LIMIT ? OFFSET ?",
+            (user_id, -1 if limit is None else limit, offset),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_documents(self, user_id: int) -> int:
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM documents WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0]
+
+    def find_by_status(self, status: str) -> list[tuple[int, str]]:
+        rows = self._connect().execute(
+            "SELECT user_id, id FROM documents WHERE status = ?", (status,)
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def import_json_indexes(self, root: Path) -> int:
+        """
+        Copy every ``<root>/<user_id>/index.json`` into the database.
+        Rows that already exist are left alone, so the import can be re-run.
+        Returns the number of documents imported.
+        """
+        imported = 0
+        source = JsonIndexMetadata(root)
+        conn = self._connect()
+        for user_id in source._user_ids():
+            docs = source._snapshot(user_id).docs
+            with conn:
+                for doc in docs:
+                    if not doc.get("id"):
+                        continue
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO documents "
+                        "(id, user_id, uploaded_at, status, data) VALUES (?, ?, ?, ?, ?)",
+                        (
+                            doc["id"],
+                            user_id,
+                            doc.get("uploaded_at", ""),
+                            doc.get("status"),
+                            json.dumps(doc, separators=(",", ":")),
+                        ),
+                    )
+                    imported += cursor.rowcount
+        return imported
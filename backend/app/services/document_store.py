@@ -1,138 +1,514 @@
 from __future__ import annotations
 
-import json
+import hashlib
+import io
 import os
+import socket
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Iterator, Protocol
 
-from pypdf import PdfReader
+import numpy as np
+
+from app.core.metrics import DOCUMENT_STAGE_SECONDS, span
+from app.services.document_blobs import DocumentBlobStore
+from app.services.document_index import DocumentSearchIndex
+from app.services.document_metadata import JsonIndexMetadata, SQLiteDocumentMetadata
+from app.services.document_summary import summarize_document
+from app.services.document_text import DocumentText, page_table_path
+from app.services.document_vectors import DocumentVectorIndex, embed_document
+from app.services.pdf_extraction import extract_pdf_to_text, extraction_lock_path
 
 STORAGE_ROOT = Path(os.getenv("DOCUMENT_STORAGE_PATH", "storage/documents"))
 
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+PREVIEW_UNAVAILABLE = "Text preview unavailable."
+
+PDF_MAGIC = b"%PDF-"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("DOCUMENT_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+METADATA_BACKEND = os.getenv("DOCUMENT_METADATA_BACKEND", "json")
+METADATA_DB_PATH = Path(
+    os.getenv("DOCUMENT_METADATA_DB", str(STORAGE_ROOT / "metadata.sqlite3"))
+)
+
+
+class DocumentUploadError(ValueError):
+    """Raised when an upload is rejected before it is stored."""
+
+
+class DocumentTooLargeError(DocumentUploadError):
+    pass
+
+
+class DocumentMetadataBackend(Protocol):
+    """Where DocumentStore keeps per-document metadata (see document_metadata.py)."""
+
+    def insert(self, user_id: int, doc: dict) -> None: ...
+
+    def update(self, user_id: int, document_id: str, **changes) -> dict | None: ...
+
+    def update_if(
+        self, user_id: int, document_id: str, expected: dict, **changes
+    ) -> dict | None: ...
+
+    def delete(self, user_id: int, document_id: str) -> dict | None: ...
+
+    def get(self, user_id: int, document_id: str) -> dict | None: ...
+
+    def list_documents(
+        self, user_id: int, limit: int | None = None, offset: int = 0
+    ) -> list[dict]: ...
+
+    def count_documents(self, user_id: int) -> int: ...
+
+    def find_by_status(self, status: str) -> list[tuple[int, str]]: ...
+
+
+def _ingestion_owner() -> str:
+    # Read per call: workers forked from a preloaded app share import-time state.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        # Another host's processes can't be checked; leave its claims alone.
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
 
 class DocumentStore:
-    def __init__(self, root: Path = STORAGE_ROOT) -> None:
+    def __init__(
+        self,
+        root: Path = STORAGE_ROOT,
+        metadata: DocumentMetadataBackend | None = None,
+    ) -> None:
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
+        self.metadata = metadata or JsonIndexMetadata(root)
+        self.search_index = DocumentSearchIndex(root)
+        self.vector_index = DocumentVectorIndex(root)
+        self.blobs = DocumentBlobStore(root)
 
     def _user_dir(self, user_id: int) -> Path:
         path = self.root / str(user_id)
         path.mkdir(parents=True, exist_ok=True)
         return path
 
-    def _index_path(self, user_id: int) -> Path:
-        return self._user_dir(user_id) / "index.json"
-
-    def _load_index(self, user_id: int) -> list[dict]:
-        index_path = self._index_path(user_id)
-        if not index_path.exists():
-            return []
+    def _extract_text(self, pdf_path: Path, text_path: Path) -> dict | None:
         try:
-            return json.loads(index_path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return []
+            with span(DOCUMENT_STAGE_SECONDS, stage="extract"):
+                return extract_pdf_to_text(pdf_path, text_path)
+        except Exception:
+            return None
+
+    def _pdf_path(self, user_id: int, doc: dict) -> Path:
+        # Documents uploaded before content addressing live in the user folder.
+        if doc.get("blob"):
+            return self.blobs.pdf_path(doc["blob"])
+        return self._user_dir(user_id) / doc["stored_name"]
 
-    def _save_index(self, user_id: int, docs: List[dict]) -> None:
-        index_path = self._index_path(user_id)
-        index_path.write_text(json.dumps(docs, indent=2), encoding="utf-8")
+    def _text_path(self, user_id: int, doc: dict) -> Path:
+        if doc.get("blob"):
+            return self.blobs.text_path(doc["blob"])
+        return self._pdf_path(user_id, doc).with_suffix(".txt")
+
+    def _write_upload(
+        self, source: BinaryIO, partial_path: Path, max_bytes: int
+    ) -> tuple[int, str]:
+        """
+        Copy ``source`` to ``partial_path`` in fixed-size chunks, hashing and
+        validating as we go so memory stays flat regardless of file size.
+        The partial file is removed if the upload is rejected.
+        Returns (size in bytes, sha256 hex digest).
+        """
+        digest = hashlib.sha256()
+        header = b""
+        size = 0
 
-    def _extract_text(self, pdf_path: Path) -> str:
         try:
-            reader = PdfReader(str(pdf_path))
-            output = []
-            for page in reader.pages:
-                text = page.extract_text() or ""
-                output.append(text.strip())
-            return "\n".join(output).strip()
-        except Exception:
-            return ""
+            with partial_path.open("wb") as buffer:
+                while True:
+                    chunk = source.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DocumentTooLargeError(
+                            f"Uploaded file exceeds the {max_bytes / (1024 * 1024):.0f} MB limit."
+                        )
+                    if len(header) < len(PDF_MAGIC):
+                        header += chunk[: len(PDF_MAGIC) - len(header)]
+                        if not PDF_MAGIC.startswith(header):
+                            raise DocumentUploadError("Uploaded file is not a valid PDF.")
+                    digest.update(chunk)
+                    buffer.write(chunk)
 
-    def save_document(self, user_id: int, filename: str, content: bytes) -> dict:
-        docs = self._load_index(user_id)
-        document_id = str(uuid.uuid4())
-        stored_name = f"{document_id}.pdf"
-        user_dir = self._user_dir(user_id)
-        pdf_path = user_dir / stored_name
+            if size == 0:
+                raise DocumentUploadError("Uploaded file is empty.")
+            if header != PDF_MAGIC:
+                raise DocumentUploadError("Uploaded file is not a valid PDF.")
+        except BaseException:
+            if partial_path.exists():
+                partial_path.unlink()
+            raise
 
-        with pdf_path.open("wb") as buffer:
-            buffer.write(content)
+        return size, digest.hexdigest()
 
-        text_content = self._extract_text(pdf_path)
-        text_path = pdf_path.with_suffix(".txt")
-        text_path.write_text(text_content, encoding="utf-8")
+    def save_document(
+        self,
+        user_id: int,
+        filename: str,
+        content: bytes,
+        *,
+        defer_extraction: bool = False,
+    ) -> dict:
+        return self.save_document_stream(
+            user_id,
+            filename,
+            io.BytesIO(content),
+            defer_extraction=defer_extraction,
+        )
 
-        preview = text_content[:800] if text_content else "Text preview unavailable."
+    def save_document_stream(
+        self,
+        user_id: int,
+        filename: str,
+        source: BinaryIO,
+        *,
+        defer_extraction: bool = False,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+    ) -> dict:
+        """
+        Store an uploaded PDF read incrementally from a file-like object.
+        Raises ``DocumentUploadError`` for empty, non-PDF or oversize uploads.
+
+        PDFs are stored once per SHA-256. If the same bytes were already
+        ingested, the stored text and embeddings are reused and the document
+        comes back ``ready`` without another extraction.
+
+        Otherwise, with ``defer_extraction`` the metadata is saved as
+        ``pending`` and the caller is responsible for running extraction (see
+        ``app.services.document_ingestion``) and reporting back through
+        ``complete_ingestion`` / ``fail_ingestion``.
+        """
+        staged_path = self.blobs.staging_path()
+        size, sha256 = self._write_upload(source, staged_path, max_bytes)
+        document_id = str(uuid.uuid4())
+        self.blobs.adopt(staged_path, sha256, user_id, document_id)
 
         metadata = {
             "id": document_id,
             "original_name": filename or "document.pdf",
-            "stored_name": stored_name,
+            "blob": sha256,
             "uploaded_at": datetime.utcnow().isoformat(),
+            "preview": PREVIEW_UNAVAILABLE,
+            "status": STATUS_PENDING,
+            "size": size,
+            "sha256": sha256,
+            # Claimed from the start so another worker's resume_pending
+            # leaves it to us (see claim_ingestion).
+            "claimed_by": _ingestion_owner(),
+        }
+
+        self.metadata.insert(user_id, metadata)
+
+        if self.blobs.has_text(sha256):
+            return self._reuse_blob(user_id, metadata)
+
+        if defer_extraction:
+            return metadata
+
+        extraction = self._extract_text(
+            self.blobs.pdf_path(sha256), self.blobs.text_path(sha256)
+        )
+        if extraction is None:
+            return self.fail_ingestion(
+                user_id, document_id, "Unable to extract text from this PDF."
+            )
+        if extraction.get("reused"):
+            # An identical upload finished extracting while we waited.
+            return self._reuse_blob(user_id, metadata)
+        return self.complete_ingestion(user_id, document_id, extraction)
+
+    def _reuse_blob(self, user_id: int, doc: dict) -> dict | None:
+        """Index a duplicate upload from its blob's existing artifacts."""
+        with DocumentText(self.blobs.text_path(doc["blob"])) as text:
+            embeddings = self.blobs.load_embeddings(doc["blob"]) or embed_document(text)
+            summary = self.blobs.load_summary(doc["blob"])
+            if summary is None:
+                summary = summarize_document(text)
+            return self._index_document(
+                user_id, doc["id"], text, embeddings, summary=summary
+            )
+
+    def claim_ingestion(self, user_id: int, document_id: str) -> bool:
+        """
+        Atomically take a pending document for extraction by this process,
+        so with several uvicorn workers each PDF is extracted by one of them.
+        A claim left by a process that has since exited can be taken over.
+        """
+        doc = self.get_document(user_id, document_id)
+        if not doc or doc.get("status") != STATUS_PENDING:
+            return False
+        holder = doc.get("claimed_by")
+        owner = _ingestion_owner()
+        if holder == owner:
+            return True
+        if holder and _owner_alive(holder):
+            return False
+        claimed = self.metadata.update_if(
+            user_id,
+            document_id,
+            {"status": STATUS_PENDING, "claimed_by": holder},
+            claimed_by=owner,
+        )
+        return claimed is not None
+
+    def complete_from_existing_text(
+        self, user_id: int, document_id: str
+    ) -> dict | None:
+        """
+        Finish a pending document whose text another job already extracted:
+        an identical upload, or a worker that died after extracting.
+        """
+        doc = self.get_document(user_id, document_id)
+        if not doc:
+            return None
+        if doc.get("blob"):
+            return self._reuse_blob(user_id, doc)
+        return self.complete_ingestion(user_id, document_id)
+
+    def get_ingestion_paths(
+        self, user_id: int, document_id: str
+    ) -> tuple[Path, Path] | None:
+        """Return (stored PDF, text destination) for an extraction job."""
+        doc = self.get_document(user_id, document_id)
+        if not doc:
+            return None
+        pdf_path = self._pdf_path(user_id, doc)
+        if not pdf_path.exists():
+            return None
+        return pdf_path, self._text_path(user_id, doc)
+
+    def complete_ingestion(
+        self,
+        user_id: int,
+        document_id: str,
+        extraction: dict | None = None,
+        embeddings: tuple[list[dict], np.ndarray] | None = None,
+    ) -> dict | None:
+        """
+        Index a document whose text has already been written to its ``.txt``
+        by ``extract_pdf_to_text``. ``extraction`` is that call's result,
+        optionally carrying a precomputed ``summary``; ``embeddings`` may also
+        be precomputed by the ingestion worker. Anything missing is built
+        here, a page at a time.
+        """
+        extraction = extraction or {}
+        doc = self.get_document(user_id, document_id)
+        if not doc:
+            # Deleted while extraction was running.
+            return None
+
+        with DocumentText(self._text_path(user_id, doc)) as text:
+            embeddings = embeddings or embed_document(text)
+            summary = extraction.get("summary")
+            if summary is None:
+                summary = summarize_document(text)
+            if doc.get("blob"):
+                self.blobs.save_embeddings(doc["blob"], *embeddings)
+                self.blobs.save_summary(doc["blob"], summary)
+            return self._index_document(
+                user_id,
+                document_id,
+                text,
+                embeddings,
+                summary=summary,
+                skipped_pages=extraction.get("skipped_pages"),
+            )
+
+    def _index_document(
+        self,
+        user_id: int,
+        document_id: str,
+        text: DocumentText,
+        embeddings: tuple[list[dict], np.ndarray],
+        summary: str = "",
+        skipped_pages: list[int] | None = None,
+    ) -> dict | None:
+        self.search_index.add_document(
+            user_id, document_id, self._page_segments(text)
+        )
+        self.vector_index.add_document(user_id, document_id, *embeddings)
+
+        # 4 bytes per character is enough for any UTF-8 preview.
+        preview = text.head(800 * 4).strip()[:800] or PREVIEW_UNAVAILABLE
+        changes = {
             "preview": preview,
+            "summary": summary,
+            "status": STATUS_READY,
+            "page_count": text.page_count,
         }
+        if skipped_pages:
+            changes["skipped_pages"] = skipped_pages
+        return self.metadata.update(user_id, document_id, **changes)
+
+    def _page_segments(self, text: DocumentText) -> Iterator[tuple[int, str]]:
+        for _, start, page in text.iter_pages():
+            yield start, page
 
-        docs.append(metadata)
-        self._save_index(user_id, docs)
-        return metadata
+    def fail_ingestion(self, user_id: int, document_id: str, error: str) -> dict | None:
+        return self.metadata.update(
+            user_id, document_id, status=STATUS_FAILED, error=error
+        )
 
-    def list_documents(self, user_id: int) -> list[dict]:
-        docs = self._load_index(user_id)
-        return sorted(docs, key=lambda d: d.get("uploaded_at", ""), reverse=True)
+    def get_document_status(self, user_id: int, document_id: str) -> dict | None:
+        doc = self.get_document(user_id, document_id)
+        if not doc:
+            return None
+        status = {"id": document_id, "status": doc.get("status", STATUS_READY)}
+        if doc.get("error"):
+            status["error"] = doc["error"]
+        return status
+
+    def list_pending_documents(self) -> list[tuple[int, str]]:
+        """Return (user_id, document_id) pairs still waiting on extraction."""
+        return self.metadata.find_by_status(STATUS_PENDING)
+
+    def list_documents(
+        self, user_id: int, limit: int | None = None, offset: int = 0
+    ) -> list[dict]:
+        """Newest first; pass ``limit``/``offset`` to page through large libraries."""
+        return self.metadata.list_documents(user_id, limit=limit, offset=offset)
+
+    def count_documents(self, user_id: int) -> int:
+        return self.metadata.count_documents(user_id)
 
     def get_document(self, user_id: int, document_id: str) -> dict | None:
-        for doc in self._load_index(user_id):
-            if doc.get("id") == document_id:
-                return doc
-        return None
+        return self.metadata.get(user_id, document_id)
 
     def get_pdf_path(self, user_id: int, document_id: str) -> Path | None:
         doc = self.get_document(user_id, document_id)
         if not doc:
             return None
-        pdf_path = self._user_dir(user_id) / doc["stored_name"]
+        pdf_path = self._pdf_path(user_id, doc)
         if pdf_path.exists():
             return pdf_path
         return None
 
     def get_document_text(self, user_id: int, document_id: str) -> str:
-        doc = self.get_document(user_id, document_id)
-        if not doc:
+        text = self.open_document_text(user_id, document_id)
+        if text is None:
             return ""
-        pdf_path = self._user_dir(user_id) / doc["stored_name"]
-        text_path = pdf_path.with_suffix(".txt")
-        if text_path.exists():
-            return text_path.read_text(encoding="utf-8")
-        if pdf_path.exists():
-            text = self._extract_text(pdf_path)
-            text_path.write_text(text, encoding="utf-8")
-            return text
-        return ""
+        with text:
+            return text.read()
 
-    def delete_document(self, user_id: int, document_id: str) -> bool:
-        docs = self._load_index(user_id)
-        remaining: list[dict] = []
-        deleted_doc = None
-
-        for doc in docs:
-            if doc.get("id") == document_id:
-                deleted_doc = doc
-            else:
-                remaining.append(doc)
+    def open_document_text(
+        self, user_id: int, document_id: str, *, doc: dict | None = None
+    ) -> DocumentText | None:
+        """
+        Memory-map a document's extracted text for page/byte-range access.
+        Callers must close the result (it is a context manager).
+        """
+        doc = doc or self.get_document(user_id, document_id)
+        if not doc or doc.get("status") == STATUS_PENDING:
+            return None
+        pdf_path = self._pdf_path(user_id, doc)
+        text_path = self._text_path(user_id, doc)
+        if not text_path.exists():
+            if not pdf_path.exists():
+                return None
+            if self._extract_text(pdf_path, text_path) is None:
+                return None
+        return DocumentText(text_path)
 
+    def delete_document(self, user_id: int, document_id: str) -> bool:
+        deleted_doc = self.metadata.delete(user_id, document_id)
         if not deleted_doc:
             return False
 
-        self._save_index(user_id, remaining)
-        pdf_path = self._user_dir(user_id) / deleted_doc["stored_name"]
+        self.search_index.remove_document(user_id, document_id)
+        self.vector_index.remove_document(user_id, document_id)
+        if deleted_doc.get("blob"):
+            self.blobs.release(deleted_doc["blob"], user_id, document_id)
+            return True
+
+        pdf_path = self._pdf_path(user_id, deleted_doc)
         text_path = pdf_path.with_suffix(".txt")
-        if pdf_path.exists():
-            pdf_path.unlink()
-        if text_path.exists():
-            text_path.unlink()
+        progress_path = text_path.with_suffix(".progress")
+        for path in (
+            pdf_path,
+            text_path,
+            page_table_path(text_path),
+            progress_path,
+            extraction_lock_path(text_path),
+        ):
+            if path.exists():
+                path.unlink()
         return True
 
+    def search_documents(self, user_id: int, query: str, limit: int = 5) -> list[dict]:
+        return self.search_index.search(user_id, query, limit=limit)
+
+    def semantic_search_documents(
+        self, user_id: int, query: str, limit: int = 5
+    ) -> list[dict]:
+        return self.vector_index.search(user_id, query, limit=limit)
+
+    def rebuild_search_index(self, user_id: int) -> int:
+        """
+        Re-index every document listed in the user's metadata from its .txt
+        rendition (keyword and semantic indexes). Useful after upgrading
+        existing storage/documents/<user_id> folders.
+        """
+        embeddings: list[tuple[str, list[dict], np.ndarray]] = []
+
+        def documents():
+            for doc in self.list_documents(user_id):
+                text = self.open_document_text(user_id, doc["id"], doc=doc)
+                if text is None:
+                    continue
+                with text:
+                    chunks, vectors = embed_document(text)
+                    embeddings.append((doc["id"], chunks, vectors))
+                    if doc.get("blob"):
+                        self.blobs.save_embeddings(doc["blob"], chunks, vectors)
+                    if "summary" not in doc:
+                        self.metadata.update(
+                            user_id, doc["id"], summary=summarize_document(text)
+                        )
+                    # The search index consumes the segments before asking
+                    # for the next document, so the mmap is still open.
+                    yield doc["id"], self._page_segments(text)
+
+        count = self.search_index.rebuild(user_id, documents())
+        self.vector_index.rebuild(user_id, embeddings)
+        return count
+
+    def list_user_ids(self) -> list[int]:
+        return sorted(
+            int(path.name)
+            for path in self.root.iterdir()
+            if path.is_dir() and path.name.isdigit()
+        )
+
+
+def _build_metadata_backend(root: Path) -> DocumentMetadataBackend:
+    if METADATA_BACKEND == "sqlite":
+        return SQLiteDocumentMetadata(METADATA_DB_PATH)
+    return JsonIndexMetadata(root)
 
-document_store = DocumentStore()
 
+document_store = DocumentStore(metadata=_build_metadata_backend(STORAGE_ROOT))
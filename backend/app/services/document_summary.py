@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import math
+import re
+
+import numpy as np
+
+from app.services.document_text import DocumentText
+from app.services.document_vectors import encode_texts
+
+SUMMARY_SENTENCES = 6
+# Sentences kept from each page for the document-level ranking round.
+PAGE_CANDIDATES = 3
+MAX_CANDIDATES = 400
+DAMPING = 0.85
+# Skip a sentence this similar to one already picked (repeated headers,
+# boilerplate disclaimers).
+DUPLICATE_SIMILARITY = 0.8
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+MIN_SENTENCE_CHARS = 30
+MAX_SENTENCE_CHARS = 400
+MIN_SENTENCE_WORDS = 5
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split page text into sentences worth ranking (drops headings and fragments)."""
+    flattened = " ".join(text.split())
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(flattened):
+        sentence = sentence.strip()
+        if not MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+            continue
+        if len(sentence.split()) < MIN_SENTENCE_WORDS:
+            continue
+        sentences.append(sentence)
+    return sentences
+
+
+def _similarity(vectors: np.ndarray) -> np.ndarray:
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    return np.clip(similarity, 0.0, None)
+
+
+def rank_sentences(vectors: np.ndarray, iterations: int = 50) -> np.ndarray:
+    """
+    TextRank: PageRank over the sentence similarity graph. Sentences that
+    resemble many other sentences score highest. Returns one score per row.
+    """
+    count = len(vectors)
+    if count <= 2:
+        return np.ones(count, dtype=np.float32)
+    similarity = _similarity(vectors)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    out_weight[out_weight == 0] = 1.0
+    transition = similarity / out_weight
+
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - DAMPING) / count + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def summarize_document(
+    text: DocumentText, max_sentences: int = SUMMARY_SENTENCES
+) -> str:
+    """
+    Build an extractive summary in two rounds so cost stays linear in pages:
+    rank sentences within each page and keep the best few, then rank those
+    candidates across the document. Picked sentences are returned in
+    document order. Returns "" when the text has no usable sentences.
+    """
+    candidates: list[str] = []
+    for _, _, page in text.iter_pages():
+        sentences = split_sentences(page)
+        if len(sentences) > PAGE_CANDIDATES:
+            scores = rank_sentences(encode_texts(sentences))
+            keep = sorted(np.argsort(-scores)[:PAGE_CANDIDATES])
+            sentences = [sentences[i] for i in keep]
+        candidates.extend(sentences)
+
+    if not candidates:
+        return ""
+    if len(candidates) > MAX_CANDIDATES:
+        # Sample evenly so every part of a very long document is represented.
+        step = math.ceil(len(candidates) / MAX_CANDIDATES)
+        candidates = candidates[::step]
+
+    vectors = encode_texts(candidates)
+    scores = rank_sentences(vectors)
+    chosen: list[int] = []
+    for index in np.argsort(-scores):
+        if chosen and float(np.max(vectors[chosen] @ vectors[index])) > DUPLICATE_SIMILARITY:
+            continue
+        chosen.append(int(index))
+        if len(chosen) >= max_sentences:
+            break
+    return " ".join(candidates[i] for i in sorted(chosen))
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator
+
+PAGE_SEPARATOR = "\n"
+
+
+def page_table_path(text_path: Path) -> Path:
+    return text_path.with_suffix(".pages")
+
+
+class DocumentTextWriter:
+    """
+    Append extracted pages to a document's ``.txt`` one at a time.
+
+    After every page the text is flushed and a ``.progress`` checkpoint
+    (page start offsets, bytes written, skipped pages) is atomically replaced,
+    so an interrupted extraction resumes from the last completed page instead
+    of starting over. ``finish`` writes the ``.pages`` sidecar: a flat array of
+    unsigned 64-bit byte offsets, the start of each page followed by the end
+    of the text, so page N spans ``offsets[N]:offsets[N + 1]`` (minus the
+    separator) without reading the rest.
+    """
+
+    def __init__(self, text_path: Path) -> None:
+        self.text_path = text_path
+        self.progress_path = text_path.with_suffix(".progress")
+        checkpoint = self._load_checkpoint()
+        self.offsets: list[int] = checkpoint.get("offsets", [])
+        self.position: int = checkpoint.get("position", 0)
+        self.skipped_pages: list[int] = checkpoint.get("skipped_pages", [])
+
+        resume = bool(checkpoint) and text_path.exists()
+        self._file = text_path.open("r+b" if resume else "wb")
+        # Drop anything written after the last checkpoint.
+        self._file.truncate(self.position)
+        self._file.seek(self.position)
+
+    def _load_checkpoint(self) -> dict:
+        try:
+            return json.loads(self.progress_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _checkpoint(self) -> None:
+        tmp_path = self.progress_path.with_name(f".{self.progress_path.name}.tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "offsets": self.offsets,
+                    "position": self.position,
+                    "skipped_pages": self.skipped_pages,
+                },
+                separators=(",", ":"),
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.progress_path)
+
+    @property
+    def pages_written(self) -> int:
+        return len(self.offsets)
+
+    def write_page(self, text: str, *, skipped: bool = False) -> None:
+        if self.offsets:
+            encoded_separator = PAGE_SEPARATOR.encode("utf-8")
+            self._file.write(encoded_separator)
+            self.position += len(encoded_separator)
+        self.offsets.append(self.position)
+        encoded = text.encode("utf-8")
+        self._file.write(encoded)
+        self.position += len(encoded)
+        if skipped:
+            self.skipped_pages.append(len(self.offsets))
+        self._file.flush()
+        self._checkpoint()
+
+    def finish(self) -> dict:
+        """Close the text, write the page table and clear the checkpoint."""
+        self._file.close()
+        offsets = array("Q", self.offsets)
+        offsets.append(self.position)
+        with page_table_path(self.text_path).open("wb") as buffer:
+            offsets.tofile(buffer)
+        if self.progress_path.exists():
+            self.progress_path.unlink()
+        return {"page_count": len(self.offsets), "skipped_pages": self.skipped_pages}
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class DocumentText:
+    """
+    Read-only, memory-mapped view over a document's extracted text.
+
+    Slices are served straight from the page cache, so pulling a snippet or a
+    single page out of a multi-megabyte document costs only the bytes touched.
+    Offsets are UTF-8 byte offsets; slices that cut a multi-byte character in
+    half drop the partial character.
+    """
+
+    def __init__(self, text_path: Path) -> None:
+        self.text_path = text_path
+        self._file = text_path.open("rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap can't map an empty file.
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size
+            else None
+        )
+        self.page_offsets = self._load_page_offsets()
+
+    def _load_page_offsets(self) -> array:
+        offsets = array("Q")
+        table_path = page_table_path(self.text_path)
+        if table_path.exists():
+            with table_path.open("rb") as buffer:
+                offsets.frombytes(buffer.read())
+        if len(offsets) < 2 or offsets[-1] != self.size:
+            # Legacy text without a page table (or a stale one): one page.
+            offsets = array("Q", [0, self.size])
+        return offsets
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets) - 1
+
+    def slice(self, start: int, end: int) -> str:
+        start = max(0, start)
+        end = min(self.size, end)
+        if self._map is None or start >= end:
+            return ""
+        return self._map[start:end].decode("utf-8", errors="ignore")
+
+    def head(self, length: int) -> str:
+        return self.slice(0, length)
+
+    def page(self, number: int) -> str:
+        """Return 1-based page ``number``."""
+        if number < 1 or number > self.page_count:
+            return ""
+        start = self.page_offsets[number - 1]
+        end = self.page_offsets[number]
+        return self.slice(start, end).rstrip(PAGE_SEPARATOR)
+
+    def page_for_offset(self, offset: int) -> int:
+        """Return the 1-based page containing byte ``offset``."""
+        index = bisect_right(self.page_offsets, offset, 0, len(self.page_offsets) - 1)
+        return max(1, index)
+
+    def iter_pages(self) -> Iterator[tuple[int, int, str]]:
+        """Yield (1-based page number, start byte offset, text) one page at a time."""
+        for number in range(1, self.page_count + 1):
+            yield number, self.page_offsets[number - 1], self.page(number)
+
+    def read(self) -> str:
+        return self.slice(0, self.size)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "DocumentText":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -3,8 +3,16 @@ from __future__ import annotations
 from typing import List
 
 from app.services.document_store import document_store
+from app.services.tool_registry import tool_registry
 
+SEARCH_MODES = ("keyword", "semantic")
 
+
+@tool_registry.tool(
+    "list_user_documents",
+    description="List PDFs the user has uploaded, including previews.",
+    timeout=5,
+)
 def list_documents_for_agent(user_id: int) -> dict:
     docs = document_store.list_documents(user_id)
     simplified = [
@@ -19,42 +27,120 @@ def list_documents_for_agent(user_id: int) -> dict:
     return {"documents": simplified}
 
 
-def summarize_document_for_agent(user_id: int, document_id: str) -> dict:
+@tool_registry.tool(
+    "summarize_user_document",
+    description="Summarize a specific PDF the user uploaded.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "document_id": {"type": "string", "description": "ID from list_user_documents"},
+            "page": {
+                "type": "integer",
+                "description": "Optional 1-based page to read, e.g. a page number from search results.",
+            },
+        },
+        "required": ["document_id"],
+    },
+    timeout=10,
+)
+def summarize_document_for_agent(
+    user_id: int, document_id: str, page: int | None = None
+) -> dict:
     doc = document_store.get_document(user_id, document_id)
     if not doc:
         return {"error": "Document not found."}
 
-    text = document_store.get_document_text(user_id, document_id)
-    excerpt = text[:1200] if text else doc.get("preview", "")
+    # Whole-document summaries are computed once at ingestion.
+    excerpt = "" if page else doc.get("summary", "")
+    text = None
+    if page or not excerpt:
+        text = document_store.open_document_text(user_id, document_id, doc=doc)
+    if text is not None:
+        with text:
+            if page:
+                excerpt = text.page(page)[:1200]
+            else:
+                excerpt = text.head(1200)
+    if not excerpt and not page:
+        excerpt = doc.get("preview", "")
+
+    if page:
+        return {
+            "document": doc.get("original_name", "document"),
+            "page": page,
+            "summary": excerpt.strip() or f"Page {page} has no extractable text.",
+        }
+
     return {
         "document": doc.get("original_name", "document"),
-        "summary": excerpt or "Unable to extract text from this PDF.",
+        "summary": excerpt.strip() or "Unable to extract text from this PDF.",
     }
 
 
-def search_documents_for_agent(user_id: int, query: str) -> dict:
+@tool_registry.tool(
+    "search_user_documents",
+    description=(
+        "Search across all uploaded PDFs for a query, returning the best-ranked passages. "
+        "Use semantic mode when the documents may use other forms of the user's words "
+        "(plurals, tenses, compounds)."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "What to search for in documents."},
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of passages to return (default 5).",
+            },
+            "mode": {
+                "type": "string",
+                "enum": list(SEARCH_MODES),
+                "description": (
+                    "keyword (default) matches exact terms; semantic also matches other "
+                    "forms of the same words, e.g. 'leaking roof' vs 'roof leaks'. "
+                    "Neither mode knows synonyms, so search for the document's own terms."
+                ),
+            },
+        },
+        "required": ["query"],
+    },
+    timeout=10,
+)
+def search_documents_for_agent(
+    user_id: int, query: str, limit: int = 5, mode: str = "keyword"
+) -> dict:
     if not query:
         return {"results": [], "note": "No query provided."}
 
-    docs = document_store.list_documents(user_id)
-    query_lower = query.lower()
+    if mode == "semantic":
+        hits = document_store.semantic_search_documents(user_id, query, limit=limit)
+    else:
+        hits = document_store.search_documents(user_id, query, limit=limit)
+
     results: List[dict] = []
 
-    for doc in docs:
-        text = document_store.get_document_text(user_id, doc["id"])
-        if not text:
+    for hit in hits:
+        doc = document_store.get_document(user_id, hit["document_id"])
+        if not doc:
             continue
-        lower_text = text.lower()
-        idx = lower_text.find(query_lower)
-        if idx == -1:
+        text = document_store.open_document_text(user_id, doc["id"], doc=doc)
+        if text is None:
             continue
 
-        start = max(0, idx - 160)
-        end = min(len(text), idx + len(query) + 160)
-        snippet = text[start:end].strip()
+        with text:
+            if mode == "semantic":
+                snippet = text.slice(hit["start"], min(hit["end"], hit["start"] + 480))
+                page = hit["page"]
+            else:
+                snippet = text.slice(hit["offset"] - 160, hit["offset"] + 160)
+                page = text.page_for_offset(hit["offset"])
+            snippet = snippet.strip()
         results.append(
             {
                 "document": doc.get("original_name", "document"),
+                "document_id": doc["id"],
+                "page": page,
+                "score": hit["score"],
                 "snippet": snippet or doc.get("preview", ""),
             }
         )
@@ -65,32 +151,8 @@ def search_documents_for_agent(user_id: int, query: str) -> dict:
     return {"results": results}
 
 
-DOCUMENT_FUNCTION_DEFINITIONS = [
-    {
-        "name": "list_user_documents",
-        "description": "List PDFs the user has uploaded, including previews.",
-        "parameters": {"type": "object", "properties": {}},
-    },
-    {
-        "name": "summarize_user_document",
-        "description": "Summarize a specific PDF the user uploaded.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "document_id": {"type": "string", "description": "ID from list_user_documents"},
-            },
-            "required": ["document_id"],
-        },
-    },
-    {
-        "name": "search_user_documents",
-        "description": "Search across all uploaded PDFs for a query.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "query": {"type": "string", "description": "What to search for in documents."}
-            },
-            "required": ["query"],
-        },
-    },
-]
+DOCUMENT_TOOL_NAMES = (
+    "list_user_documents",
+    "summarize_user_document",
+    "search_user_documents",
+)
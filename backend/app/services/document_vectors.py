@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from app.services.document_metadata import INDEX_CACHE_SIZE
+from app.services.document_text import DocumentText
+from app.services.file_lock import file_lock
+
+VECTOR_DIMENSIONS = 512
+CHUNK_BYTES = 1000
+CHUNK_OVERLAP_BYTES = 200
+# Cosine similarity below this is hash-collision noise rather than a match.
+MIN_SIMILARITY = 0.05
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+WORD_WEIGHT = 1.0
+NGRAM_WEIGHT = 0.3
+
+
+def _hash_feature(feature: str) -> tuple[int, float]:
+    hashed = zlib.crc32(feature.encode("utf-8"))
+    sign = 1.0 if hashed & 0x80000000 else -1.0
+    return hashed % VECTOR_DIMENSIONS, sign
+
+
+def _features(text: str) -> Counter[str]:
+    features: Counter[str] = Counter()
+    for word in WORD_PATTERN.findall(text.lower()):
+        features[f"w:{word}"] += WORD_WEIGHT
+        padded = f"<{word}>"
+        for size in (3, 4):
+            for start in range(len(padded) - size + 1):
+                features[f"g:{padded[start:start + size]}"] += NGRAM_WEIGHT
+    return features
+
+
+def encode_texts(texts: list[str]) -> np.ndarray:
+    """
+    Deterministic local text encoder: word and character n-gram features
+    with sublinear term frequency, feature-hashed (signed) into a fixed
+    number of dimensions and L2-normalised. The n-grams let inflections and
+    compounds ("leak"/"leaking", "roofline") meet. Returns float32 (n, dims).
+    """
+    matrix = np.zeros((len(texts), VECTOR_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature, weight in _features(text).items():
+            column, sign = _hash_feature(feature)
+            matrix[row, column] += sign * math.log1p(weight)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def chunk_page(page: str, page_number: int, base_offset: int) -> list[dict]:
+    """
+    Split one page into overlapping chunks that never cross the page boundary.
+    ``base_offset`` is the page's byte offset in the document's ``.txt``, so
+    chunk offsets point straight into that file.
+    """
+    chunks: list[dict] = []
+    encoded = page.encode("utf-8")
+    step = CHUNK_BYTES - CHUNK_OVERLAP_BYTES
+    start = 0
+    while start < len(encoded):
+        end = min(len(encoded), start + CHUNK_BYTES)
+        text = encoded[start:end].decode("utf-8", errors="ignore")
+        if text.strip():
+            chunks.append(
+                {
+                    "start": base_offset + start,
+                    "end": base_offset + end,
+                    "page": page_number,
+                    "text": text,
+                }
+            )
+        if end == len(encoded):
+            break
+        start += step
+    return chunks
+
+
+def embed_document(text: DocumentText) -> tuple[list[dict], np.ndarray]:
+    """
+    Chunk and encode a document page by page, so only one page's text is
+    decoded at a time. Returns (chunk table without text, vectors).
+    """
+    chunks: list[dict] = []
+    blocks: list[np.ndarray] = []
+    for number, base_offset, page in text.iter_pages():
+        page_chunks = chunk_page(page, number, base_offset)
+        if not page_chunks:
+            continue
+        blocks.append(encode_texts([chunk.pop("text") for chunk in page_chunks]))
+        chunks.extend(page_chunks)
+    if not blocks:
+        return _empty()
+    return chunks, np.vstack(blocks)
+
+
+def _empty() -> tuple[np.ndarray, list[dict]]:
+    return np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32), []
+
+
+class _VectorIndex:
+    """One user's loaded matrix and row table, plus the IDF weights derived from it."""
+
+    def __init__(self, matrix: np.ndarray, rows: list[dict]) -> None:
+        self.matrix = matrix
+        self.rows = rows
+        doc_freq = np.count_nonzero(matrix, axis=0)
+        self.idf = (np.log((len(rows) + 1) / (doc_freq + 1)) + 1.0).astype(np.float32)
+
+
+class DocumentVectorIndex:
+    """
+    Per-user semantic index over document chunks.
+
+    Each user's chunk vectors live in one contiguous float32 matrix saved
+    together with its row table (document_id, byte range, page) in a single
+    ``vectors.npz``, so the two are always replaced as a pair. Queries are a
+    single matrix-vector product followed by a top-k partial sort. The query
+    vector is weighted by per-dimension IDF over the user's chunks, so hashed
+    features that appear everywhere (boilerplate) count for less.
+
+    Like ``DocumentSearchIndex``, loaded indexes sit in a bounded LRU that is
+    re-read when the file's mtime/size changes, and updates hold a per-user
+    file lock across the read-modify-write so uvicorn workers don't drop
+    each other's documents.
+    """
+
+    def __init__(self, root: Path, max_users: int = INDEX_CACHE_SIZE) -> None:
+        self.root = root
+        self.max_users = max(1, max_users)
+        # user_id -> ((mtime_ns, size) of the file it was read from, index)
+        self._indexes: OrderedDict[int, tuple[tuple[int, int] | None, _VectorIndex]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _index_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / "vectors.npz"
+
+    def _lock_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / "vectors.lock"
+
+    def _signature(self, index_path: Path) -> tuple[int, int] | None:
+        try:
+            stat = index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cache(
+        self, user_id: int, signature: tuple[int, int] | None, index: _VectorIndex
+    ) -> None:
+        self._indexes[user_id] = (signature, index)
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+
+    def _load(self, user_id: int) -> _VectorIndex:
+        index_path = self._index_path(user_id)
+        signature = self._signature(index_path)
+        cached = self._indexes.get(user_id)
+        if cached is not None and cached[0] == signature:
+            self._indexes.move_to_end(user_id)
+            return cached[1]
+
+        matrix, rows = _empty()
+        if signature is not None:
+            try:
+                with np.load(index_path) as stored:
+                    loaded = stored["matrix"].astype(np.float32, copy=False)
+                    loaded_rows = json.loads(stored["rows"].tobytes().decode("utf-8"))
+                if loaded.shape == (len(loaded_rows), VECTOR_DIMENSIONS):
+                    matrix, rows = loaded, loaded_rows
+            except (ValueError, OSError, KeyError, json.JSONDecodeError):
+                matrix, rows = _empty()
+
+        index = _VectorIndex(matrix, rows)
+        self._cache(user_id, signature, index)
+        return index
+
+    def _save(self, user_id: int, matrix: np.ndarray, rows: list[dict]) -> None:
+        index_path = self._index_path(user_id)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        encoded_rows = json.dumps(rows, separators=(",", ":")).encode("utf-8")
+        fd, tmp_name = tempfile.mkstemp(
+            dir=index_path.parent, prefix=".vectors.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                np.savez(
+                    buffer,
+                    matrix=np.ascontiguousarray(matrix, dtype=np.float32),
+                    rows=np.frombuffer(encoded_rows, dtype=np.uint8),
+                )
+            os.replace(tmp_name, index_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            self._indexes.pop(user_id, None)
+            raise
+
+        self._cache(user_id, self._signature(index_path), _VectorIndex(matrix, rows))
+
+    def _without(
+        self, index: _VectorIndex, document_id: str
+    ) -> tuple[np.ndarray, list[dict]]:
+        rows = index.rows
+        keep = [i for i, row in enumerate(rows) if row["document_id"] != document_id]
+        if len(keep) == len(rows):
+            return index.matrix, rows
+        return index.matrix[keep], [rows[i] for i in keep]
+
+    def add_document(
+        self, user_id: int, document_id: str, chunks: list[dict], vectors: np.ndarray
+    ) -> None:
+        with self._lock, file_lock(self._lock_path(user_id)):
+            matrix, rows = self._without(self._load(user_id), document_id)
+            new_rows = [{"document_id": document_id, **chunk} for chunk in chunks]
+            self._save(user_id, np.vstack([matrix, vectors]), rows + new_rows)
+
+    def remove_document(self, user_id: int, document_id: str) -> None:
+        with self._lock, file_lock(self._lock_path(user_id)):
+            index = self._load(user_id)
+            matrix, rows = self._without(index, document_id)
+            if len(rows) != len(index.rows):
+                self._save(user_id, matrix, rows)
+
+    def rebuild(
+        self,
+        user_id: int,
+        documents: Iterable[tuple[str, list[dict], np.ndarray]],
+    ) -> int:
+        """
+        Replace the user's index with ``(document_id, chunks, vectors)``
+        entries, stacking the matrix and writing it once.
+        """
+        rows: list[dict] = []
+        blocks: list[np.ndarray] = [_empty()[0]]
+        for document_id, chunks, vectors in documents:
+            rows.extend({"document_id": document_id, **chunk} for chunk in chunks)
+            blocks.append(vectors)
+        with self._lock, file_lock(self._lock_path(user_id)):
+            self._save(user_id, np.vstack(blocks), rows)
+        return len(blocks) - 1
+
+    def search(self, user_id: int, query: str, limit: int = 5) -> list[dict]:
+        """
+        Return the ``limit`` best chunks for ``query``, at most one per
+        document, as {document_id, score, start, end, page}.
+        """
+        with self._lock:
+            index = self._load(user_id)
+        matrix, rows, idf = index.matrix, index.rows, index.idf
+        if not rows or not query.strip():
+            return []
+        limit = max(1, limit)
+
+        query_vector = encode_texts([query])[0] * idf
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+        scores = matrix @ (query_vector / norm)
+
+        # Over-fetch so collapsing to one chunk per document still fills `limit`.
+        candidates = min(len(rows), limit * 4)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        results: list[dict] = []
+        seen: set[str] = set()
+        for row_index in top:
+            score = float(scores[row_index])
+            if score < MIN_SIMILARITY:
+                break
+            row = rows[row_index]
+            if row["document_id"] in seen:
+                continue
+            seen.add(row["document_id"])
+            results.append({**row, "score": round(score, 4)})
+            if len(results) >= limit:
+                break
+        return results
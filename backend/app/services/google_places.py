@@ -1,29 +1,49 @@
+import asyncio
 import os
 from urllib.parse import urlparse
 
 import requests
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_SECONDS, span
+from app.services.http_client import get_async_http_client
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACES_BASE_URL = settings.GOOGLE_PLACES_BASE_URL.rstrip("/")
+TEXT_SEARCH_URL = f"{PLACES_BASE_URL}/maps/api/place/textsearch/json"
+PLACE_DETAILS_URL = f"{PLACES_BASE_URL}/maps/api/place/details/json"
 
 
-def get_place_details(place_id: str) -> dict:
-    """
-    Fetch phone number and website for a place using Place Details API.
-    """
-    params = {
+def _place_details_params(place_id: str) -> dict:
+    return {
         "place_id": place_id,
         "fields": "name,formatted_phone_number,website",
         "key": GOOGLE_API_KEY,
     }
 
-    res = requests.get(PLACE_DETAILS_URL, params=params, timeout=10)
-    res.raise_for_status()
+
+def get_place_details(place_id: str) -> dict:
+    """
+    Fetch phone number and website for a place using Place Details API.
+    """
+    with span(UPSTREAM_SECONDS, upstream="google_places", operation="place_details"):
+        res = requests.get(
+            PLACE_DETAILS_URL, params=_place_details_params(place_id), timeout=10
+        )
+        res.raise_for_status()
+    return res.json().get("result", {})
+
+
+async def get_place_details_async(place_id: str) -> dict:
+    with span(UPSTREAM_SECONDS, upstream="google_places", operation="place_details"):
+        res = await get_async_http_client().get(
+            PLACE_DETAILS_URL, params=_place_details_params(place_id)
+        )
+        res.raise_for_status()
     return res.json().get("result", {})
 
 
@@ -44,36 +64,62 @@ def _format_website(url: str | None) -> str:
     return host
 
 
-def find_local_services(service: str, city_state: str) -> list[str]:
-    """
-    Find licensed home services near a given city/state.
-    """
-    params = {
+def _format_service(place: dict, details: dict) -> str:
+    name = place.get("name") or "Unknown business"
+    address = place.get("formatted_address") or "Address unavailable"
+    rating = place.get("rating") or "N/A"
+    phone = details.get("formatted_phone_number") or "N/A"
+    website = _format_website(details.get("website"))
+
+    return (
+        f"{name}\n"
+        f"  - Address: {address}\n"
+        f"  - Phone: {phone}\n"
+        f"  - Website: {website}\n"
+        f"  - Rating: {rating}"
+    )
+
+
+def _text_search_params(service: str, city_state: str) -> dict:
+    return {
         "query": f"{service} near {city_state}",
         "key": GOOGLE_API_KEY,
     }
 
-    res = requests.get(TEXT_SEARCH_URL, params=params, timeout=10)
-    res.raise_for_status()
+
+def find_local_services(service: str, city_state: str) -> list[str]:
+    """
+    Find licensed home services near a given city/state.
+    """
+    with span(UPSTREAM_SECONDS, upstream="google_places", operation="text_search"):
+        res = requests.get(
+            TEXT_SEARCH_URL, params=_text_search_params(service, city_state), timeout=10
+        )
+        res.raise_for_status()
     data = res.json()
 
     results: list[str] = []
 
     for place in data.get("results", [])[:5]:
         details = get_place_details(place["place_id"])
+        results.append(_format_service(place, details))
+
+    return results
 
-        name = place.get("name") or "Unknown business"
-        address = place.get("formatted_address") or "Address unavailable"
-        rating = place.get("rating") or "N/A"
-        phone = details.get("formatted_phone_number") or "N/A"
-        website = _format_website(details.get("website"))
-
-        results.append(
-            f"{name}\n"
-            f"  - Address: {address}\n"
-            f"  - Phone: {phone}\n"
-            f"  - Website: {website}\n"
-            f"  - Rating: {rating}"
+
+async def find_local_services_async(service: str, city_state: str) -> list[str]:
+    """
+    Async variant of ``find_local_services``; the per-place detail lookups
+    run concurrently instead of one after another.
+    """
+    with span(UPSTREAM_SECONDS, upstream="google_places", operation="text_search"):
+        res = await get_async_http_client().get(
+            TEXT_SEARCH_URL, params=_text_search_params(service, city_state)
         )
+        res.raise_for_status()
+    places = res.json().get("results", [])[:5]
 
-    return results
+    details = await asyncio.gather(
+        *(get_place_details_async(place["place_id"]) for place in places)
+    )
+    return [_format_service(place, detail) for place, detail in zip(places, details)]
@@ -1,36 +1,63 @@
-from app.services.openai_client import client
+from app.services.completion_cache import (
+    create_completion,
+    create_completion_async,
+    record_usage,
+)
 from app.services.home_ai_agent_prompt import (
     HOME_AGENT_SYSTEM_PROMPT,
     GENERAL_AGENT_SYSTEM_PROMPT,
 )
 
-import re
+import asyncio
+import logging
+import os
+from collections import deque
+from types import SimpleNamespace
+from typing import AsyncIterator
+from app.core.metrics import AGENT_TURN_SECONDS, span
 from app.services.openwebninja_zillow_api import (
     get_property_details_by_address,
+    get_property_details_by_address_async,
     get_zestimate_from_data,
 )
-from app.services.google_places import find_local_services
+from app.services.google_places import find_local_services, find_local_services_async
 from app.services.property_context import get_user_properties, serialize_property
+from app.services.property_resolver import PropertyAddressIndex, property_resolver
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import json
-from app.services.non_property_intent import (
-    is_non_property_question,
-    is_weather_question,
-    is_document_question,
+from app.services.non_property_intent import classify_message
+from app.services.weather import (
+    get_chicago_weather_summary,
+    get_chicago_weather_summary_async,
 )
-from app.services.weather import get_chicago_weather_summary
+from app.services.agent_fast_paths import answer_fast_path
 from app.services.agent_memory import memory as agent_memory
-from app.services.document_tools import (
-    DOCUMENT_FUNCTION_DEFINITIONS,
-    list_documents_for_agent,
-    search_documents_for_agent,
-    summarize_document_for_agent,
-)
+from app.services.document_tools import DOCUMENT_TOOL_NAMES
+from app.services.prompt_builder import PromptBuilder, prompt_prefix_stats
+from app.services.session_state import SessionMap, session_state_turn
+from app.services.task_index import TaskMatchIndex, task_indexes
+from app.services.tool_registry import ToolArgumentError, tool_registry
+
+
+AGENT_MODEL = "gpt-3.5-turbo"
 
+# Tool calls from a single model response that may run at once.
+TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
 
-PENDING_PROPERTY_REQUESTS: dict[int, str] = {}
-LAST_AGENT_REPLY: dict[int, str] = {}
-PENDING_TASK_CONFIRMATIONS: dict[int, str] = {}
+logger = logging.getLogger(__name__)
+
+# Per-user conversation state, shared across workers (see session_state.py).
+# A question left unanswered for this long is no longer pending.
+PENDING_STATE_TTL_SECONDS = 30 * 60
+
+PENDING_PROPERTY_REQUESTS = SessionMap(
+    "pending_property_request", ttl=PENDING_STATE_TTL_SECONDS
+)
+LAST_AGENT_REPLY = SessionMap("last_agent_reply")
+PENDING_TASK_CONFIRMATIONS = SessionMap(
+    "pending_task_confirmation", ttl=PENDING_STATE_TTL_SECONDS
+)
 
 COMPLETION_KEYWORDS = [
     "complete",
@@ -61,28 +88,6 @@ POSITIVE_CONFIRMATIONS = {
     "please",
 }
 
-TASK_STOPWORDS = {
-    "call",
-    "remind",
-    "reminder",
-    "email",
-    "text",
-    "follow",
-    "task",
-    "todo",
-    "please",
-    "need",
-    "contact",
-    "reach",
-    "talk",
-    "speak",
-    "tomorrow",
-    "today",
-    "soon",
-    "check",
-    "look",
-}
-
 NEGATIVE_CONFIRMATIONS = {
     "no",
     "n",
@@ -93,116 +98,209 @@ NEGATIVE_CONFIRMATIONS = {
     "still pending",
 }
 
-TASK_FUNCTION_DEFINITIONS = [
-    {
-        "name": "remember_user_task",
-        "description": "Store a short follow-up task or reminder for the assistant.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "description": {
-                    "type": "string",
-                    "description": "A concise summary of the follow-up action.",
-                },
-            },
-            "required": ["description"],
-        },
-    },
-    {
-        "name": "complete_user_task",
-        "description": "Mark a stored follow-up task as completed.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "description": {
-                    "type": "string",
-                    "description": "Specific task to remove. If omitted, clears all tasks.",
-                }
-            },
-            "required": [],
-        },
-    },
-]
-
 
 # ----------------------------
 # Tool functions
 # ----------------------------
 
 
+@tool_registry.tool(
+    "get_home_value",
+    description="Get an estimated home value for the user's current property.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "address": {"type": "string"},
+        },
+        "required": ["address"],
+    },
+    timeout=15,
+    retries=1,
+    cache_ttl=6 * 60 * 60,
+    max_concurrency=4,
+)
 def get_home_value(address: str) -> str:
     property_details = get_property_details_by_address(address)
     return get_zestimate_from_data(property_details)
 
 
+@tool_registry.async_variant("get_home_value")
+async def get_home_value_async(address: str) -> str:
+    property_details = await get_property_details_by_address_async(address)
+    return get_zestimate_from_data(property_details)
+
+
+@tool_registry.tool(
+    "get_local_services",
+    description="Find local services near the user's property.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "service": {"type": "string"},
+            "city_state": {"type": "string"},
+        },
+        "required": ["service", "city_state"],
+    },
+    timeout=20,
+    retries=1,
+    cache_ttl=60 * 60,
+    max_concurrency=4,
+)
 def get_local_services(service: str, city_state: str) -> list[dict]:
     return find_local_services(service, city_state)
 
 
+@tool_registry.async_variant("get_local_services")
+async def get_local_services_async(service: str, city_state: str) -> list[dict]:
+    return await find_local_services_async(service, city_state)
+
+
+@tool_registry.tool(
+    "remember_user_task",
+    description="Store a short follow-up task or reminder for the assistant.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "description": {
+                "type": "string",
+                "description": "A concise summary of the follow-up action.",
+            },
+        },
+        "required": ["description"],
+    },
+    timeout=5,
+)
 def remember_user_task(*, user_id: int, description: str) -> dict:
     agent_memory.add_task(user_id, description)
     return {"status": "stored", "tasks": agent_memory.get_tasks(user_id)}
 
 
+@tool_registry.tool(
+    "complete_user_task",
+    description="Mark a stored follow-up task as completed.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "description": {
+                "type": "string",
+                "description": "Specific task to remove. If omitted, clears all tasks.",
+            }
+        },
+        "required": [],
+    },
+    timeout=5,
+)
 def complete_user_task(*, user_id: int, description: str | None = None) -> dict:
     agent_memory.complete_task(user_id, description)
     return {"status": "completed", "tasks": agent_memory.get_tasks(user_id)}
 
 
-def execute_tool(func_name: str, args: dict, *, user_id: int) -> dict:
-    if func_name == "get_home_value":
-        return get_home_value(args["address"])
-    if func_name == "get_local_services":
-        return get_local_services(args["service"], args["city_state"])
-    if func_name == "remember_user_task":
-        return remember_user_task(user_id=user_id, description=args["description"])
-    if func_name == "complete_user_task":
-        return complete_user_task(user_id=user_id, description=args.get("description"))
-    if func_name == "list_user_documents":
-        return list_documents_for_agent(user_id)
-    if func_name == "summarize_user_document":
-        return summarize_document_for_agent(user_id, args["document_id"])
-    if func_name == "search_user_documents":
-        return search_documents_for_agent(user_id, args["query"])
-    raise ValueError(f"Unsupported function {func_name}")
+TASK_TOOL_NAMES = ("remember_user_task", "complete_user_task")
+PROPERTY_TOOL_NAMES = ("get_home_value", "get_local_services")
+
+# Built once at import; the registry enforces each tool's limits.
+GENERAL_TOOLS = tool_registry.payload(*TASK_TOOL_NAMES, *DOCUMENT_TOOL_NAMES)
+PROPERTY_TOOLS = tool_registry.payload(
+    *PROPERTY_TOOL_NAMES, *TASK_TOOL_NAMES, *DOCUMENT_TOOL_NAMES
+)
+
+
+def _tool_failure(func_name: str, exc: Exception) -> dict:
+    # One failing lookup shouldn't sink the others in the same round; the
+    # model sees the error and can tell the user.
+    logger.warning("Tool %s failed: %s", func_name, exc)
+    if isinstance(exc, ToolArgumentError):
+        # The model's own mistake: say what was wrong so it can fix the call.
+        return {"error": str(exc)}
+    return {"error": f"{func_name} is unavailable right now."}
+
+
+def _submit_tool_call(call: dict, user_id: int):
+    try:
+        return tool_registry.submit(call["name"], call["arguments"], user_id=user_id)
+    except Exception as exc:
+        return exc
+
+
+def _tool_call_result(call: dict, pending) -> object:
+    try:
+        if isinstance(pending, Exception):
+            raise pending
+        return pending.result()
+    except Exception as exc:
+        return _tool_failure(call["name"], exc)
+
+
+async def _run_tool_call_async(call: dict, user_id: int):
+    try:
+        return await tool_registry.execute_async(
+            call["name"], call["arguments"], user_id=user_id
+        )
+    except Exception as exc:
+        return _tool_failure(call["name"], exc)
+
+
+def run_tool_calls(calls: list[dict], *, user_id: int) -> list:
+    """
+    Run one model response's tool calls concurrently, results in call order.
+    Calls go straight onto the tool registry's pool, at most
+    ``TOOL_CONCURRENCY`` in flight; this thread only waits on them.
+    """
+    results: list = [None] * len(calls)
+    in_flight: deque = deque()
+    for index, call in enumerate(calls):
+        if len(in_flight) >= TOOL_CONCURRENCY:
+            done, pending = in_flight.popleft()
+            results[done] = _tool_call_result(calls[done], pending)
+        in_flight.append((index, _submit_tool_call(call, user_id)))
+    for done, pending in in_flight:
+        results[done] = _tool_call_result(calls[done], pending)
+    return results
+
+
+async def iter_tool_calls_async(
+    calls: list[dict], *, user_id: int
+) -> AsyncIterator[tuple[int, object]]:
+    """
+    Run tool calls concurrently, at most ``TOOL_CONCURRENCY`` at a time,
+    yielding (call index, result) as each one finishes.
+    """
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def run(index: int, call: dict) -> tuple[int, object]:
+        async with semaphore:
+            return index, await _run_tool_call_async(call, user_id)
+
+    for finished in asyncio.as_completed(
+        [run(index, call) for index, call in enumerate(calls)]
+    ):
+        yield await finished
+
+
+async def run_tool_calls_async(calls: list[dict], *, user_id: int) -> list:
+    results: list = [None] * len(calls)
+    async for index, result in iter_tool_calls_async(calls, user_id=user_id):
+        results[index] = result
+    return results
 
 
 def format_property_summary(properties: list[dict]) -> str:
     return "\n".join(f"{p['address']} - {p['city_state']}" for p in properties)
 
 
-def resolve_property_from_message(message: str, properties: list[dict]) -> dict | None:
+def resolve_property_from_message(
+    message: str, properties: list[dict], user_id: int | None = None
+) -> dict | None:
     """
-    Attempt to infer which property the user referenced in free-form text.
-    Supports matching by property ID (number) or address/city strings.
+    Infer which property the user referenced in free-form text ("the Elm
+    St house", "property 12"). Returns None unless one property clearly
+    outranks the rest; pass ``user_id`` to reuse that user's cached index.
     """
-    text = message.lower()
-    tokens = re.findall(r"[a-z0-9]+", text)
-
-    # Look for explicit numeric IDs in the message
-    id_tokens = re.findall(r"\d+", message)
-    for token in id_tokens:
-        for property_obj in properties:
-            if str(property_obj["id"]) == token:
-                return property_obj
-
-    # Fall back to address/city substring matching
-    for property_obj in properties:
-        address_text = property_obj["address"].lower()
-        city_state_text = property_obj["city_state"].lower()
-
-        if address_text in text or text in address_text:
-            return property_obj
-        if city_state_text in text or text in city_state_text:
-            return property_obj
-
-        for token in tokens:
-            if len(token) < 3:
-                continue
-            if token in address_text or token in city_state_text:
-                return property_obj
-
-    return None
+    if user_id is None:
+        index = PropertyAddressIndex(properties)
+    else:
+        index = property_resolver.index_for(user_id, properties)
+    return index.resolve(message or "")
 
 
 def build_agent_response(
@@ -226,73 +324,62 @@ def remember_agent_reply(user_id: int, reply: str) -> None:
     LAST_AGENT_REPLY[user_id] = reply
 
 
-def find_task_match(message: str, tasks: list[dict]) -> str | None:
+def find_task_matches(
+    message: str, tasks: list[dict], user_id: int | None = None
+) -> list[dict]:
+    """
+    Open tasks a completion statement ("I called the roofer") refers to,
+    ranked as {"description", "score", "coverage"}. Empty unless the
+    message says something was done. Pass ``user_id`` to reuse that user's
+    incrementally maintained index.
+    """
     text = (message or "").lower()
     if not text or not any(keyword in text for keyword in COMPLETION_KEYWORDS):
-        return None
-
-    best_task = None
-    best_score = 0
-
-    for task in tasks:
-        if task.get("completed"):
-            continue
-        desc = (task.get("description") or "").strip()
-        if not desc:
-            continue
-        desc_lower = desc.lower()
-        if desc_lower and desc_lower in text:
-            return desc
-
-        tokens = [
-            t
-            for t in re.findall(r"[a-z0-9]+", desc_lower)
-            if len(t) >= 3 and t not in TASK_STOPWORDS
-        ]
-        if not tokens:
-            tokens = [desc_lower]
-
-        matches = sum(1 for token in tokens if token and token in text)
-        if matches > best_score:
-            best_score = matches
-            best_task = desc if matches > 0 else best_task
-
-    return best_task if best_score > 0 else None
-
-
-MULTI_PROPERTY_PROMPT = """
-You are HomeAI, an empathetic homeowner assistant.
-The user is asking something that requires knowing which of their properties is affected.
-Respond in 2 short sentences.
-- Acknowledge the user's situation using a warm, professional tone.
-- Offer help relevant to the user's message.
-- Remind them they have multiple properties and ask which one applies, but do not list the properties.
-"""
+        return []
+    if user_id is None:
+        index = TaskMatchIndex()
+        for task in tasks:
+            if not task.get("completed") and (task.get("description") or "").strip():
+                index.add(task["description"])
+        return index.rank(message)
+    return task_indexes.rank(user_id, tasks, message)
+
+
+# Words that mean the user is reporting a problem rather than asking a question.
+ISSUE_KEYWORDS = (
+    "leak", "broke", "broken", "damage", "flood", "mold", "crack", "burst",
+    "not working", "stopped working", "won't", "smell", "clog", "emergency",
+)
+
+MULTI_PROPERTY_ISSUE_INTRO = (
+    "I'm sorry you're dealing with that—let's get it sorted out."
+    " You have more than one home on file, so which property is this about?"
+)
+
+MULTI_PROPERTY_INTRO = (
+    "Happy to help with that."
+    " You have more than one home on file, so which property should we focus on?"
+)
 
 
 def build_multi_property_reply(message: str, property_options: list[dict]) -> str:
+    """
+    Templated "which property?" prompt. The intro only depends on whether
+    the user is reporting a problem, so no model call is needed.
+    """
+    text = (message or "").lower()
+    intro = (
+        MULTI_PROPERTY_ISSUE_INTRO
+        if any(keyword in text for keyword in ISSUE_KEYWORDS)
+        else MULTI_PROPERTY_INTRO
+    )
+
     property_list = "\n".join(
         f"- {p['address']}, {p['city_state']}" for p in property_options
     )
     if not property_list:
         property_list = "- No properties available."
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": MULTI_PROPERTY_PROMPT.strip()},
-                {"role": "user", "content": message},
-            ],
-            max_tokens=120,
-        )
-        intro = response.choices[0].message.content.strip()
-    except Exception:
-        intro = (
-            "I'm here to help and want to make sure I'm looking at the right home."
-            " Which property should we focus on?"
-        )
-
     return f"{intro}\n\nHere are the homes I have on file:\n{property_list}"
 
 
@@ -332,11 +419,36 @@ def resolve_property_context(db: Session, user_id: int) -> dict:
 
 
 # ----------------------------
-# Main agent runner
+# Turn planning
 # ----------------------------
 
+# Model round-trips that may request tools; each round can fan out into
+# several parallel tool calls.
+MAX_TOOL_ROUNDS = 2
 
-def run_home_agent(
+
+def _final_turn(
+    user_id: int,
+    reply_text: str,
+    *,
+    active_property: dict | None = None,
+    all_properties: list[dict] | None = None,
+    requires_property_selection: bool = False,
+    tasks: list[dict] | None = None,
+) -> dict:
+    remember_agent_reply(user_id, reply_text)
+    return {
+        "response": build_agent_response(
+            reply=reply_text,
+            active_property=active_property,
+            all_properties=all_properties or [],
+            requires_property_selection=requires_property_selection,
+            tasks=agent_memory.get_tasks(user_id) if tasks is None else tasks,
+        )
+    }
+
+
+def plan_agent_turn(
     *,
     db: Session,
     user_id: int,
@@ -344,13 +456,19 @@ def run_home_agent(
     property_id: int | None = None,
 ) -> dict:
     """
-    User-aware Home AI Agent
+    Everything about a turn that doesn't need the network: task
+    confirmations, routing, property resolution and prompt assembly.
+    Shared by the sync and async runners, which only differ in how they
+    perform the I/O. Returns one of:
+    - { "response": {...} } when the turn is already answered
+    - { "weather": True } for the weather shortcut
+    - { "messages": [...], "tools": [...], ... } to run the tool loop
     """
     message_text = (message or "").strip()
     message_lower = message_text.lower()
 
     # ----------------------------
-    # Non-property questions path
+    # Task confirmation path
     # ----------------------------
     current_tasks = agent_memory.get_tasks(user_id)
 
@@ -358,116 +476,81 @@ def run_home_agent(
     if pending_completion and message_lower in POSITIVE_CONFIRMATIONS:
         complete_user_task(user_id=user_id, description=pending_completion)
         PENDING_TASK_CONFIRMATIONS.pop(user_id, None)
-        reply_text = f"Got it. I've marked '{pending_completion}' as completed."
-        remember_agent_reply(user_id, reply_text)
-        return build_agent_response(
-            reply=reply_text,
-            active_property=None,
-            all_properties=[],
-            requires_property_selection=False,
-            tasks=agent_memory.get_tasks(user_id),
+        return _final_turn(
+            user_id, f"Got it. I've marked '{pending_completion}' as completed."
         )
 
     if pending_completion and message_lower in NEGATIVE_CONFIRMATIONS:
         PENDING_TASK_CONFIRMATIONS.pop(user_id, None)
-        reply_text = (
-            "No problem. I'll keep that reminder active—let me know when it's done."
+        return _final_turn(
+            user_id,
+            "No problem. I'll keep that reminder active—let me know when it's done.",
         )
-        remember_agent_reply(user_id, reply_text)
-        return build_agent_response(
-            reply=reply_text,
-            active_property=None,
-            all_properties=[],
-            requires_property_selection=False,
-            tasks=agent_memory.get_tasks(user_id),
+
+    # ----------------------------
+    # Deterministic fast paths (no model call)
+    # ----------------------------
+    intents = classify_message(message_text)
+    fast_reply = answer_fast_path(db, user_id, intents["listing"])
+    if fast_reply:
+        return _final_turn(
+            user_id,
+            fast_reply["reply"],
+            active_property=fast_reply["active_property"],
+            all_properties=fast_reply["all_properties"],
+            tasks=current_tasks,
         )
 
     if not pending_completion:
-        matched_task = find_task_match(message_text, current_tasks)
-        if matched_task:
+        task_matches = find_task_matches(message_text, current_tasks, user_id)
+        if task_matches:
+            matched_task = task_matches[0]["description"]
             PENDING_TASK_CONFIRMATIONS[user_id] = matched_task
-            reply_text = (
-                f"Great! Should I mark \"{matched_task}\" as completed?"
-            )
-            remember_agent_reply(user_id, reply_text)
-            return build_agent_response(
-                reply=reply_text,
-                active_property=None,
-                all_properties=[],
-                requires_property_selection=False,
+            return _final_turn(
+                user_id,
+                f"Great! Should I mark \"{matched_task}\" as completed?",
                 tasks=current_tasks,
             )
 
     # ----------------------------
     # Non-property questions path
     # ----------------------------
-    general_request = is_document_question(message_text) or (
-        is_non_property_question(message_text) and not current_tasks
+    labels = intents["labels"]
+    general_request = "document" in labels or (
+        "non_property" in labels and not current_tasks
     )
 
     if general_request:
         PENDING_PROPERTY_REQUESTS.pop(user_id, None)
-        if is_weather_question(message):
-            reply_text = get_chicago_weather_summary()
-            remember_agent_reply(user_id, reply_text)
-            return build_agent_response(
-                reply=reply_text,
-                active_property=None,
-                all_properties=[],
-                requires_property_selection=False,
-                tasks=agent_memory.get_tasks(user_id),
-            )
-
-        general_messages = [
-            {"role": "system", "content": GENERAL_AGENT_SYSTEM_PROMPT},
-            {"role": "user", "content": message_text},
-        ]
-        general_functions = TASK_FUNCTION_DEFINITIONS + DOCUMENT_FUNCTION_DEFINITIONS
-
-        while True:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=general_messages,
-                functions=general_functions,
-                function_call="auto",
-            )
+        if "weather" in labels:
+            return {"weather": True}
 
-            msg = response.choices[0].message
-            if msg.function_call:
-                func_name = msg.function_call.name
-                args = json.loads(msg.function_call.arguments or "{}")
-                result = execute_tool(func_name, args, user_id=user_id)
-                general_messages.append(
-                    {
-                        "role": "function",
-                        "name": func_name,
-                        "content": json.dumps(result),
-                    }
-                )
-                continue
-
-            reply_text = msg.content or ""
-            remember_agent_reply(user_id, reply_text)
-            return build_agent_response(
-                reply=reply_text,
-                active_property=None,
-                all_properties=[],
-                requires_property_selection=False,
-                tasks=agent_memory.get_tasks(user_id),
-            )
+        prompt = (
+            PromptBuilder(GENERAL_AGENT_SYSTEM_PROMPT, GENERAL_TOOLS)
+            .user(message_text)
+            .build()
+        )
+        prompt_prefix_stats.record_prompt(prompt["prefix_hashes"])
+        return {
+            "messages": prompt["messages"],
+            "tools": GENERAL_TOOLS,
+            "active_property": None,
+            "all_properties": [],
+            "max_tool_rounds": None,
+            # The prompt is only the system prompt and the user's message,
+            # but the offered task and document tools read this user's
+            # state, which the cache key can't see.
+            "cacheable": False,
+        }
 
     context = resolve_property_context(db, user_id)
 
     # ---- Hard error
     if "error" in context:
-        reply_text = context["error"]
-        remember_agent_reply(user_id, reply_text)
-        return build_agent_response(
-            reply=reply_text,
-            active_property=None,
+        return _final_turn(
+            user_id,
+            context["error"],
             all_properties=context.get("all_properties", []),
-            requires_property_selection=False,
-            tasks=agent_memory.get_tasks(user_id),
         )
 
     all_properties = context.get("all_properties", [])
@@ -482,32 +565,28 @@ def run_home_agent(
             )
 
             if not selected:
-                reply_text = "Invalid property selection."
-                remember_agent_reply(user_id, reply_text)
-                return build_agent_response(
-                    reply=reply_text,
-                    active_property=None,
+                return _final_turn(
+                    user_id,
+                    "Invalid property selection.",
                     all_properties=all_properties,
                     requires_property_selection=True,
-                    tasks=agent_memory.get_tasks(user_id),
                 )
 
             active_property = selected
 
-        inferred_property = resolve_property_from_message(message, context["options"])
+        inferred_property = resolve_property_from_message(
+            message, context["options"], user_id
+        )
         if inferred_property:
             active_property = inferred_property
 
         if not active_property:
-            reply_text = build_multi_property_reply(message, context["options"])
             PENDING_PROPERTY_REQUESTS[user_id] = message
-            remember_agent_reply(user_id, reply_text)
-            return build_agent_response(
-                reply=reply_text,
-                active_property=None,
+            return _final_turn(
+                user_id,
+                build_multi_property_reply(message, context["options"]),
                 all_properties=all_properties,
                 requires_property_selection=True,
-                tasks=agent_memory.get_tasks(user_id),
             )
 
     # ---- Single property
@@ -536,19 +615,6 @@ def run_home_agent(
     else:
         tasks_summary = "- None."
 
-    system_prompt = (
-        HOME_AGENT_SYSTEM_PROMPT
-        + "\n\nUser properties on file:\n"
-        + properties_summary
-        + "\n\nThe user is referring to this property:\n"
-        + f"Property ID: {active_property['id']}\n"
-        + f"Address: {property_address}\n"
-        + f"City/State: {city_state}\n"
-        + "Do not ask for the address unless the user explicitly changes properties."
-        + "\n\nActive follow-up tasks:\n"
-        + tasks_summary
-    )
-
     agent_message = message
     if pending_property_message:
         selection_note = (
@@ -564,123 +630,388 @@ def run_home_agent(
         else:
             agent_message = f"{pending_property_message}\n\n{selection_note}"
 
+    # Static instructions first, then this user's properties (stable across
+    # their turns), then everything that changes turn to turn.
+    builder = (
+        PromptBuilder(HOME_AGENT_SYSTEM_PROMPT, PROPERTY_TOOLS)
+        .system("user", "User properties on file:\n" + properties_summary)
+        .system(
+            "turn",
+            "The user is referring to this property:\n"
+            + f"Property ID: {active_property['id']}\n"
+            + f"Address: {property_address}\n"
+            + f"City/State: {city_state}\n"
+            + "Do not ask for the address unless the user explicitly changes properties."
+            + "\n\nActive follow-up tasks:\n"
+            + tasks_summary,
+        )
+    )
     last_agent_note = LAST_AGENT_REPLY.get(user_id)
     if last_agent_note:
-        agent_message = (
-            "Previous assistant reply:\n"
-            f"{last_agent_note}\n\n"
-            "Latest user message:\n"
-            f"{agent_message}"
-        )
+        builder.assistant(last_agent_note)
+    prompt = builder.user(agent_message).build()
+    prompt_prefix_stats.record_prompt(prompt["prefix_hashes"])
 
-    base_messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": agent_message},
-    ]
+    return {
+        "messages": prompt["messages"],
+        "tools": PROPERTY_TOOLS,
+        "active_property": active_property,
+        "all_properties": all_properties,
+        "max_tool_rounds": MAX_TOOL_ROUNDS,
+        # The prompt carries this user's properties and tasks.
+        "cacheable": False,
+    }
 
-    functions_payload = [
-        {
-            "name": "get_home_value",
-            "description": "Get an estimated home value for the user's current property.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "address": {"type": "string"},
-                },
-                "required": ["address"],
-            },
-        },
-        {
-            "name": "get_local_services",
-            "description": "Find local services near the user's property.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "service": {"type": "string"},
-                    "city_state": {"type": "string"},
-                },
-                "required": ["service", "city_state"],
-            },
-        },
-    ] + TASK_FUNCTION_DEFINITIONS + DOCUMENT_FUNCTION_DEFINITIONS
-
-    MAX_TOOL_CALLS = 2
-    tool_calls = 0
-    messages = list(base_messages)
-
-    while True:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            functions=functions_payload,
-            function_call="auto",
-        )
 
-        msg = response.choices[0].message
-
-        if msg.function_call:
-            if tool_calls >= MAX_TOOL_CALLS:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": (
-                            "Please answer the user now using the information you already have. "
-                            "Do not call another tool."
-                        ),
-                    }
-                )
-                continue
+def _finish_weather_turn(user_id: int, reply_text: str) -> dict:
+    return _final_turn(user_id, reply_text)["response"]
 
-            func_name = msg.function_call.name
-            args = json.loads(msg.function_call.arguments)
 
-            if func_name == "get_home_value":
-                args["address"] = property_address
+def _tool_rounds_exhausted(plan: dict, tool_rounds: int) -> bool:
+    limit = plan["max_tool_rounds"]
+    return limit is not None and tool_rounds >= limit
+
+
+def _use_completion_cache(plan: dict, tool_rounds: int) -> bool:
+    # Later rounds include tool results, which are user- and time-specific.
+    return plan["cacheable"] and tool_rounds == 0
+
+
+def _completion_options(plan: dict, tool_rounds: int) -> dict:
+    """
+    Tools API arguments for the next model call. Once the round budget is
+    spent the model is told it can't call tools, so it answers directly
+    instead of burning a round-trip on a request we'd refuse.
+    """
+    if _tool_rounds_exhausted(plan, tool_rounds):
+        return {"tools": plan["tools"], "tool_choice": "none"}
+    return {
+        "tools": plan["tools"],
+        "tool_choice": "auto",
+        "parallel_tool_calls": True,
+    }
+
 
+def _parse_tool_calls(plan: dict, tool_calls) -> list[dict]:
+    """Normalize the model's tool calls to {"id", "name", "arguments"}."""
+    calls = []
+    for tool_call in tool_calls:
+        func_name = tool_call.function.name
+        args = json.loads(tool_call.function.arguments or "{}")
+
+        # Property tools always run against the resolved property.
+        active_property = plan["active_property"]
+        if active_property:
+            if func_name == "get_home_value":
+                args["address"] = active_property["address"]
             if func_name == "get_local_services":
-                args["city_state"] = city_state
+                args["city_state"] = active_property["city_state"]
 
-            result = execute_tool(func_name, args, user_id=user_id)
+        calls.append({"id": tool_call.id, "name": func_name, "arguments": args})
+    return calls
 
-            messages.append(
+
+def _record_tool_results(
+    plan: dict,
+    messages: list[dict],
+    content: str | None,
+    calls: list[dict],
+    results: list,
+    tool_rounds: int,
+) -> None:
+    messages.append(
+        {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
                 {
-                    "role": "function",
-                    "name": func_name,
-                    "content": json.dumps(result),
+                    "id": call["id"],
+                    "type": "function",
+                    "function": {
+                        "name": call["name"],
+                        "arguments": json.dumps(call["arguments"]),
+                    },
                 }
+                for call in calls
+            ],
+        }
+    )
+    for call, result in zip(calls, results):
+        messages.append(
+            {
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "content": json.dumps(result),
+            }
+        )
+
+    if plan["max_tool_rounds"] is None:
+        return
+
+    if any(call["name"] == "get_local_services" for call in calls):
+        messages.append(
+            {
+                "role": "user",
+                "content": (
+                    "Use the service entries exactly as provided. "
+                    "Do not add numbering or bullets—keep each entry separated by blank lines."
+                ),
+            }
+        )
+
+    if tool_rounds < plan["max_tool_rounds"]:
+        messages.append(
+            {
+                "role": "user",
+                "content": (
+                    "If another tool call would help answer the user, call it now. "
+                    "Otherwise, respond directly."
+                ),
+            }
+        )
+
+
+def _finish_chat_turn(user_id: int, plan: dict, reply_text: str) -> dict:
+    return _final_turn(
+        user_id,
+        reply_text,
+        active_property=plan["active_property"],
+        all_properties=plan["all_properties"],
+    )["response"]
+
+
+# ----------------------------
+# Main agent runner
+# ----------------------------
+
+
+def run_home_agent(
+    *,
+    db: Session,
+    user_id: int,
+    message: str,
+    property_id: int | None = None,
+) -> dict:
+    """
+    User-aware Home AI Agent
+    """
+    with agent_memory.turn_snapshot(), session_state_turn(), span(
+        AGENT_TURN_SECONDS, mode="sync", path="chat"
+    ) as turn:
+        plan = plan_agent_turn(
+            db=db, user_id=user_id, message=message, property_id=property_id
+        )
+        if "response" in plan:
+            turn["path"] = "direct"
+            return plan["response"]
+        if "weather" in plan:
+            turn["path"] = "weather"
+            return _finish_weather_turn(user_id, get_chicago_weather_summary())
+
+        messages = list(plan["messages"])
+        tool_rounds = 0
+
+        while True:
+            response = create_completion(
+                model=AGENT_MODEL,
+                messages=messages,
+                cache=_use_completion_cache(plan, tool_rounds),
+                **_completion_options(plan, tool_rounds),
             )
 
-            if func_name == "get_local_services":
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": (
-                            "Use the service entries exactly as provided. "
-                            "Do not add numbering or bullets—keep each entry separated by blank lines."
-                        ),
-                    }
+            msg = response.choices[0].message
+
+            if msg.tool_calls:
+                calls = _parse_tool_calls(plan, msg.tool_calls)
+                results = run_tool_calls(calls, user_id=user_id)
+                tool_rounds += 1
+                _record_tool_results(
+                    plan, messages, msg.content, calls, results, tool_rounds
                 )
+                continue
 
-            tool_calls += 1
+            return _finish_chat_turn(user_id, plan, msg.content or "")
 
-            if tool_calls < MAX_TOOL_CALLS:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": (
-                            "If another tool call would help answer the user, call it now. "
-                            "Otherwise, respond directly."
-                        ),
-                    }
+
+async def run_home_agent_async(
+    *,
+    db: Session,
+    user_id: int,
+    message: str,
+    property_id: int | None = None,
+) -> dict:
+    """
+    Async variant of ``run_home_agent``. Model and upstream HTTP calls are
+    awaited instead of holding a worker thread, so concurrent chats are
+    bounded by upstream limits rather than the threadpool. Only the short
+    database lookup in ``plan_agent_turn`` runs on a thread.
+    """
+    with agent_memory.turn_snapshot(), session_state_turn(), span(
+        AGENT_TURN_SECONDS, mode="async", path="chat"
+    ) as turn:
+        plan = await run_in_threadpool(
+            plan_agent_turn,
+            db=db,
+            user_id=user_id,
+            message=message,
+            property_id=property_id,
+        )
+        if "response" in plan:
+            turn["path"] = "direct"
+            return plan["response"]
+        if "weather" in plan:
+            turn["path"] = "weather"
+            reply_text = await get_chicago_weather_summary_async()
+            return await run_in_threadpool(_finish_weather_turn, user_id, reply_text)
+
+        messages = list(plan["messages"])
+        tool_rounds = 0
+
+        while True:
+            response = await create_completion_async(
+                model=AGENT_MODEL,
+                messages=messages,
+                cache=_use_completion_cache(plan, tool_rounds),
+                **_completion_options(plan, tool_rounds),
+            )
+
+            msg = response.choices[0].message
+
+            if msg.tool_calls:
+                calls = _parse_tool_calls(plan, msg.tool_calls)
+                results = await run_tool_calls_async(calls, user_id=user_id)
+                tool_rounds += 1
+                _record_tool_results(
+                    plan, messages, msg.content, calls, results, tool_rounds
                 )
+                continue
 
-            continue
+            # Saving the reply and reading tasks touch the session store and DB.
+            return await run_in_threadpool(
+                _finish_chat_turn, user_id, plan, msg.content or ""
+            )
 
-        reply_text = msg.content or ""
-        remember_agent_reply(user_id, reply_text)
-        return build_agent_response(
-            reply=reply_text,
-            active_property=active_property,
-            all_properties=all_properties,
-            tasks=agent_memory.get_tasks(user_id),
+
+async def stream_home_agent(
+    *,
+    db: Session,
+    user_id: int,
+    message: str,
+    property_id: int | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Streaming variant of ``run_home_agent_async``. Yields events as
+    ``{"event": name, "data": {...}}``:
+    - ``tool_start`` / ``tool_end`` around each tool call
+    - ``token`` for each piece of the reply
+    - ``done`` with the same payload ``run_home_agent_async`` returns
+    Only the round that answers without calling tools produces ``token``
+    events, so the streamed text always equals the ``done`` reply. Whether a
+    round calls tools is only known once it ends, so its text is held back
+    until then, except when tools are switched off for the round, which can
+    only answer and streams as the model writes.
+    """
+    with agent_memory.turn_snapshot(), session_state_turn(), span(
+        AGENT_TURN_SECONDS, mode="stream", path="chat"
+    ) as turn:
+        plan = await run_in_threadpool(
+            plan_agent_turn,
+            db=db,
+            user_id=user_id,
+            message=message,
+            property_id=property_id,
         )
+        if "response" in plan:
+            turn["path"] = "direct"
+            result = plan["response"]
+        elif "weather" in plan:
+            turn["path"] = "weather"
+            reply_text = await get_chicago_weather_summary_async()
+            result = await run_in_threadpool(_finish_weather_turn, user_id, reply_text)
+        else:
+            result = None
+
+        if result is not None:
+            yield {"event": "token", "data": {"text": result["reply"]}}
+            yield {"event": "done", "data": result}
+            return
+
+        messages = list(plan["messages"])
+        tool_rounds = 0
+
+        while True:
+            options = _completion_options(plan, tool_rounds)
+            stream = await create_completion_async(
+                model=AGENT_MODEL,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **options,
+            )
+
+            stream_live = options["tool_choice"] == "none"
+            reply_parts: list[str] = []
+            # Tool call deltas arrive as fragments keyed by their index.
+            partial_calls: dict[int, dict] = {}
+            async for chunk in stream:
+                # The closing chunk carries usage and no choices.
+                record_usage(AGENT_MODEL, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                for tool_delta in delta.tool_calls or ():
+                    partial = partial_calls.setdefault(
+                        tool_delta.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    partial["id"] += tool_delta.id or ""
+                    if tool_delta.function:
+                        partial["name"] += tool_delta.function.name or ""
+                        partial["arguments"] += tool_delta.function.arguments or ""
+                if delta.content:
+                    reply_parts.append(delta.content)
+                    if stream_live:
+                        yield {"event": "token", "data": {"text": delta.content}}
+
+            if partial_calls:
+                calls = _parse_tool_calls(
+                    plan,
+                    [
+                        SimpleNamespace(
+                            id=partial["id"],
+                            function=SimpleNamespace(
+                                name=partial["name"], arguments=partial["arguments"]
+                            ),
+                        )
+                        for _, partial in sorted(partial_calls.items())
+                    ],
+                )
+                for call in calls:
+                    yield {
+                        "event": "tool_start",
+                        "data": {"name": call["name"], "arguments": call["arguments"]},
+                    }
+                results: list = [None] * len(calls)
+                async for index, result in iter_tool_calls_async(calls, user_id=user_id):
+                    results[index] = result
+                    yield {"event": "tool_end", "data": {"name": calls[index]["name"]}}
+                tool_rounds += 1
+                _record_tool_results(
+                    plan,
+                    messages,
+                    "".join(reply_parts) or None,
+                    calls,
+                    results,
+                    tool_rounds,
+                )
+                continue
+
+            if not stream_live:
+                for part in reply_parts:
+                    yield {"event": "token", "data": {"text": part}}
+            yield {
+                "event": "done",
+                "data": await run_in_threadpool(
+                    _finish_chat_turn, user_id, plan, "".join(reply_parts)
+                ),
+            }
+            return
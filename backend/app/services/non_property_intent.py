@@ -30,10 +30,8 @@ DOCUMENT_PATTERNS = [
     r"\bupload\b",
 ]
 
-NON_PROPERTY_PATTERNS = [
-    *WEATHER_PATTERNS,
-    *REMINDER_PATTERNS,
-    *DOCUMENT_PATTERNS,
+# Non-property prompts that aren't weather, reminders or documents.
+GENERAL_PATTERNS = [
     r"\btime\b",
     r"\bdate\b",
     r"\bwho are you\b",
@@ -46,25 +44,139 @@ NON_PROPERTY_PATTERNS = [
     r"\bwhat is\b",
 ]
 
+NON_PROPERTY_PATTERNS = [
+    *WEATHER_PATTERNS,
+    *REMINDER_PATTERNS,
+    *DOCUMENT_PATTERNS,
+    *GENERAL_PATTERNS,
+]
 
-def is_non_property_question(message: str) -> bool:
+# Any keyword intent also makes a message "non_property".
+INTENT_PATTERNS = {
+    "weather": WEATHER_PATTERNS,
+    "reminder": REMINDER_PATTERNS,
+    "document": DOCUMENT_PATTERNS,
+    "general": GENERAL_PATTERNS,
+}
+
+
+# Whole-message listing requests the agent answers from stored data without
+# calling the model. Each pattern must match the entire (normalized)
+# message, so "show my tasks and find a plumber" still goes to the LLM.
+_SHOW = r"(?:show|list|view|see|display|give|get)(?: me)?(?: all)?(?: of)?"
+_POLITE = r"(?:can you |could you |please )?"
+_TRAILER = r"(?: please)?"
+
+TASK_NOUNS = r"(?:tasks|reminders|to ?dos|to-dos|to ?do list|to-do list|follow ups|follow-ups)"
+TASK_LIST_PATTERNS = [
+    rf"{_POLITE}{_SHOW} my(?: open| active| current| pending)? {TASK_NOUNS}{_TRAILER}",
+    rf"what(?: are|'re) my(?: open| active| current| pending)? {TASK_NOUNS}",
+    rf"what(?:'s| is) on my (?:to ?do |to-do )?list",
+    rf"do i have any(?: open| active| pending)? {TASK_NOUNS}",
+    rf"(?:my )?{TASK_NOUNS}",
+]
+
+DOCUMENT_NOUNS = r"(?:(?:uploaded )?(?:documents|docs|files|pdfs)|uploads)"
+DOCUMENT_LIST_PATTERNS = [
+    rf"{_POLITE}{_SHOW} my {DOCUMENT_NOUNS}{_TRAILER}",
+    rf"(?:what|which) {DOCUMENT_NOUNS} (?:do i have|have i uploaded|did i upload)(?: on file)?",
+    rf"what(?: are|'re) my {DOCUMENT_NOUNS}",
+    rf"how many {DOCUMENT_NOUNS} (?:do i have|have i uploaded)",
+    rf"(?:my )?{DOCUMENT_NOUNS}",
+]
+
+PROPERTY_NOUNS = r"(?:properties|homes|houses|addresses)"
+PROPERTY_LIST_PATTERNS = [
+    rf"{_POLITE}{_SHOW} my {PROPERTY_NOUNS}{_TRAILER}",
+    rf"(?:what|which) {PROPERTY_NOUNS} do i (?:have|own)(?: on file)?",
+    rf"what(?: are|'re) my {PROPERTY_NOUNS}",
+    rf"how many {PROPERTY_NOUNS} do i (?:have|own)(?: on file)?",
+    rf"(?:my )?{PROPERTY_NOUNS}",
+]
+
+LISTING_PATTERNS = {
+    "task_list": TASK_LIST_PATTERNS,
+    "document_list": DOCUMENT_LIST_PATTERNS,
+    "property_list": PROPERTY_LIST_PATTERNS,
+}
+
+
+def _compile_alternation(groups: dict[str, list[str]], flags: int = 0) -> re.Pattern:
+    # One named group per label, so ``match.lastgroup`` names the intent.
+    return re.compile(
+        "|".join(
+            f"(?P<{label}>{'|'.join(f'(?:{p})' for p in patterns)})"
+            for label, patterns in groups.items()
+        ),
+        flags,
+    )
+
+
+# Compiled once at import: one scan finds every keyword intent, one
+# fullmatch decides the listing intent.
+INTENT_SCANNER = _compile_alternation(INTENT_PATTERNS, re.IGNORECASE)
+LISTING_MATCHER = _compile_alternation(LISTING_PATTERNS)
+
+
+def _normalize_request(message: str) -> str:
     text = (message or "").lower().strip()
-    if not text:
-        return False
-    if any(re.search(p, text) for p in REMINDER_PATTERNS):
-        return True
-    return any(re.search(p, text) for p in NON_PROPERTY_PATTERNS)
+    text = text.replace("’", "'")
+    return re.sub(r"\s+", " ", text).rstrip("?.! ")
+
+
+def classify_message(message: str) -> dict:
+    """
+    Classify ``message`` in a single pass. Returns:
+    - ``labels``: every keyword intent found ("weather", "reminder",
+      "document", "general"), plus "non_property" if any matched
+    - ``matches``: [{"label", "start", "end", "text"}] in message order,
+      offsets into the original message
+    - ``listing``: "task_list", "document_list" or "property_list" when the
+      whole message is a listing request, else None
+    """
+    message = message or ""
+    matches = [
+        {
+            "label": match.lastgroup,
+            "start": match.start(),
+            "end": match.end(),
+            "text": match.group(),
+        }
+        for match in INTENT_SCANNER.finditer(message)
+    ]
+    labels = {match["label"] for match in matches}
+    if labels:
+        labels.add("non_property")
+
+    listing = None
+    normalized = _normalize_request(message)
+    if normalized:
+        listing_match = LISTING_MATCHER.fullmatch(normalized)
+        if listing_match:
+            listing = listing_match.lastgroup
+
+    return {"labels": frozenset(labels), "matches": matches, "listing": listing}
+
+
+def is_non_property_question(message: str) -> bool:
+    return "non_property" in classify_message(message)["labels"]
 
 
 def is_weather_question(message: str) -> bool:
-    text = (message or "").lower().strip()
-    if not text:
-        return False
-    return any(re.search(p, text) for p in WEATHER_PATTERNS)
+    return "weather" in classify_message(message)["labels"]
 
 
 def is_document_question(message: str) -> bool:
-    text = (message or "").lower().strip()
-    if not text:
-        return False
-    return any(re.search(p, text) for p in DOCUMENT_PATTERNS)
+    return "document" in classify_message(message)["labels"]
+
+
+def is_task_list_request(message: str) -> bool:
+    return classify_message(message)["listing"] == "task_list"
+
+
+def is_document_list_request(message: str) -> bool:
+    return classify_message(message)["listing"] == "document_list"
+
+
+def is_property_list_request(message: str) -> bool:
+    return classify_message(message)["listing"] == "property_list"
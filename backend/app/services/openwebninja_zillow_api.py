@@ -2,22 +2,25 @@ import os
 from dotenv import load_dotenv
 import requests
 
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_SECONDS, span
+from app.services.http_client import get_async_http_client
+
 load_dotenv()
 
 OPENWEBNINJA_API_KEY = os.getenv("OPENWEBNINJA_API_KEY")
 OPENWEBNINJA_ENDPOINT = (
-    "https://api.openwebninja.com/realtime-zillow-data/property-details-address"
+    f"{settings.OPENWEBNINJA_BASE_URL.rstrip('/')}"
+    "/realtime-zillow-data/property-details-address"
 )
 
 
-def get_property_details_by_address(address: str) -> str:
+def _request_headers() -> dict:
+    return {"x-api-key": OPENWEBNINJA_API_KEY, "Accept": "application/json"}
 
-    headers = {"x-api-key": OPENWEBNINJA_API_KEY, "Accept": "application/json"}
-    params = {"address": address}
 
-    response = requests.get(OPENWEBNINJA_ENDPOINT, params=params, headers=headers)
-    response.raise_for_status()
-    data = response.json().get("data", {})
+def _property_details(payload: dict) -> dict:
+    data = payload.get("data", {})
 
     # Return the full JSON if the API returns details
     if data:
@@ -26,6 +29,28 @@ def get_property_details_by_address(address: str) -> str:
         raise ValueError("No property details found for this address")
 
 
+def get_property_details_by_address(address: str) -> str:
+    params = {"address": address}
+
+    with span(UPSTREAM_SECONDS, upstream="zillow", operation="property_details"):
+        response = requests.get(
+            OPENWEBNINJA_ENDPOINT, params=params, headers=_request_headers(), timeout=10
+        )
+        response.raise_for_status()
+    return _property_details(response.json())
+
+
+async def get_property_details_by_address_async(address: str) -> dict:
+    params = {"address": address}
+
+    with span(UPSTREAM_SECONDS, upstream="zillow", operation="property_details"):
+        response = await get_async_http_client().get(
+            OPENWEBNINJA_ENDPOINT, params=params, headers=_request_headers()
+        )
+        response.raise_for_status()
+    return _property_details(response.json())
+
+
 def get_zestimate_from_data(property_data: dict) -> str:
     """
     Extract the Zestimate (estimated home value) from the full property details.
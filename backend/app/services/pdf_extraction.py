@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Iterator
+
+from pypdf import PdfReader
+
+from app.services.document_text import DocumentText, DocumentTextWriter, page_table_path
+from app.services.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+def extraction_lock_path(text_path: Path) -> Path:
+    return text_path.with_suffix(".lock")
+
+
+def _iter_reader_pages(
+    reader: PdfReader, start_page: int
+) -> Iterator[tuple[int, str | None]]:
+    """
+    Lazily extract a PDF one page at a time, starting at 0-based ``start_page``.
+    Yields (1-based page number, text), with ``None`` for a page that failed
+    to parse so one bad page doesn't sink the whole document.
+    """
+    for index in range(start_page, len(reader.pages)):
+        try:
+            text = (reader.pages[index].extract_text() or "").strip()
+        except Exception as exc:
+            logger.warning("Skipping unreadable PDF page %s: %s", index + 1, exc)
+            text = None
+        yield index + 1, text
+
+
+def extract_pdf_to_text(pdf_path: str | Path, text_path: str | Path) -> dict:
+    """
+    Stream a PDF's pages into ``text_path`` (plus its page table), holding at
+    most one page in memory. Progress is checkpointed after every page, so
+    calling this again after a crash resumes where the last run stopped.
+
+    Identical uploads share one text file, so only one extraction per
+    ``text_path`` runs at a time, across processes; a caller that waited for
+    the lock and finds the text finished gets it back as
+    {"page_count": int, "skipped_pages": [], "reused": True} without
+    touching the PDF.
+
+    Returns {"page_count": int, "skipped_pages": [1-based page numbers]}.
+    Raises if the PDF can't be opened or no page could be extracted.
+    Kept at module level so it can be shipped to ingestion worker processes.
+    """
+    text_path = Path(text_path)
+    with file_lock(extraction_lock_path(text_path)):
+        if page_table_path(text_path).exists():
+            with DocumentText(text_path) as existing:
+                return {
+                    "page_count": existing.page_count,
+                    "skipped_pages": [],
+                    "reused": True,
+                }
+
+        # Open the PDF first so an unreadable file leaves no text behind.
+        reader = PdfReader(str(pdf_path))
+        writer = DocumentTextWriter(text_path)
+        try:
+            for _, text in _iter_reader_pages(reader, writer.pages_written):
+                writer.write_page(text or "", skipped=text is None)
+        except BaseException:
+            writer.close()
+            raise
+
+        result = writer.finish()
+        if result["page_count"] and len(result["skipped_pages"]) == result["page_count"]:
+            for path in (text_path, page_table_path(text_path)):
+                path.unlink(missing_ok=True)
+            raise ValueError("No pages could be extracted from this PDF.")
+        return result
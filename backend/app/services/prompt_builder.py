@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# Segments from most static to most volatile. Providers cache the longest
+# previously seen prompt prefix, so anything that changes per user or per
+# turn must come after everything that doesn't.
+PROMPT_LAYERS = ("static", "user", "turn")
+SEEN_PREFIXES_LIMIT = 4096
+
+
+class PromptBuilder:
+    """
+    Assemble chat messages in a fixed, cache-friendly order:
+
+    1. ``static``: the system instructions (the tool schemas are hashed in
+       here too, since the provider serializes them ahead of the messages)
+    2. ``user``: context that only changes when the user's data does, such
+       as their properties on file
+    3. ``turn``: the active property, open tasks, the previous reply and the
+       new message
+
+    Adding a segment to an earlier layer after a later one raises
+    ``ValueError``, so a volatile value can't slip in front of stable ones.
+    ``build`` returns the messages plus a rolling hash of the prompt at the
+    end of each layer, which ``PromptPrefixStats`` uses to report reuse.
+    """
+
+    def __init__(self, instructions: str, tools: list[dict] | None = None) -> None:
+        self.tools = tools
+        self._segments: list[tuple[str, dict]] = []
+        self.system("static", instructions)
+
+    def _add(self, layer: str, message: dict) -> "PromptBuilder":
+        position = PROMPT_LAYERS.index(layer)
+        if self._segments and position < PROMPT_LAYERS.index(self._segments[-1][0]):
+            raise ValueError(
+                f"Prompt segment for layer '{layer}' added after "
+                f"'{self._segments[-1][0]}'"
+            )
+        self._segments.append((layer, message))
+        return self
+
+    def system(self, layer: str, content: str) -> "PromptBuilder":
+        return self._add(layer, {"role": "system", "content": content.strip()})
+
+    def assistant(self, content: str) -> "PromptBuilder":
+        return self._add("turn", {"role": "assistant", "content": content})
+
+    def user(self, content: str) -> "PromptBuilder":
+        return self._add("turn", {"role": "user", "content": content})
+
+    def build(self) -> dict:
+        """Return {"messages": [...], "prefix_hashes": {layer: sha256}}."""
+        digest = hashlib.sha256(
+            json.dumps(self.tools or [], sort_keys=True).encode("utf-8")
+        )
+        prefix_hashes: dict[str, str] = {}
+        messages: list[dict] = []
+        for index, (layer, message) in enumerate(self._segments):
+            digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            messages.append(message)
+            next_layer = (
+                self._segments[index + 1][0]
+                if index + 1 < len(self._segments)
+                else None
+            )
+            if next_layer != layer:
+                prefix_hashes[layer] = digest.hexdigest()
+        return {"messages": messages, "prefix_hashes": prefix_hashes}
+
+
+class PromptPrefixStats:
+    """
+    How often each prompt layer's prefix repeats a recently built one (a
+    bounded LRU of hashes, per process), plus the prompt and cached token
+    counts the provider reports, so reuse can be checked against the bill.
+    """
+
+    def __init__(self, max_prefixes: int = SEEN_PREFIXES_LIMIT) -> None:
+        self.max_prefixes = max_prefixes
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._layers = {layer: {"reused": 0, "new": 0} for layer in PROMPT_LAYERS}
+        self._tokens = {"prompt_tokens": 0, "cached_tokens": 0}
+        self._lock = threading.Lock()
+
+    def record_prompt(self, prefix_hashes: dict[str, str]) -> None:
+        with self._lock:
+            for layer, prefix_hash in prefix_hashes.items():
+                if prefix_hash in self._seen:
+                    self._seen.move_to_end(prefix_hash)
+                    self._layers[layer]["reused"] += 1
+                    continue
+                self._layers[layer]["new"] += 1
+                self._seen[prefix_hash] = None
+                while len(self._seen) > self.max_prefixes:
+                    self._seen.popitem(last=False)
+
+    def record_usage(self, usage) -> None:
+        """Add a completion's ``usage`` (None when the provider omits it)."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        with self._lock:
+            self._tokens["prompt_tokens"] += usage.prompt_tokens or 0
+            self._tokens["cached_tokens"] += cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            layers = {layer: dict(counts) for layer, counts in self._layers.items()}
+            tokens = dict(self._tokens)
+        for counts in layers.values():
+            total = counts["reused"] + counts["new"]
+            counts["reuse_rate"] = round(counts["reused"] / total, 4) if total else 0.0
+        prompt_tokens = tokens["prompt_tokens"]
+        return {
+            "layers": layers,
+            **tokens,
+            "cached_token_rate": (
+                round(tokens["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+            ),
+        }
+
+
+prompt_prefix_stats = PromptPrefixStats()
@@ -11,6 +11,9 @@ def get_user_properties(db: Session, user_id: int) -> list[Property]:
             PropertyUsers.user_id == user_id,
             PropertyUsers.is_active.is_(True),
         )
+        # A stable order keeps the properties block of the prompt identical
+        # across turns (and the UI list from reshuffling).
+        .order_by(Property.id)
         .all()
     )
 
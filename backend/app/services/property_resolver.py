@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# "property 12", "property #12", "id 12": an explicit property id.
+EXPLICIT_ID_PATTERN = re.compile(r"\b(?:property|id)\s*#?\s*(\d+)\b|#(\d+)\b")
+
+STREET_SUFFIXES = {
+    "street": "st", "avenue": "ave", "av": "ave", "drive": "dr", "road": "rd",
+    "boulevard": "blvd", "lane": "ln", "court": "ct", "place": "pl",
+    "terrace": "ter", "circle": "cir", "parkway": "pkwy", "highway": "hwy",
+    "square": "sq", "trail": "trl", "north": "n", "south": "s", "east": "e",
+    "west": "w",
+}
+# Suffixes and directionals are shared by most addresses: they add a little
+# weight but never make a property a candidate on their own.
+WEAK_TOKENS = set(STREET_SUFFIXES.values()) | {"way", "apt", "unit", "suite"}
+
+# Evidence per field, before IDF.
+NUMBER_WEIGHT = 2.0
+STREET_WEIGHT = 1.5
+CITY_WEIGHT = 1.0
+WEAK_WEIGHT = 0.25
+
+# Fuzzy matching for misspelled street and city names.
+TRIGRAM_MIN_TOKEN = 4
+TRIGRAM_MIN_SIMILARITY = 0.5
+FUZZY_PENALTY = 0.8
+FUZZY_CACHE_SIZE = 4096
+
+# A property is only picked when it explains most of what the message
+# matched and nothing else explains as much.
+MIN_CONFIDENCE = 0.75
+CACHED_USERS = 1024
+
+
+def normalize_token(token: str) -> str:
+    return STREET_SUFFIXES.get(token, token)
+
+
+def _tokens(text: str) -> list[str]:
+    return [normalize_token(t) for t in TOKEN_PATTERN.findall(text.lower())]
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _address_fields(property_obj: dict) -> dict[str, float]:
+    """Map each normalized address token to its field weight."""
+    fields: dict[str, float] = {}
+    street, _, _ = property_obj["address"].partition(",")
+    street_tokens = _tokens(street)
+    if street_tokens and street_tokens[0].isdigit():
+        fields[street_tokens[0]] = NUMBER_WEIGHT
+        street_tokens = street_tokens[1:]
+    for token in street_tokens:
+        weight = WEAK_WEIGHT if token in WEAK_TOKENS else STREET_WEIGHT
+        fields[token] = max(fields.get(token, 0.0), weight)
+
+    # "Chicago, IL": the state is too short and too shared to be evidence.
+    city, _, _ = property_obj["city_state"].partition(",")
+    for token in _tokens(city):
+        fields.setdefault(token, CITY_WEIGHT)
+    return fields
+
+
+class PropertyAddressIndex:
+    """
+    Inverted index over one user's property addresses: normalized house
+    number, street and city tokens (suffixes like "Street"/"St" folded
+    together), IDF-weighted so tokens shared by many properties count for
+    less, plus character trigrams of the vocabulary for misspellings.
+    """
+
+    def __init__(self, properties: list[dict]) -> None:
+        self.properties = properties
+        self.by_id = {str(p["id"]): p for p in properties}
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for index, property_obj in enumerate(properties):
+            for token, weight in _address_fields(property_obj).items():
+                self._postings[token].append((index, weight))
+
+        count = len(properties)
+        self._idf = {
+            token: math.log(1 + count / len(postings))
+            for token, postings in self._postings.items()
+        }
+        self._trigram_vocab: dict[str, set[str]] = defaultdict(set)
+        for token in self._postings:
+            if len(token) >= TRIGRAM_MIN_TOKEN and not token.isdigit():
+                for trigram in _trigrams(token):
+                    self._trigram_vocab[trigram].add(token)
+        self._fuzzy_cache: dict[str, list[tuple[str, float]]] = {}
+
+    def _fuzzy_matches(self, token: str) -> list[tuple[str, float]]:
+        cached = self._fuzzy_cache.get(token)
+        if cached is not None:
+            return cached
+        grams = _trigrams(token)
+        overlaps: dict[str, int] = defaultdict(int)
+        for trigram in grams:
+            for candidate in self._trigram_vocab.get(trigram, ()):
+                overlaps[candidate] += 1
+        matches = []
+        for candidate, shared in overlaps.items():
+            similarity = shared / len(grams | _trigrams(candidate))
+            if similarity >= TRIGRAM_MIN_SIMILARITY:
+                matches.append((candidate, similarity * FUZZY_PENALTY))
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[token] = matches
+        return matches
+
+    def _vocab_matches(self, token: str) -> list[tuple[str, float]]:
+        if token in self._postings:
+            return [(token, 1.0)]
+        if len(token) < TRIGRAM_MIN_TOKEN or token.isdigit():
+            return []
+        return self._fuzzy_matches(token)
+
+    def rank(self, message: str, limit: int = 5) -> list[dict]:
+        """
+        Score every property the message mentions. Returns up to ``limit``
+        {"property", "score", "confidence"} dicts, best first, where
+        confidence is the share of the message's matched address evidence
+        that the property explains (1.0 = it accounts for all of it).
+        """
+        explicit = EXPLICIT_ID_PATTERN.search(message.lower())
+        if explicit:
+            property_obj = self.by_id.get(explicit.group(1) or explicit.group(2))
+            if property_obj:
+                return [{"property": property_obj, "score": 1.0, "confidence": 1.0}]
+
+        # A bare number naming a property id, as in a reply to the selection
+        # prompt. House numbers win: "12" is not property 12 when one of the
+        # addresses starts with 12.
+        for token in _tokens(message):
+            if token.isdigit() and token in self.by_id and token not in self._postings:
+                return [
+                    {"property": self.by_id[token], "score": 1.0, "confidence": 1.0}
+                ]
+
+        scores: dict[int, float] = defaultdict(float)
+        strong: set[int] = set()
+        evidence = 0.0
+        for token in dict.fromkeys(_tokens(message)):
+            best_for_token: dict[int, float] = {}
+            for vocab_token, similarity in self._vocab_matches(token):
+                idf = self._idf[vocab_token]
+                for index, weight in self._postings[vocab_token]:
+                    contribution = idf * weight * similarity
+                    if contribution > best_for_token.get(index, 0.0):
+                        best_for_token[index] = contribution
+                    if weight > WEAK_WEIGHT:
+                        strong.add(index)
+            if best_for_token:
+                evidence += max(best_for_token.values())
+                for index, contribution in best_for_token.items():
+                    scores[index] += contribution
+
+        ranked = sorted(
+            (index for index in scores if index in strong),
+            key=lambda index: scores[index],
+            reverse=True,
+        )
+        return [
+            {
+                "property": self.properties[index],
+                "score": round(scores[index], 4),
+                "confidence": round(min(1.0, scores[index] / evidence), 4),
+            }
+            for index in ranked[:limit]
+        ]
+
+    def resolve(self, message: str) -> dict | None:
+        """The single property the message clearly refers to, if any."""
+        ranked = self.rank(message, limit=2)
+        if not ranked or ranked[0]["confidence"] < MIN_CONFIDENCE:
+            return None
+        if len(ranked) > 1 and ranked[1]["score"] >= ranked[0]["score"]:
+            return None
+        return ranked[0]["property"]
+
+
+def _signature(properties: list[dict]) -> tuple:
+    return tuple((p["id"], p["address"], p["city_state"]) for p in properties)
+
+
+class PropertyResolver:
+    """
+    Per-user cache of ``PropertyAddressIndex``. Callers hand in the user's
+    current property list every turn; an entry is rebuilt whenever that
+    list (ids, addresses, cities) no longer matches the one indexed, so
+    changes made by any worker are picked up without explicit invalidation.
+    """
+
+    def __init__(self, max_users: int = CACHED_USERS) -> None:
+        self.max_users = max_users
+        self._indexes: OrderedDict[int, tuple[tuple, PropertyAddressIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index_for(self, user_id: int, properties: list[dict]) -> PropertyAddressIndex:
+        signature = _signature(properties)
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(user_id)
+                return cached[1]
+
+        index = PropertyAddressIndex(properties)
+        with self._lock:
+            self._indexes[user_id] = (signature, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+
+property_resolver = PropertyResolver()
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol
+
+SESSION_STATE_BACKEND = os.getenv("SESSION_STATE_BACKEND", "memory")
+SESSION_STATE_PATH = Path(os.getenv("SESSION_STATE_PATH", "storage/session_state.sqlite3"))
+SESSION_STATE_TTL_SECONDS = float(os.getenv("SESSION_STATE_TTL_SECONDS", str(24 * 60 * 60)))
+SESSION_STATE_MAX_ENTRIES = int(os.getenv("SESSION_STATE_MAX_ENTRIES", "100000"))
+SESSION_STATE_CACHE_SIZE = 256
+# Expired rows are swept on every Nth write rather than on every one.
+PURGE_EVERY_WRITES = 256
+
+# SQLite connections whose read cache was checked during the current turn.
+_TURN_VALIDATED: ContextVar[set | None] = ContextVar(
+    "session_state_turn_validated", default=None
+)
+
+
+@contextmanager
+def session_state_turn() -> Iterator[None]:
+    """
+    Scope one agent turn: inside it the SQLite backend checks whether other
+    connections have written at most once per connection, instead of on
+    every read. Writes made during the turn reset the checks.
+    """
+    token = _TURN_VALIDATED.set(set())
+    try:
+        yield
+    finally:
+        try:
+            _TURN_VALIDATED.reset(token)
+        except ValueError:
+            # Exited from a different context (e.g. a closed generator).
+            _TURN_VALIDATED.set(None)
+
+
+def _expires_at(ttl: float | None) -> float | None:
+    return time.time() + ttl if ttl else None
+
+
+def _expired(expires_at: float | None, now: float) -> bool:
+    return expires_at is not None and expires_at <= now
+
+
+class SessionStateBackend(Protocol):
+    """
+    Per-user conversation state shared by every agent path: keys are
+    (namespace, key) pairs and values are JSON-serializable. ``ttl`` is in
+    seconds; None keeps the value until it is removed.
+    """
+
+    name: str
+
+    def get(self, namespace: str, key: str) -> Any | None: ...
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None) -> None: ...
+
+    def pop(self, namespace: str, key: str) -> Any | None: ...
+
+    def update(
+        self,
+        namespace: str,
+        key: str,
+        func: Callable[[Any | None], Any],
+        ttl: float | None,
+    ) -> Any: ...
+
+
+class MemorySessionState:
+    """
+    Process-local state. Fine for a single worker; with several workers a
+    user's follow-up can land on a process that never saw the question.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = SESSION_STATE_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[tuple[str, str], tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._writes = 0
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [k for k, (expires_at, _) in self._entries.items() if _expired(expires_at, now)]
+        for entry_key in expired:
+            del self._entries[entry_key]
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if _expired(entry[0], time.time()):
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None) -> None:
+        with self._lock:
+            self._entries[(namespace, key)] = (_expires_at(ttl), value)
+            self._entries.move_to_end((namespace, key))
+            self._writes += 1
+            if self._writes % PURGE_EVERY_WRITES == 0:
+                self._purge()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, namespace: str, key: str) -> Any | None:
+        with self._lock:
+            value = self.get(namespace, key)
+            self._entries.pop((namespace, key), None)
+            return value
+
+    def update(self, namespace, key, func, ttl):
+        with self._lock:
+            value = func(self.get(namespace, key))
+            self.set(namespace, key, value, ttl)
+            return value
+
+
+class SQLiteSessionState:
+    """
+    State in a local SQLite database (WAL), shared by every uvicorn worker
+    on the host so follow-ups work without sticky sessions.
+
+    Each thread keeps a small read-through cache next to its connection.
+    SQLite bumps a connection's ``PRAGMA data_version`` whenever another
+    connection commits; the cache is dropped when it changes. Inside
+    ``session_state_turn()`` that check runs once per connection per turn
+    (and again after any write the turn makes, whichever thread makes it),
+    so repeated reads during a turn are served from memory without touching
+    SQLite. Writes by other requests or workers while the turn is running
+    may go unseen until the next turn. Outside a turn every read checks.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS session_state (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL,
+            PRIMARY KEY (namespace, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_session_state_expires_at "
+        "ON session_state (expires_at)",
+    )
+
+    def __init__(self, db_path: Path, cache_size: int = SESSION_STATE_CACHE_SIZE) -> None:
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.cache = OrderedDict()
+            self._local.data_version = None
+        return conn
+
+    def _cache(self, conn: sqlite3.Connection) -> OrderedDict:
+        validated = _TURN_VALIDATED.get()
+        if validated is not None and conn in validated:
+            return self._local.cache
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._local.data_version:
+            self._local.cache.clear()
+            self._local.data_version = data_version
+        if validated is not None:
+            validated.add(conn)
+        return self._local.cache
+
+    def _written(self, conn: sqlite3.Connection) -> None:
+        # Other threads' caches may hold the old value; make them check.
+        validated = _TURN_VALIDATED.get()
+        if validated is not None:
+            validated.clear()
+        self._cache(conn)
+
+    def _remember(self, entry_key: tuple[str, str], expires_at, value) -> None:
+        cache = self._local.cache
+        cache[entry_key] = (expires_at, value)
+        cache.move_to_end(entry_key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _read(self, conn: sqlite3.Connection, namespace: str, key: str):
+        row = conn.execute(
+            "SELECT value, expires_at FROM session_state WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def _write(self, conn, namespace: str, key: str, value: Any, expires_at) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO session_state (namespace, key, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, separators=(",", ":")), expires_at),
+        )
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            conn.execute(
+                "DELETE FROM session_state WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        conn = self._connect()
+        cache = self._cache(conn)
+        entry_key = (namespace, key)
+        entry = cache.get(entry_key)
+        if entry is None:
+            value, expires_at = self._read(conn, namespace, key)
+            entry = (expires_at, value)
+            self._remember(entry_key, expires_at, value)
+        else:
+            cache.move_to_end(entry_key)
+        expires_at, value = entry
+        if _expired(expires_at, time.time()):
+            return None
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None) -> None:
+        conn = self._connect()
+        expires_at = _expires_at(ttl)
+        with conn:
+            self._write(conn, namespace, key, value, expires_at)
+        self._written(conn)
+        self._remember((namespace, key), expires_at, value)
+
+    def pop(self, namespace: str, key: str) -> Any | None:
+        conn = self._connect()
+        with conn:
+            # Read and delete under one write lock so two workers can't both
+            # consume the same pending confirmation.
+            conn.execute("BEGIN IMMEDIATE")
+            value, expires_at = self._read(conn, namespace, key)
+            if value is not None:
+                conn.execute(
+                    "DELETE FROM session_state WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+        self._written(conn)
+        self._remember((namespace, key), None, None)
+        if _expired(expires_at, time.time()):
+            return None
+        return value
+
+    def update(self, namespace, key, func, ttl):
+        conn = self._connect()
+        expires_at = _expires_at(ttl)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current, current_expiry = self._read(conn, namespace, key)
+            if _expired(current_expiry, time.time()):
+                current = None
+            value = func(current)
+            self._write(conn, namespace, key, value, expires_at)
+        self._written(conn)
+        self._remember((namespace, key), expires_at, value)
+        return value
+
+
+class SessionMap:
+    """
+    Dict-style view of one namespace, keyed by user_id, so callers keep
+    writing ``PENDING[user_id] = ...`` / ``PENDING.pop(user_id, None)``
+    while the values live in the configured backend with a TTL.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float | None = SESSION_STATE_TTL_SECONDS,
+        backend: SessionStateBackend | None = None,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self._backend = backend
+
+    @property
+    def backend(self) -> SessionStateBackend:
+        return self._backend or session_state
+
+    def get(self, user_id: int, default: Any = None) -> Any:
+        value = self.backend.get(self.namespace, str(user_id))
+        return default if value is None else value
+
+    def __setitem__(self, user_id: int, value: Any) -> None:
+        self.backend.set(self.namespace, str(user_id), value, self.ttl)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def pop(self, user_id: int, default: Any = None) -> Any:
+        value = self.backend.pop(self.namespace, str(user_id))
+        return default if value is None else value
+
+    def update(self, user_id: int, func: Callable[[Any | None], Any]) -> Any:
+        """Atomically replace the value with ``func(current)``."""
+        return self.backend.update(self.namespace, str(user_id), func, self.ttl)
+
+
+def _build_backend() -> SessionStateBackend:
+    if SESSION_STATE_BACKEND == "sqlite":
+        return SQLiteSessionState(SESSION_STATE_PATH)
+    return MemorySessionState()
+
+
+session_state = _build_backend()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MIN_TOKEN_LENGTH = 3
+CACHED_USERS = 1024
+
+# Verbs and filler that appear in most reminders ("call", "remind me to
+# ...") and say nothing about which task the user means.
+TASK_STOPWORDS = {
+    "call",
+    "remind",
+    "reminder",
+    "email",
+    "text",
+    "follow",
+    "task",
+    "todo",
+    "please",
+    "need",
+    "contact",
+    "reach",
+    "talk",
+    "speak",
+    "tomorrow",
+    "today",
+    "soon",
+    "check",
+    "look",
+    # Function words long enough to pass MIN_TOKEN_LENGTH.
+    "the",
+    "and",
+    "for",
+    "with",
+    "about",
+    "from",
+    "that",
+    "this",
+    "our",
+    "was",
+}
+
+
+def normalize_description(description: str) -> str:
+    return " ".join(description.lower().split())
+
+
+def _stem(token: str) -> str:
+    # Just enough folding that "called"/"calling", "roofers" and
+    # "scheduled"/"schedule" meet; whole tokens only, so "call" never
+    # matches inside "recall".
+    for suffix in ("ing", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_TOKEN_LENGTH:
+            token = token[: -len(suffix)]
+            break
+    if token.endswith("e") and len(token) > MIN_TOKEN_LENGTH:
+        token = token[:-1]
+    return token
+
+
+STEMMED_STOPWORDS = {_stem(word) for word in TASK_STOPWORDS}
+
+
+def task_tokens(text: str) -> set[str]:
+    stems = (_stem(t) for t in TOKEN_PATTERN.findall(text.lower()) if len(t) >= MIN_TOKEN_LENGTH)
+    return {stem for stem in stems if stem not in STEMMED_STOPWORDS}
+
+
+class TaskMatchIndex:
+    """
+    Token -> open-task postings for one user, updated in place as tasks are
+    added and completed. Matching tokenizes the message once and scores each
+    task by the IDF of the tokens it shares with it, so a word that shows up
+    in many reminders ("roof") counts for less than a rare one ("gutter").
+    """
+
+    def __init__(self) -> None:
+        # normalized description -> (display description, tokens)
+        self.tasks: dict[str, tuple[str, frozenset[str]]] = {}
+        self._postings: dict[str, set[str]] = defaultdict(set)
+        # Tasks with no usable tokens can only match as a whole phrase.
+        self._tokenless: set[str] = set()
+
+    def add(self, description: str) -> None:
+        key = normalize_description(description)
+        if key in self.tasks:
+            self.remove(description)
+        tokens = frozenset(task_tokens(description))
+        self.tasks[key] = (description, tokens)
+        if not tokens:
+            self._tokenless.add(key)
+        for token in tokens:
+            self._postings[token].add(key)
+
+    def remove(self, description: str) -> None:
+        key = normalize_description(description)
+        entry = self.tasks.pop(key, None)
+        if entry is None:
+            return
+        self._tokenless.discard(key)
+        for token in entry[1]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[token]
+
+    def clear(self) -> None:
+        self.tasks.clear()
+        self._postings.clear()
+        self._tokenless.clear()
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self.tasks) / len(self._postings[token]))
+
+    def rank(self, message: str, limit: int = 5) -> list[dict]:
+        """
+        Open tasks the message refers to, best first, as
+        {"description", "score", "coverage"}; coverage is the share of the
+        task's own token weight the message mentions. A task whose whole
+        description appears in the message ranks above partial matches.
+        """
+        normalized_message = f" {normalize_description(message)} "
+        scores: dict[str, float] = defaultdict(float)
+        for token in task_tokens(message):
+            if token not in self._postings:
+                continue
+            idf = self._idf(token)
+            for key in self._postings[token]:
+                scores[key] += idf
+
+        ranked = []
+        for key in scores.keys() | self._tokenless:
+            description, tokens = self.tasks[key]
+            phrase_match = f" {key} " in normalized_message
+            if key not in scores and not phrase_match:
+                continue
+            total = sum(self._idf(token) for token in tokens)
+            score = scores.get(key, 0.0)
+            if phrase_match:
+                score = total + 1.0
+            ranked.append(
+                {
+                    "description": description,
+                    "score": round(score, 4),
+                    "coverage": round(min(1.0, score / total), 4) if total else 1.0,
+                }
+            )
+        ranked.sort(key=lambda match: match["score"], reverse=True)
+        return ranked[:limit]
+
+
+class TaskIndexCache:
+    """
+    Per-user ``TaskMatchIndex`` kept in step with ``AgentMemory`` writes.
+    ``rank`` also reconciles against the task list the turn already
+    loaded, so tasks changed by another worker are picked up by adding or
+    removing just the differing entries.
+    """
+
+    def __init__(self, max_users: int = CACHED_USERS) -> None:
+        self.max_users = max_users
+        self._indexes: OrderedDict[int, TaskMatchIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id: int) -> TaskMatchIndex | None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+        return index
+
+    def _reconcile(self, user_id: int, tasks: list[dict]) -> TaskMatchIndex:
+        open_tasks = {
+            normalize_description(task["description"]): task["description"]
+            for task in tasks
+            if not task.get("completed") and (task.get("description") or "").strip()
+        }
+        index = self._get(user_id)
+        if index is None:
+            index = TaskMatchIndex()
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        for key in [key for key in index.tasks if key not in open_tasks]:
+            index.remove(key)
+        for key, description in open_tasks.items():
+            if key not in index.tasks:
+                index.add(description)
+        return index
+
+    def rank(
+        self, user_id: int, tasks: list[dict], message: str, limit: int = 5
+    ) -> list[dict]:
+        """``TaskMatchIndex.rank`` over ``tasks``, the user's current list."""
+        with self._lock:
+            return self._reconcile(user_id, tasks).rank(message, limit)
+
+    def task_added(self, user_id: int, description: str) -> None:
+        with self._lock:
+            index = self._get(user_id)
+            if index is not None:
+                index.add(description)
+
+    def task_completed(self, user_id: int, description: str | None) -> None:
+        with self._lock:
+            index = self._get(user_id)
+            if index is None:
+                return
+            if description:
+                index.remove(description)
+            else:
+                index.clear()
+
+
+task_indexes = TaskIndexCache()
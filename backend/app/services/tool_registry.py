@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+from app.core.metrics import TOOL_SECONDS, observe, span
+
+DEFAULT_TOOL_TIMEOUT = 10.0
+RETRY_BACKOFF_SECONDS = 0.25
+RESULT_CACHE_SIZE = 512
+
+logger = logging.getLogger(__name__)
+
+
+class ToolTimeoutError(TimeoutError):
+    pass
+
+
+class ToolArgumentError(ValueError):
+    """The model's arguments don't satisfy the tool's schema."""
+
+
+class _ResultCache:
+    """Small thread-safe LRU of tool results with per-entry expiry."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key: tuple, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ToolSpec:
+    """One registered tool: its schema plus the limits the registry enforces."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        *,
+        description: str,
+        parameters: dict,
+        timeout: float,
+        retries: int,
+        cache_ttl: float,
+        max_concurrency: int | None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.async_func: Callable | None = None
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_ttl = cache_ttl
+        self.max_concurrency = max_concurrency
+        self.properties = set(parameters.get("properties", {}))
+        self.required = tuple(parameters.get("required", ()))
+        # Tools that act on the current user's data get user_id injected
+        # rather than trusting the model to supply it.
+        self.wants_user = "user_id" in inspect.signature(func).parameters
+        self.schema = {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": parameters,
+            },
+        }
+        self.semaphore = (
+            threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        )
+        # asyncio semaphores belong to one event loop.
+        self._async_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def async_semaphore(self) -> asyncio.Semaphore | None:
+        if not self.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+
+    def timeout_error(self) -> ToolTimeoutError:
+        return ToolTimeoutError(f"{self.name} timed out after {self.timeout:g}s")
+
+    def should_retry(self, exc: Exception, attempt: int) -> bool:
+        """
+        The retry rule shared by ``execute`` and ``execute_async``. Timeouts
+        are never retried: a worker thread can't be stopped, and even a
+        cancelled coroutine may already have reached the upstream, so a
+        retry could run the call twice. Bad arguments would fail again.
+        """
+        if isinstance(exc, (ToolTimeoutError, ToolArgumentError)):
+            return False
+        return attempt < self.retries
+
+
+class ToolCall:
+    """
+    A call started by ``ToolRegistry.submit``: a cached result, or a first
+    attempt already queued on the tool pool. ``result()`` waits for it,
+    applies the tool's retry policy and times the call from submission.
+    """
+
+    def __init__(self, registry: ToolRegistry, spec: ToolSpec, kwargs: dict) -> None:
+        self._registry = registry
+        self.spec = spec
+        self.kwargs = kwargs
+        self._started = time.perf_counter()
+        self._key = registry._cache_key(spec, kwargs)
+        self._hit, self._value = (
+            registry._cache.get(self._key) if spec.cache_ttl else (False, None)
+        )
+        self._future: Future | None = None
+        self._start_error: Exception | None = None
+        if not self._hit:
+            try:
+                self._future = registry._start(spec, kwargs)
+            except Exception as exc:
+                self._start_error = exc
+
+    def result(self) -> Any:
+        labels = {"tool": self.spec.name}
+        try:
+            return self._wait(labels)
+        except BaseException:
+            labels.setdefault("outcome", "error")
+            raise
+        finally:
+            labels.setdefault("outcome", "ok")
+            observe(TOOL_SECONDS, time.perf_counter() - self._started, **labels)
+
+    def _wait(self, labels: dict) -> Any:
+        spec = self.spec
+        if self._hit:
+            labels["outcome"] = "cache_hit"
+            return self._value
+
+        future, error = self._future, self._start_error
+        attempt_started = self._started
+        for attempt in range(spec.retries + 1):
+            try:
+                if error is not None:
+                    raise error
+                if future is None:
+                    attempt_started = time.perf_counter()
+                    future = self._registry._start(spec, self.kwargs)
+                remaining = spec.timeout - (time.perf_counter() - attempt_started)
+                try:
+                    result = future.result(timeout=max(0.0, remaining))
+                except FutureTimeoutError:
+                    future.cancel()  # only succeeds if it never started
+                    raise spec.timeout_error() from None
+                break
+            except Exception as exc:
+                if not spec.should_retry(exc, attempt):
+                    if isinstance(exc, ToolTimeoutError):
+                        labels["outcome"] = "timeout"
+                    raise
+                logger.info("Retrying tool %s after error: %s", spec.name, exc)
+                future, error = None, None
+                time.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+        if spec.cache_ttl:
+            self._registry._cache.put(self._key, result, spec.cache_ttl)
+        return result
+
+
+class ToolRegistry:
+    """
+    Central table of agent tools. Each tool declares its JSON schema,
+    timeout, retry count, result-cache TTL and max concurrency where it is
+    defined, and ``execute``/``execute_async`` enforce them for every agent
+    path. Schema payloads for a set of tools are built once and reused.
+    """
+
+    def __init__(self, max_threads: int = 32) -> None:
+        self._tools: dict[str, ToolSpec] = {}
+        self._payloads: dict[tuple[str, ...], list[dict]] = {}
+        self._cache = _ResultCache()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="agent-tool"
+        )
+
+    def tool(
+        self,
+        name: str,
+        *,
+        description: str,
+        parameters: dict | None = None,
+        timeout: float = DEFAULT_TOOL_TIMEOUT,
+        retries: int = 0,
+        cache_ttl: float = 0,
+        max_concurrency: int | None = None,
+    ) -> Callable[[Callable], Callable]:
+        """
+        Register the decorated function as tool ``name``. Only idempotent
+        tools should set ``retries`` or ``cache_ttl``. The function is
+        returned unchanged so it can still be called directly.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            self._tools[name] = ToolSpec(
+                name,
+                func,
+                description=description,
+                parameters=parameters or {"type": "object", "properties": {}},
+                timeout=timeout,
+                retries=retries,
+                cache_ttl=cache_ttl,
+                max_concurrency=max_concurrency,
+            )
+            self._payloads.clear()
+            return func
+
+        return decorator
+
+    def async_variant(self, name: str) -> Callable[[Callable], Callable]:
+        """Register a native coroutine implementation for an existing tool."""
+
+        def decorator(func: Callable) -> Callable:
+            self._spec(name).async_func = func
+            return func
+
+        return decorator
+
+    def payload(self, *names: str) -> list[dict]:
+        """The ``tools`` parameter for ``names``; built once per combination."""
+        payload = self._payloads.get(names)
+        if payload is None:
+            payload = [self._spec(name).schema for name in names]
+            self._payloads[names] = payload
+        return payload
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _spec(self, name: str) -> ToolSpec:
+        spec = self._tools.get(name)
+        if spec is None:
+            raise ValueError(f"Unsupported function {name}")
+        return spec
+
+    def _call_kwargs(self, spec: ToolSpec, args: dict, user_id: int) -> dict:
+        # Drop arguments the schema doesn't declare (models occasionally
+        # invent some) and nulls, so the function's defaults apply.
+        kwargs = {
+            key: value
+            for key, value in args.items()
+            if key in spec.properties and value is not None
+        }
+        missing = [key for key in spec.required if key not in kwargs]
+        if missing:
+            raise ToolArgumentError(
+                f"{spec.name} is missing required argument(s): {', '.join(missing)}"
+            )
+        if spec.wants_user:
+            kwargs["user_id"] = user_id
+        return kwargs
+
+    def _cache_key(self, spec: ToolSpec, kwargs: dict) -> tuple:
+        return spec.name, json.dumps(kwargs, sort_keys=True, default=str)
+
+    def _start(self, spec: ToolSpec, kwargs: dict) -> Future:
+        """
+        Submit one attempt to the tool pool. A worker thread can't be
+        cancelled, so the tool's concurrency slot is held until the function
+        actually returns, not just until the caller stops waiting for it.
+        """
+        semaphore = spec.semaphore
+        if semaphore is not None and not semaphore.acquire(timeout=spec.timeout):
+            raise spec.timeout_error()
+        try:
+            future = self._executor.submit(
+                contextvars.copy_context().run, spec.func, **kwargs
+            )
+        except BaseException:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+        if semaphore is not None:
+            future.add_done_callback(lambda _: semaphore.release())
+        return future
+
+    async def _attempt_async(self, spec: ToolSpec, kwargs: dict) -> Any:
+        semaphore = spec.async_semaphore()
+        if semaphore is not None:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), spec.timeout)
+            except asyncio.TimeoutError:
+                raise spec.timeout_error() from None
+
+        if spec.async_func is not None:
+            # wait_for cancels the coroutine, so the slot frees on timeout.
+            try:
+                return await asyncio.wait_for(spec.async_func(**kwargs), spec.timeout)
+            except asyncio.TimeoutError:
+                raise spec.timeout_error() from None
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+        # Local tools (memory, mmap'd text) keep their file I/O off the event
+        # loop; like ``_start``, the slot stays held until the thread is done.
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            functools.partial(contextvars.copy_context().run, spec.func, **kwargs),
+        )
+
+        def finished(done: asyncio.Future) -> None:
+            if semaphore is not None:
+                semaphore.release()
+            if not done.cancelled():
+                done.exception()  # retrieved, so a late failure isn't logged
+
+        future.add_done_callback(finished)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), spec.timeout)
+        except asyncio.TimeoutError:
+            raise spec.timeout_error() from None
+
+    def submit(self, name: str, args: dict, *, user_id: int) -> ToolCall:
+        """
+        Start tool ``name`` on the registry's pool without waiting for it;
+        several calls submitted back to back run concurrently.
+        """
+        spec = self._spec(name)
+        return ToolCall(self, spec, self._call_kwargs(spec, args, user_id))
+
+    def execute(self, name: str, args: dict, *, user_id: int) -> Any:
+        return self.submit(name, args, user_id=user_id).result()
+
+    async def execute_async(self, name: str, args: dict, *, user_id: int) -> Any:
+        spec = self._spec(name)
+        with span(TOOL_SECONDS, tool=name) as labels:
+            kwargs = self._call_kwargs(spec, args, user_id)
+            key = self._cache_key(spec, kwargs)
+            if spec.cache_ttl:
+                hit, value = self._cache.get(key)
+                if hit:
+                    labels["outcome"] = "cache_hit"
+                    return value
+
+            for attempt in range(spec.retries + 1):
+                try:
+                    result = await self._attempt_async(spec, kwargs)
+                    break
+                except Exception as exc:
+                    if not spec.should_retry(exc, attempt):
+                        if isinstance(exc, ToolTimeoutError):
+                            labels["outcome"] = "timeout"
+                        raise
+                    logger.info("Retrying tool %s after error: %s", name, exc)
+                    await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+            if spec.cache_ttl:
+                self._cache.put(key, result, spec.cache_ttl)
+            return result
+
+
+tool_registry = ToolRegistry()
@@ -1,9 +1,14 @@
+import httpx
 import requests
 from datetime import datetime
 from typing import Any
 
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_SECONDS, span
+from app.services.http_client import get_async_http_client
+
 CHICAGO_COORDS = (41.8781, -87.6298)
-OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+OPEN_METEO_URL = f"{settings.OPEN_METEO_BASE_URL.rstrip('/')}/v1/forecast"
 
 WEATHER_CODE_DESCRIPTIONS = {
     0: "clear skies",
@@ -55,27 +60,47 @@ def _describe_weather_code(code: Any) -> str:
     return "current conditions"
 
 
-def get_chicago_weather_summary() -> str:
-    params = {
-        "latitude": CHICAGO_COORDS[0],
-        "longitude": CHICAGO_COORDS[1],
-        "current_weather": "true",
-        "temperature_unit": "fahrenheit",
-        "windspeed_unit": "mph",
-        "precipitation_unit": "inch",
-        "timezone": "America/Chicago",
-    }
+WEATHER_UNAVAILABLE_REPLY = (
+    "I'm having trouble checking Chicago's weather right now. "
+    "Please try again in a moment."
+)
+
+CHICAGO_WEATHER_PARAMS = {
+    "latitude": CHICAGO_COORDS[0],
+    "longitude": CHICAGO_COORDS[1],
+    "current_weather": "true",
+    "temperature_unit": "fahrenheit",
+    "windspeed_unit": "mph",
+    "precipitation_unit": "inch",
+    "timezone": "America/Chicago",
+}
+
 
+def get_chicago_weather_summary() -> str:
     try:
-        response = requests.get(OPEN_METEO_URL, params=params, timeout=5)
-        response.raise_for_status()
+        with span(UPSTREAM_SECONDS, upstream="open_meteo", operation="forecast"):
+            response = requests.get(OPEN_METEO_URL, params=CHICAGO_WEATHER_PARAMS, timeout=5)
+            response.raise_for_status()
     except requests.RequestException:
-        return (
-            "I'm having trouble checking Chicago's weather right now. "
-            "Please try again in a moment."
-        )
+        return WEATHER_UNAVAILABLE_REPLY
+
+    return _summarize_chicago_weather(response.json())
+
+
+async def get_chicago_weather_summary_async() -> str:
+    try:
+        with span(UPSTREAM_SECONDS, upstream="open_meteo", operation="forecast"):
+            response = await get_async_http_client().get(
+                OPEN_METEO_URL, params=CHICAGO_WEATHER_PARAMS, timeout=5
+            )
+            response.raise_for_status()
+    except httpx.HTTPError:
+        return WEATHER_UNAVAILABLE_REPLY
+
+    return _summarize_chicago_weather(response.json())
+
 
-    payload = response.json()
+def _summarize_chicago_weather(payload: dict) -> str:
     current_weather = payload.get("current_weather")
 
     if not current_weather:
@@ -0,0 +1,32 @@
+"""
+Offline test setup. Settings are read when app modules are imported, so the
+environment is pointed at throwaway storage and dummy credentials before
+any test module imports them; nothing here talks to a real database or API.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_WORKDIR = tempfile.mkdtemp(prefix="homeai-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{_WORKDIR}/app.sqlite3"
+os.environ["DOCUMENT_STORAGE_PATH"] = f"{_WORKDIR}/documents"
+os.environ["LLM_CACHE_PATH"] = f"{_WORKDIR}/llm_cache.sqlite3"
+os.environ["SESSION_STATE_PATH"] = f"{_WORKDIR}/session_state.sqlite3"
+for _key in ("OPENAI_API_KEY", "OPENWEBNINJA_API_KEY", "GOOGLE_API_KEY", "GOOGLE_MAP_API_KEY"):
+    os.environ.setdefault(_key, "test")
+
+# Live-API scripts that call the real services when imported.
+collect_ignore = ["google_search.py", "test_zillow.py"]
+
+
+@pytest.fixture(scope="session")
+def app_tables():
+    """Create every table in the throwaway app database."""
+    import app.models  # noqa: F401  (registers every table for create_all)
+    from app.core.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    return engine
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.services.agent_memory import AgentMemory, DatabaseTaskStore, SessionTaskStore
+from app.services.session_state import MemorySessionState, SessionMap
+
+USER = 1
+
+
+def _database_store(tmp_path):
+    import app.models  # noqa: F401  (registers every table for create_all)
+
+    engine = create_engine(f"sqlite:///{tmp_path}/tasks.sqlite3")
+    Base.metadata.create_all(engine)
+    return DatabaseTaskStore(sessionmaker(bind=engine))
+
+
+def _session_store(tmp_path):
+    store = SessionTaskStore()
+    store._tasks = SessionMap("agent_tasks", ttl=None, backend=MemorySessionState())
+    return store
+
+
+STORES = [pytest.param(_database_store, id="database"), pytest.param(_session_store, id="session")]
+
+
+class CountingStore:
+    """Wraps a TaskStore and counts how often the task list is loaded."""
+
+    def __init__(self, store) -> None:
+        self.store = store
+        self.loads = 0
+
+    def load(self, user_id):
+        self.loads += 1
+        return self.store.load(user_id)
+
+    def add(self, user_id, description):
+        self.store.add(user_id, description)
+
+    def complete(self, user_id, description):
+        self.store.complete(user_id, description)
+
+
+@pytest.mark.parametrize("factory", STORES)
+def test_add_dedupes_by_normalized_description(tmp_path, factory):
+    memory = AgentMemory(factory(tmp_path))
+    memory.add_task(USER, "Call the roofer")
+    memory.add_task(USER, "  call   the ROOFER ")
+    memory.add_task(USER, "Clean gutters")
+    memory.add_task(USER, "   ")
+    memory.add_task(2, "Call the roofer")
+
+    assert memory.get_tasks(USER) == [
+        {"description": "call   the ROOFER", "completed": False},
+        {"description": "Clean gutters", "completed": False},
+    ]
+
+
+@pytest.mark.parametrize("factory", STORES)
+def test_complete_one_or_all(tmp_path, factory):
+    memory = AgentMemory(factory(tmp_path))
+    for description in ("Call the roofer", "Clean gutters", "Test radon"):
+        memory.add_task(USER, description)
+
+    memory.complete_task(USER, " clean GUTTERS ")
+    assert [task["completed"] for task in memory.get_tasks(USER)] == [False, True, False]
+
+    # Re-adding a completed task reopens it.
+    memory.add_task(USER, "Clean gutters")
+    assert memory.get_tasks(USER)[1] == {"description": "Clean gutters", "completed": False}
+
+    memory.complete_task(USER)
+    assert all(task["completed"] for task in memory.get_tasks(USER))
+
+
+@pytest.mark.parametrize("factory", STORES)
+def test_turn_snapshot_loads_once_and_sees_writes(tmp_path, factory):
+    store = CountingStore(factory(tmp_path))
+    memory = AgentMemory(store)
+    memory.add_task(USER, "Call the roofer")
+
+    with memory.turn_snapshot():
+        for _ in range(5):
+            memory.get_tasks(USER)
+        assert store.loads == 1
+
+        memory.add_task(USER, "Clean gutters")
+        assert len(memory.get_tasks(USER)) == 2
+        memory.get_tasks(USER)
+        assert store.loads == 2
+
+    memory.get_tasks(USER)
+    memory.get_tasks(USER)
+    assert store.loads == 4
+
+
+@pytest.mark.parametrize("factory", STORES)
+def test_get_tasks_returns_copies(tmp_path, factory):
+    memory = AgentMemory(factory(tmp_path))
+    memory.add_task(USER, "Call the roofer")
+
+    with memory.turn_snapshot():
+        memory.get_tasks(USER)[0]["completed"] = True
+        memory.get_tasks(USER).append({"description": "injected", "completed": False})
+        assert memory.get_tasks(USER) == [{"description": "Call the roofer", "completed": False}]
+
+    memory.get_tasks(USER)[0]["description"] = "changed"
+    assert memory.get_tasks(USER)[0]["description"] == "Call the roofer"
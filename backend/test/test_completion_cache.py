@@ -0,0 +1,158 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from app.services import completion_cache as completion_cache_module
+from app.services.completion_cache import (
+    EVICT_EVERY_INSERTS,
+    CompletionCache,
+    MemoryCompletionStore,
+    SQLiteCompletionStore,
+    completion_key,
+    create_completion,
+)
+
+TOOLS = [{"type": "function", "function": {"name": "get_weather", "parameters": {}}}]
+
+
+def _request(content: str = "Is my roof  covered?\n", **options) -> dict:
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a home assistant."},
+            {"role": "user", "content": content},
+        ],
+        **options,
+    }
+
+
+def _completion(text: str = "Yes.") -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": text},
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        }
+    )
+
+
+def test_key_ignores_whitespace_only_differences():
+    assert completion_key(_request("Is my roof covered?")) == completion_key(
+        _request("  Is my roof\tcovered? ")
+    )
+    assert completion_key(_request("Is my roof covered?")) != completion_key(
+        _request("Is my roof insured?")
+    )
+
+
+def test_key_covers_model_tools_and_options():
+    base = completion_key(_request())
+    assert completion_key({**_request(), "model": "gpt-4o"}) != base
+    assert completion_key(_request(tools=TOOLS)) != base
+    assert completion_key(_request(max_tokens=50)) != base
+    assert completion_key(_request(tools=TOOLS, tool_choice="none")) != completion_key(
+        _request(tools=TOOLS, tool_choice="auto")
+    )
+    # Tool schemas are hashed by content, not identity.
+    assert completion_key(_request(tools=TOOLS)) == completion_key(
+        _request(tools=[dict(tool) for tool in TOOLS])
+    )
+
+
+def test_memory_store_is_lru_with_expiry():
+    store = MemoryCompletionStore(max_entries=2)
+    later = time.time() + 60
+    store.put("a", "A", later)
+    store.put("b", "B", later)
+    assert store.get("a") == "A"
+    assert store.put("c", "C", later) == 1
+    assert store.get("b") is None
+    assert store.get("a") == "A"
+
+    store.put("old", "X", time.time() - 1)
+    assert store.get("old") is None
+
+
+def test_sqlite_store_drops_expired_entries(tmp_path):
+    store = SQLiteCompletionStore(tmp_path / "cache.sqlite3")
+    store.put("old", "X", time.time() - 1)
+    assert store.get("old") is None
+    assert store.size() == 0
+
+
+def test_sqlite_store_trims_in_batches(tmp_path):
+    store = SQLiteCompletionStore(tmp_path / "cache.sqlite3", max_entries=10)
+    later = time.time() + 60
+    evicted = [store.put(f"k{n}", "v", later) for n in range(EVICT_EVERY_INSERTS)]
+    # Only the EVICT_EVERY_INSERTS-th insert trims the table.
+    assert sum(evicted[:-1]) == 0
+    assert evicted[-1] == EVICT_EVERY_INSERTS - 10
+    assert store.size() == 10
+    assert store.get(f"k{EVICT_EVERY_INSERTS - 1}") == "v"
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    SQLiteCompletionStore(path).put("key", "value", time.time() + 60)
+    assert SQLiteCompletionStore(path).get("key") == "value"
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    calls = []
+
+    def create(**request):
+        calls.append(request)
+        return _completion(f"reply {len(calls)}")
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(completion_cache_module, "client", fake_client)
+    monkeypatch.setattr(
+        completion_cache_module,
+        "completion_cache",
+        CompletionCache(MemoryCompletionStore()),
+    )
+    return calls
+
+
+def test_create_completion_reads_through_the_cache(fake_openai):
+    first = create_completion(**_request("Is my roof covered?"))
+    second = create_completion(**_request(" Is my roof covered? "))
+    assert len(fake_openai) == 1
+    assert second.choices[0].message.content == first.choices[0].message.content
+
+    stats = completion_cache_module.completion_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_uncacheable_requests_always_call_openai(fake_openai):
+    create_completion(cache=False, **_request())
+    create_completion(cache=False, **_request())
+    assert len(fake_openai) == 2
+    assert completion_cache_module.completion_cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["What does the inspection report say about the roof?", "What is the meaning of escrow?"],
+)
+def test_general_turns_are_not_cacheable(app_tables, message):
+    from app.services.home_ai_agent import _use_completion_cache, plan_agent_turn
+
+    # The general path offers task and document tools that read this user's
+    # state, so an identical message from another user must not hit the cache.
+    plan = plan_agent_turn(db=None, user_id=9001, message=message)
+    assert "complete_user_task" in {tool["function"]["name"] for tool in plan["tools"]}
+    assert _use_completion_cache(plan, 0) is False
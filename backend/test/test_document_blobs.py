@@ -0,0 +1,97 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+
+from app.services.document_blobs import DocumentBlobStore
+
+PDF = b"%PDF-1.4 inspection report"
+SHA = hashlib.sha256(PDF).hexdigest()
+
+
+def _stage(blobs: DocumentBlobStore):
+    staged = blobs.staging_path()
+    staged.write_bytes(PDF)
+    return staged
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    blobs = DocumentBlobStore(tmp_path)
+    assert blobs.adopt(_stage(blobs), SHA, 1, "a") is True
+    assert blobs.adopt(_stage(blobs), SHA, 2, "b") is False
+    assert blobs.pdf_path(SHA).read_bytes() == PDF
+    # The duplicate's staged copy is discarded.
+    assert list((blobs.root / "staging").iterdir()) == []
+
+
+def test_blob_is_deleted_with_its_last_reference(tmp_path):
+    blobs = DocumentBlobStore(tmp_path)
+    blobs.adopt(_stage(blobs), SHA, 1, "a")
+    blobs.adopt(_stage(blobs), SHA, 1, "a")
+    blobs.adopt(_stage(blobs), SHA, 2, "b")
+    blobs.save_summary(SHA, "Roof replaced in 2019.")
+
+    assert blobs.release(SHA, 1, "a") == 1
+    assert blobs.load_summary(SHA) == "Roof replaced in 2019."
+    assert blobs.release(SHA, 2, "b") == 0
+    assert not blobs.blob_dir(SHA).exists()
+    assert blobs.load_summary(SHA) is None
+
+
+def test_artifacts_are_not_written_for_a_released_blob(tmp_path):
+    blobs = DocumentBlobStore(tmp_path)
+    blobs.adopt(_stage(blobs), SHA, 1, "a")
+    chunks = [{"offset": 0, "text": "roof"}]
+    blobs.save_embeddings(SHA, chunks, np.ones((1, 3), dtype=np.float32))
+    loaded_chunks, vectors = blobs.load_embeddings(SHA)
+    assert loaded_chunks == chunks and vectors.shape == (1, 3)
+
+    blobs.release(SHA, 1, "a")
+    blobs.save_embeddings(SHA, chunks, np.ones((1, 3), dtype=np.float32))
+    blobs.save_summary(SHA, "late")
+    assert not blobs.blob_dir(SHA).exists()
+
+
+def _upload_and_delete(root, worker: int, rounds: int) -> None:
+    blobs = DocumentBlobStore(root)
+    for n in range(rounds):
+        blobs.adopt(_stage(blobs), SHA, worker, f"doc{n}")
+        # Our reference is held, so another worker's release can't remove it.
+        assert blobs.pdf_path(SHA).read_bytes() == PDF
+        blobs.release(SHA, worker, f"doc{n}")
+
+
+def test_concurrent_adopt_and_release_keep_referenced_blobs(tmp_path):
+    owner = DocumentBlobStore(tmp_path)
+    owner.adopt(_stage(owner), SHA, 0, "keep")
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_upload_and_delete, args=(tmp_path, worker, 20))
+        for worker in range(1, 5)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    blobs = DocumentBlobStore(tmp_path)
+    assert blobs._read_refs(SHA) == ["0:keep"]
+    assert blobs.release(SHA, 0, "keep") == 0
+    assert not blobs.blob_dir(SHA).exists()
+
+
+def test_concurrent_last_references_never_lose_a_live_blob(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_upload_and_delete, args=(tmp_path, worker, 30))
+        for worker in range(4)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    assert not DocumentBlobStore(tmp_path).blob_dir(SHA).exists()
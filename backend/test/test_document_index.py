@@ -0,0 +1,108 @@
+import multiprocessing
+
+from app.services.document_index import DocumentSearchIndex, tokenize
+
+USER = 1
+
+
+def _add(index: DocumentSearchIndex, document_id: str, text: str) -> None:
+    index.add_document(USER, document_id, [(0, text)])
+
+
+def test_tokenize_reports_byte_offsets():
+    text = "Café roof leak"
+    tokens = tokenize(text, base_offset=100)
+    encoded = text.encode("utf-8")
+    assert [term for term, _ in tokens] == ["caf", "roof", "leak"]
+    for term, offset in tokens:
+        start = offset - 100
+        assert encoded[start:start + len(term)].decode().lower() == term
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity(tmp_path):
+    index = DocumentSearchIndex(tmp_path)
+    _add(index, "roof", "roof leak near the roof flashing, roof shingles worn")
+    _add(index, "basement", "basement leak along the foundation wall")
+    _add(index, "furnace", "furnace serviced, filter replaced")
+
+    assert [hit["document_id"] for hit in index.search(USER, "roof leak")] == [
+        "roof",
+        "basement",
+    ]
+    # "foundation" appears once in the whole library, so it outweighs "leak".
+    assert index.search(USER, "foundation leak")[0]["document_id"] == "basement"
+    assert index.search(USER, "chimney") == []
+    assert len(index.search(USER, "leak", limit=1)) == 1
+
+
+def test_hit_offset_points_at_the_densest_passage(tmp_path):
+    index = DocumentSearchIndex(tmp_path)
+    text = "gutter " + "filler " * 200 + "gutter clog gutter"
+    _add(index, "doc", text)
+    offset = index.search(USER, "gutter clog")[0]["offset"]
+    assert text.encode()[offset:].startswith(b"gutter clog")
+
+
+def test_remove_and_re_add_replace_postings(tmp_path):
+    index = DocumentSearchIndex(tmp_path)
+    _add(index, "doc", "old radon report")
+    _add(index, "doc", "new mold report")
+    assert index.search(USER, "radon") == []
+    assert index.search(USER, "mold")[0]["document_id"] == "doc"
+
+    index.remove_document(USER, "doc")
+    assert index.search(USER, "mold") == []
+
+
+def test_stale_instance_sees_writes_from_another(tmp_path):
+    reader = DocumentSearchIndex(tmp_path)
+    writer = DocumentSearchIndex(tmp_path)
+    assert reader.search(USER, "termite") == []
+
+    _add(writer, "pest", "termite damage in the sill plate")
+    assert reader.search(USER, "termite")[0]["document_id"] == "pest"
+
+    # A write through the stale reader must not drop the other worker's document.
+    _add(reader, "hvac", "furnace inspection")
+    assert {hit["document_id"] for hit in writer.search(USER, "termite furnace")} == {
+        "pest",
+        "hvac",
+    }
+
+
+def test_cache_is_bounded(tmp_path):
+    index = DocumentSearchIndex(tmp_path, max_users=2)
+    for user_id in range(5):
+        index.add_document(user_id, "doc", [(0, "roof")])
+        index.search(user_id, "roof")
+    assert len(index._indexes) == 2
+
+
+def test_rebuild_replaces_the_index(tmp_path):
+    index = DocumentSearchIndex(tmp_path)
+    _add(index, "gone", "asbestos tile")
+    count = index.rebuild(USER, [("a", [(0, "sump pump")]), ("b", [(0, "sump basin")])])
+    assert count == 2
+    assert index.search(USER, "asbestos") == []
+    assert {hit["document_id"] for hit in index.search(USER, "sump")} == {"a", "b"}
+
+
+def _add_many(root, worker: int, count: int) -> None:
+    index = DocumentSearchIndex(root)
+    for n in range(count):
+        _add(index, f"w{worker}-{n}", f"shared term w{worker}x{n}")
+
+
+def test_concurrent_processes_keep_every_document(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_add_many, args=(tmp_path, worker, 15)) for worker in range(3)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    hits = DocumentSearchIndex(tmp_path).search(USER, "shared", limit=100)
+    assert len(hits) == 45
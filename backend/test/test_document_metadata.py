@@ -0,0 +1,125 @@
+import multiprocessing
+import socket
+
+import pytest
+
+from app.services.document_metadata import JsonIndexMetadata, SQLiteDocumentMetadata
+from app.services.document_store import STATUS_PENDING, STATUS_READY, DocumentStore
+
+USER = 1
+
+
+def _json(root):
+    return JsonIndexMetadata(root)
+
+
+def _sqlite(root):
+    return SQLiteDocumentMetadata(root / "metadata.sqlite3")
+
+
+BACKENDS = [pytest.param(_json, id="json"), pytest.param(_sqlite, id="sqlite")]
+
+
+def _doc(document_id: str, uploaded_at: str, **fields) -> dict:
+    return {"id": document_id, "uploaded_at": uploaded_at, **fields}
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_crud_and_listing(tmp_path, factory):
+    metadata = factory(tmp_path)
+    for n in range(5):
+        metadata.insert(USER, _doc(f"d{n}", f"2024-01-0{n + 1}", status="ready"))
+    metadata.insert(2, _doc("other", "2024-02-01", status="pending"))
+
+    assert metadata.count_documents(USER) == 5
+    assert [d["id"] for d in metadata.list_documents(USER)] == ["d4", "d3", "d2", "d1", "d0"]
+    assert [d["id"] for d in metadata.list_documents(USER, limit=2, offset=1)] == ["d3", "d2"]
+    assert metadata.find_by_status("pending") == [(2, "other")]
+
+    assert metadata.update(USER, "d1", status="pending")["status"] == "pending"
+    assert metadata.get(USER, "d1")["status"] == "pending"
+    assert metadata.update(USER, "missing", status="ready") is None
+    assert metadata.get(2, "d1") is None
+
+    assert metadata.delete(USER, "d1")["id"] == "d1"
+    assert metadata.delete(USER, "d1") is None
+    assert metadata.count_documents(USER) == 4
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_update_if_only_applies_while_expected_fields_match(tmp_path, factory):
+    metadata = factory(tmp_path)
+    metadata.insert(USER, _doc("doc", "2024-01-01", status=STATUS_PENDING))
+
+    assert metadata.update_if(USER, "doc", {"claimed_by": "a"}, claimed_by="b") is None
+    assert metadata.update_if(USER, "doc", {"claimed_by": None}, claimed_by="a") is not None
+    assert metadata.update_if(USER, "doc", {"claimed_by": None}, claimed_by="b") is None
+    assert metadata.get(USER, "doc")["claimed_by"] == "a"
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_returned_documents_are_copies(tmp_path, factory):
+    metadata = factory(tmp_path)
+    metadata.insert(USER, _doc("doc", "2024-01-01", status="ready"))
+    metadata.get(USER, "doc")["status"] = "mutated"
+    assert metadata.get(USER, "doc")["status"] == "ready"
+
+
+def test_json_instances_see_each_others_writes(tmp_path):
+    reader = JsonIndexMetadata(tmp_path)
+    writer = JsonIndexMetadata(tmp_path)
+    assert reader.count_documents(USER) == 0
+
+    writer.insert(USER, _doc("a", "2024-01-01"))
+    assert reader.get(USER, "a") is not None
+
+    # A write through the other instance must keep the first one's document.
+    reader.insert(USER, _doc("b", "2024-01-02"))
+    assert [d["id"] for d in writer.list_documents(USER)] == ["b", "a"]
+
+
+def _claim(factory, root, worker: int, barrier, results) -> None:
+    metadata = factory(root)
+    barrier.wait()
+    claimed = metadata.update_if(USER, "doc", {"claimed_by": None}, claimed_by=f"w{worker}")
+    results.put(worker if claimed else None)
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_concurrent_claims_have_one_winner(tmp_path, factory):
+    factory(tmp_path).insert(USER, _doc("doc", "2024-01-01", status=STATUS_PENDING))
+
+    context = multiprocessing.get_context("fork")
+    workers = 6
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_claim, args=(factory, tmp_path, n, barrier, results))
+        for n in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    winners = [worker for worker in outcomes if worker is not None]
+    assert len(winners) == 1
+    assert factory(tmp_path).get(USER, "doc")["claimed_by"] == f"w{winners[0]}"
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_claim_ingestion_respects_live_claims(tmp_path, factory):
+    store = DocumentStore(tmp_path, metadata=factory(tmp_path))
+    store.metadata.insert(USER, _doc("live", "2024-01-01", status=STATUS_PENDING))
+    store.metadata.insert(USER, _doc("stale", "2024-01-02", status=STATUS_PENDING))
+    store.metadata.insert(USER, _doc("done", "2024-01-03", status=STATUS_READY))
+    # PID 1 is always running; a PID past pid_max never is.
+    store.metadata.update(USER, "live", claimed_by=f"{socket.gethostname()}:1")
+    store.metadata.update(USER, "stale", claimed_by=f"{socket.gethostname()}:99999999")
+
+    assert store.claim_ingestion(USER, "live") is False
+    assert store.claim_ingestion(USER, "stale") is True
+    assert store.claim_ingestion(USER, "stale") is True
+    assert store.claim_ingestion(USER, "done") is False
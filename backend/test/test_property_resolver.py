@@ -0,0 +1,79 @@
+from app.services.property_resolver import (
+    MIN_CONFIDENCE,
+    PropertyAddressIndex,
+    PropertyResolver,
+)
+
+PROPERTIES = [
+    {"id": 3, "address": "12 Oak Street, Springfield, IL", "city_state": "Springfield, IL"},
+    {"id": 7, "address": "558 Cedar Avenue, Springfield, IL", "city_state": "Springfield, IL"},
+    {"id": 12, "address": "41 Maple Drive, Shelbyville, IL", "city_state": "Shelbyville, IL"},
+    {"id": 15, "address": "90 Oak Lane, Capital City, IL", "city_state": "Capital City, IL"},
+]
+
+
+def _resolved_id(message: str, properties=PROPERTIES):
+    found = PropertyAddressIndex(properties).resolve(message)
+    return found["id"] if found else None
+
+
+def test_resolves_addresses_and_folds_suffixes():
+    assert _resolved_id("The gutter at 558 Cedar Ave is clogged") == 7
+    assert _resolved_id("water heater at 41 maple dr") == 12
+    assert _resolved_id("roof leak in Shelbyville") == 12
+
+
+def test_resolves_misspelled_street_names():
+    assert _resolved_id("the 558 Cedarr house needs paint") == 7
+    assert _resolved_id("fence at Mapple drive") == 12
+
+
+def test_ambiguous_or_unrelated_messages_resolve_to_nothing():
+    # Two Springfield homes and two Oak streets.
+    assert _resolved_id("leak at the Springfield house") is None
+    assert _resolved_id("the Oak property") is None
+    assert _resolved_id("when should I reseal my driveway") is None
+    # A suffix alone is never a candidate.
+    assert _resolved_id("the place on the street") is None
+
+
+def test_rank_is_best_first_with_bounded_confidence():
+    ranked = PropertyAddressIndex(PROPERTIES).rank("12 Oak Street Springfield")
+    assert ranked[0]["property"]["id"] == 3
+    assert ranked[0]["confidence"] >= MIN_CONFIDENCE
+    scores = [hit["score"] for hit in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert all(0 < hit["confidence"] <= 1.0 for hit in ranked)
+
+
+def test_explicit_property_ids():
+    assert _resolved_id("property 12 has a broken window") == 12
+    assert _resolved_id("for #15 please") == 15
+    assert _resolved_id("id 7") == 7
+    assert _resolved_id("property 99") is None
+
+
+def test_bare_numbers_pick_ids_unless_they_are_house_numbers():
+    # A reply to the selection prompt.
+    assert _resolved_id("15") == 15
+    assert _resolved_id("7") == 7
+    # "12" is also the house number of 12 Oak Street, which wins.
+    assert _resolved_id("12") == 3
+
+
+def test_resolver_rebuilds_when_the_property_list_changes():
+    resolver = PropertyResolver(max_users=2)
+    index = resolver.index_for(1, PROPERTIES)
+    assert resolver.index_for(1, list(PROPERTIES)) is index
+
+    renamed = [dict(PROPERTIES[0], address="14 Birch Road, Springfield, IL"), *PROPERTIES[1:]]
+    rebuilt = resolver.index_for(1, renamed)
+    assert rebuilt is not index
+    assert rebuilt.resolve("14 Birch Road")["id"] == 3
+    # 12 is no longer a house number, so a bare "12" now means property 12.
+    assert index.resolve("12")["id"] == 3
+    assert rebuilt.resolve("12")["id"] == 12
+
+    resolver.index_for(2, PROPERTIES)
+    resolver.index_for(3, PROPERTIES)
+    assert len(resolver._indexes) == 2
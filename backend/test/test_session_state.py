@@ -0,0 +1,149 @@
+import multiprocessing
+import time
+
+import pytest
+
+from app.services.session_state import (
+    MemorySessionState,
+    SessionMap,
+    SQLiteSessionState,
+    session_state_turn,
+)
+
+
+def _memory(tmp_path):
+    return MemorySessionState()
+
+
+def _sqlite(tmp_path):
+    return SQLiteSessionState(tmp_path / "state.sqlite3")
+
+
+BACKENDS = [pytest.param(_memory, id="memory"), pytest.param(_sqlite, id="sqlite")]
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_get_set_pop_update(tmp_path, factory):
+    state = factory(tmp_path)
+    assert state.get("pending", "1") is None
+
+    state.set("pending", "1", {"task": "clean gutters"}, ttl=None)
+    assert state.get("pending", "1") == {"task": "clean gutters"}
+    assert state.get("other", "1") is None
+
+    assert state.update("count", "1", lambda n: (n or 0) + 1, ttl=None) == 1
+    assert state.update("count", "1", lambda n: (n or 0) + 1, ttl=None) == 2
+
+    assert state.pop("pending", "1") == {"task": "clean gutters"}
+    assert state.pop("pending", "1") is None
+    assert state.get("pending", "1") is None
+
+
+@pytest.mark.parametrize("factory", BACKENDS)
+def test_values_expire(tmp_path, factory):
+    state = factory(tmp_path)
+    state.set("pending", "1", "yes", ttl=0.05)
+    assert state.get("pending", "1") == "yes"
+    time.sleep(0.1)
+    assert state.get("pending", "1") is None
+    assert state.pop("pending", "1") is None
+    # An expired value doesn't leak into update().
+    assert state.update("pending", "1", lambda value: value, ttl=None) is None
+
+
+def test_memory_backend_is_bounded():
+    state = MemorySessionState(max_entries=2)
+    for n in range(3):
+        state.set("pending", str(n), n, ttl=None)
+    assert state.get("pending", "0") is None
+    assert state.get("pending", "2") == 2
+
+
+def test_sqlite_instances_see_each_others_writes(tmp_path):
+    first = _sqlite(tmp_path)
+    second = _sqlite(tmp_path)
+    assert first.get("pending", "1") is None
+
+    second.set("pending", "1", "from second", ttl=None)
+    assert first.get("pending", "1") == "from second"
+    first.pop("pending", "1")
+    assert second.get("pending", "1") is None
+
+
+def _trace_statements(state: SQLiteSessionState) -> list[str]:
+    statements: list[str] = []
+    state._connect().set_trace_callback(statements.append)
+    return statements
+
+
+def test_turn_checks_for_other_writers_once(tmp_path):
+    state = _sqlite(tmp_path)
+    state.set("pending", "1", "value", ttl=None)
+    statements = _trace_statements(state)
+
+    for _ in range(10):
+        state.get("pending", "1")
+    assert len(statements) == 10
+
+    statements.clear()
+    with session_state_turn():
+        for _ in range(10):
+            assert state.get("pending", "1") == "value"
+    assert len(statements) == 1
+
+
+def test_writes_during_a_turn_are_visible_to_the_turn(tmp_path):
+    state = _sqlite(tmp_path)
+    other = _sqlite(tmp_path)
+    state.set("pending", "1", "before", ttl=None)
+    with session_state_turn():
+        assert state.get("pending", "1") == "before"
+        other.set("pending", "1", "from another request", ttl=None)
+        state.set("pending", "2", "mine", ttl=None)
+        # Our own write makes the next read re-check, which picks up the
+        # other connection's commit as well.
+        assert state.get("pending", "1") == "from another request"
+        assert state.get("pending", "2") == "mine"
+    assert state.get("pending", "1") == "from another request"
+
+
+def _pop(path, barrier, results) -> None:
+    state = SQLiteSessionState(path)
+    barrier.wait()
+    results.put(state.pop("confirm", "1"))
+
+
+def test_concurrent_pops_consume_a_value_once(tmp_path):
+    path = tmp_path / "state.sqlite3"
+    SQLiteSessionState(path).set("confirm", "1", "mark gutters done", ttl=None)
+
+    context = multiprocessing.get_context("fork")
+    workers = 6
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_pop, args=(path, barrier, results)) for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    popped = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert [value for value in popped if value is not None] == ["mark gutters done"]
+
+
+def test_session_map_wraps_a_namespace(tmp_path):
+    pending = SessionMap("pending", ttl=None, backend=_sqlite(tmp_path))
+    assert 5 not in pending
+    assert pending.get(5, "default") == "default"
+
+    pending[5] = {"description": "replace filter"}
+    assert 5 in pending
+    assert pending.update(5, lambda value: {**value, "confirmed": True}) == {
+        "description": "replace filter",
+        "confirmed": True,
+    }
+    assert pending.pop(5)["confirmed"] is True
+    assert pending.pop(5, "gone") == "gone"
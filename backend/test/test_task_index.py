@@ -0,0 +1,102 @@
+from app.services.task_index import (
+    TaskIndexCache,
+    TaskMatchIndex,
+    normalize_description,
+    task_tokens,
+)
+
+USER = 1
+
+
+def _index(*descriptions: str) -> TaskMatchIndex:
+    index = TaskMatchIndex()
+    for description in descriptions:
+        index.add(description)
+    return index
+
+
+def _best(index: TaskMatchIndex, message: str) -> str | None:
+    ranked = index.rank(message)
+    return ranked[0]["description"] if ranked else None
+
+
+def test_tokens_are_stemmed_whole_words_without_stopwords():
+    assert normalize_description("  Call  the ROOFER ") == "call the roofer"
+    assert task_tokens("Call the roofers about scheduling") == {"roofer", "schedul"}
+    assert task_tokens("scheduled") == task_tokens("schedule")
+    # Whole tokens only: "call" is a stopword, "recall" is not.
+    assert task_tokens("recall notice") == {"recall", "notic"}
+
+
+def test_rare_tokens_outweigh_common_ones():
+    index = _index("Fix roof flashing", "Replace roof gutter guards", "Inspect roof vents")
+    assert _best(index, "I fixed the flashing on the roof") == "Fix roof flashing"
+    ranked = index.rank("finished the gutter work on the roof")
+    assert ranked[0]["description"] == "Replace roof gutter guards"
+    assert ranked[0]["score"] > ranked[1]["score"]
+
+
+def test_stopwords_and_substrings_do_not_match():
+    index = _index("Call the plumber", "Read the recall notice")
+    assert _best(index, "I called the plumber") == "Call the plumber"
+    # "called" stems to the "call" stopword; "recall" is its own token.
+    assert [hit["description"] for hit in index.rank("called them today")] == []
+
+
+def test_whole_phrase_ranks_first_with_full_coverage():
+    index = _index("Paint the fence", "Fence repair quote")
+    top = index.rank("done: paint the fence")[0]
+    assert top["description"] == "Paint the fence"
+    assert top["coverage"] == 1.0
+
+
+def test_add_and_remove_update_postings():
+    index = _index("Service the furnace")
+    index.add("  service THE furnace ")
+    assert len(index.tasks) == 1
+    index.remove("Service the furnace")
+    assert index.rank("serviced the furnace") == []
+    assert index._postings == {}
+
+
+def test_cache_follows_writes_and_reconciles_with_the_task_list():
+    cache = TaskIndexCache(max_users=2)
+    tasks = [
+        {"description": "Clean gutters", "completed": False},
+        {"description": "Test radon", "completed": True},
+    ]
+    assert [hit["description"] for hit in cache.rank(USER, tasks, "cleaned the gutters")] == [
+        "Clean gutters"
+    ]
+    assert cache.rank(USER, tasks, "radon test done") == []
+
+    # Incremental updates from AgentMemory writes.
+    cache.task_added(USER, "Seal driveway")
+    assert cache._indexes[USER].rank("sealed the driveway")[0]["description"] == "Seal driveway"
+    cache.task_completed(USER, "Seal driveway")
+    assert "seal driveway" not in cache._indexes[USER].tasks
+
+    # Another worker completed the gutters and reopened radon.
+    tasks = [
+        {"description": "Clean gutters", "completed": True},
+        {"description": "Test radon", "completed": False},
+    ]
+    assert cache.rank(USER, tasks, "cleaned the gutters") == []
+    assert cache.rank(USER, tasks, "tested radon")[0]["description"] == "Test radon"
+
+    cache.task_completed(USER, None)
+    assert cache._indexes[USER].tasks == {}
+
+    cache.rank(2, [], "done")
+    cache.rank(3, [], "done")
+    assert USER not in cache._indexes
+
+
+def test_find_task_matches_needs_a_completion_statement():
+    from app.services.home_ai_agent import find_task_matches
+
+    tasks = [{"description": "Call the plumber", "completed": False}]
+    assert find_task_matches("what about the plumber?", tasks) == []
+    assert find_task_matches("I called the plumber", tasks)[0]["description"] == (
+        "Call the plumber"
+    )
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import tool_registry as tool_registry_module
+from app.services.tool_registry import ToolArgumentError, ToolRegistry, ToolTimeoutError
+
+PARAMETERS = {
+    "type": "object",
+    "properties": {"address": {"type": "string"}, "unit": {"type": "string"}},
+    "required": ["address"],
+}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(tool_registry_module, "RETRY_BACKOFF_SECONDS", 0)
+
+
+class Recorder:
+    """A tool function that records its calls and how many overlapped."""
+
+    def __init__(self, delay: float = 0, failures: int = 0) -> None:
+        self.delay = delay
+        self.failures = failures
+        self.calls: list[dict] = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, kwargs: dict) -> None:
+        with self._lock:
+            self.calls.append(kwargs)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def _exit(self) -> dict:
+        with self._lock:
+            self.running -= 1
+            if len(self.calls) <= self.failures:
+                raise RuntimeError("upstream unavailable")
+            return {"calls": len(self.calls)}
+
+    def __call__(self, address, unit=None, user_id=None):
+        self._enter({"address": address, "unit": unit, "user_id": user_id})
+        time.sleep(self.delay)
+        return self._exit()
+
+    async def run_async(self, address, unit=None, user_id=None):
+        self._enter({"address": address, "unit": unit, "user_id": user_id})
+        await asyncio.sleep(self.delay)
+        return self._exit()
+
+
+def _register(func, *, use_async: bool = False, **options) -> ToolRegistry:
+    registry = ToolRegistry(max_threads=8)
+    registry.tool("lookup", description="Look up a home.", parameters=PARAMETERS, **options)(func)
+    if use_async:
+        registry.async_variant("lookup")(func.run_async)
+    return registry
+
+
+def _execute(registry: ToolRegistry, mode: str, args: dict):
+    if mode == "sync":
+        return registry.execute("lookup", args, user_id=7)
+    return asyncio.run(registry.execute_async("lookup", args, user_id=7))
+
+
+MODES = ["sync", "async"]
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_arguments_are_filtered_and_user_injected(mode):
+    recorder = Recorder()
+    registry = _register(recorder)
+    _execute(registry, mode, {"address": "1 Elm St", "unit": None, "invented": 1, "user_id": 99})
+    assert recorder.calls == [{"address": "1 Elm St", "unit": None, "user_id": 7}]
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_missing_required_argument_fails_without_calling_or_retrying(mode):
+    recorder = Recorder()
+    registry = _register(recorder, retries=3)
+    with pytest.raises(ToolArgumentError, match="address"):
+        _execute(registry, mode, {"unit": "2B"})
+    assert recorder.calls == []
+
+
+def test_unknown_tool_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported function"):
+        ToolRegistry().execute("missing", {}, user_id=1)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_errors_are_retried_up_to_the_limit(mode):
+    recorder = Recorder(failures=2)
+    assert _execute(_register(recorder, retries=2), mode, {"address": "a"}) == {"calls": 3}
+
+    recorder = Recorder(failures=2)
+    with pytest.raises(RuntimeError):
+        _execute(_register(recorder, retries=1), mode, {"address": "a"})
+    assert len(recorder.calls) == 2
+
+
+@pytest.mark.parametrize(
+    "mode, use_async",
+    [("sync", False), ("async", False), ("async", True)],
+    ids=["sync", "async-thread", "async-coroutine"],
+)
+def test_timeouts_are_not_retried(mode, use_async):
+    recorder = Recorder(delay=0.3)
+    registry = _register(recorder, use_async=use_async, timeout=0.05, retries=3)
+    started = time.perf_counter()
+    with pytest.raises(ToolTimeoutError):
+        _execute(registry, mode, {"address": "a"})
+    assert time.perf_counter() - started < 0.25
+    assert len(recorder.calls) == 1
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_cached_results_skip_the_call(mode):
+    recorder = Recorder()
+    registry = _register(recorder, cache_ttl=60)
+    first = _execute(registry, mode, {"address": "a"})
+    assert _execute(registry, mode, {"address": "a"}) == first
+    _execute(registry, mode, {"address": "b"})
+    assert len(recorder.calls) == 2
+
+    registry.clear_cache()
+    _execute(registry, mode, {"address": "a"})
+    assert len(recorder.calls) == 3
+
+
+def test_failures_are_not_cached():
+    recorder = Recorder(failures=1)
+    registry = _register(recorder, cache_ttl=60)
+    with pytest.raises(RuntimeError):
+        registry.execute("lookup", {"address": "a"}, user_id=7)
+    assert registry.execute("lookup", {"address": "a"}, user_id=7) == {"calls": 2}
+
+
+def test_submitted_calls_run_concurrently_under_the_cap():
+    recorder = Recorder(delay=0.1)
+    registry = _register(recorder, max_concurrency=2)
+    started = time.perf_counter()
+    calls = [registry.submit("lookup", {"address": str(n)}, user_id=7) for n in range(6)]
+    for call in calls:
+        call.result()
+    elapsed = time.perf_counter() - started
+    assert recorder.peak == 2
+    assert len(recorder.calls) == 6
+    # Three waves of two, not six calls back to back.
+    assert elapsed < 0.5
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["thread", "coroutine"])
+def test_async_calls_respect_the_cap(use_async):
+    recorder = Recorder(delay=0.05)
+    registry = _register(recorder, use_async=use_async, max_concurrency=2)
+
+    async def run_all():
+        return await asyncio.gather(
+            *(registry.execute_async("lookup", {"address": str(n)}, user_id=7) for n in range(6))
+        )
+
+    assert len(asyncio.run(run_all())) == 6
+    assert recorder.peak == 2